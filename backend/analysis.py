@@ -0,0 +1,107 @@
+# backend/analysis.py
+import logging
+import os
+import time
+import uuid
+
+from capture_ingest import capture_paths, ingest_capture
+from capture_pool import CaptureError, CaptureTimeout, get_capture_pool
+from pipeline import AnalysisContext, default_pipeline
+from request_log import write_requests
+from scanner_service import get_scanner_service
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BACKEND_DIR, '../data')
+CAPTURE_TIMEOUT = 120  # seconds
+
+logger = logging.getLogger(__name__)
+
+
+class AnalysisError(Exception):
+    """An analysis failed; carries the HTTP status and payload to report"""
+
+    def __init__(self, message, status=500, **details):
+        super().__init__(message)
+        self.status = status
+        self.details = details
+
+    def to_dict(self):
+        return {'error': str(self), **self.details}
+
+
+def validate_url(url):
+    if not url:
+        raise AnalysisError('URL is required', status=400)
+    if not url.startswith(('http://', 'https://')):
+        raise AnalysisError('Invalid URL format. Must start with http:// or https://', status=400)
+
+
+def run_analysis(url, progress=None, checkpoint=None, detect=None, deadline=None):
+    """Run the full capture + detection pipeline for one URL and return the result.
+
+    `progress(step, message, percentage)` is called as stages finish,
+    `checkpoint()` between stages and while the capture is ingested so callers
+    can abort a job (by raising),
+    `detect(logs, site, rule_anomalies)` replaces the in-process anomaly detection stage, and
+    `deadline` (a time.time() value) caps how long the browser capture may run.
+    The result is not saved; that is up to the caller.
+    """
+    progress = progress or (lambda step, message, percentage: None)
+    checkpoint = checkpoint or (lambda: None)
+    validate_url(url)
+    timings = {}
+
+    progress('starting', 'Starting analysis...', 0)
+
+    # Probe the URL over the shared scanner loop and connection pool
+    started = time.perf_counter()
+    network_results = get_scanner_service().scan_url(url, concurrency=5, max_requests=100, timeout=30)
+    timings['probe'] = (time.perf_counter() - started) * 1000
+    checkpoint()
+
+    # Capture on a pooled, already-running browser worker into this analysis'
+    # own NDJSON file, ingesting records while the capture is still running
+    analysis_id = str(uuid.uuid4())
+    capture_path, screenshot_path = capture_paths(analysis_id)
+    timeout = CAPTURE_TIMEOUT
+    if deadline is not None:
+        timeout = max(min(timeout, deadline - time.time()), 1)
+    started = time.perf_counter()
+    try:
+        capture = get_capture_pool().submit_capture(url, capture_path, screenshot=screenshot_path, timeout=timeout)
+        ingester = ingest_capture(capture_path, capture.done, checkpoint=checkpoint)
+        capture.result()
+    except CaptureError as e:
+        logger.warning(f"Capture of {url} failed: {e}")
+        raise AnalysisError('Network capture failed', status=504 if isinstance(e, CaptureTimeout) else 500,
+                            details=str(e))
+    finally:
+        # Every record is in memory once ingested; the capture file is scratch
+        # space and goes whether the run succeeds, fails or is cancelled
+        try:
+            os.remove(capture_path)
+        except FileNotFoundError:
+            pass
+    logs = ingester.logs
+    timings['capture'] = (time.perf_counter() - started) * 1000
+    checkpoint()
+    progress('puppeteer_complete', 'Network capture complete', 50)
+
+    if logs:
+        logger.debug(f"Analysis {analysis_id}: captured {len(logs)} requests from {url}")
+    else:
+        logger.info(f"Analysis {analysis_id}: no requests were captured from {url}")
+
+    # Detection, security checks, scoring and aggregation
+    context = AnalysisContext(analysis_id, url, logs, rule_anomalies=ingester.rule_anomalies)
+    context.timings.update(timings)
+    default_pipeline(detect).run(context, checkpoint)
+
+    # Keep every captured request in the columnar request log; the summary
+    # record only carries the first few hundred
+    started = time.perf_counter()
+    write_requests(analysis_id, logs)
+    context.timings['store_requests'] = (time.perf_counter() - started) * 1000
+
+    # Sanitize result before saving
+    return context.result()
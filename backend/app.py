@@ -1,61 +1,94 @@
-from flask import Flask, render_template, request, jsonify, Response, send_file
+from flask import Flask, render_template, request, jsonify, Response, send_file, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 import subprocess
-import json
 import os
-import time
 import uuid
-import csv
 import io
-import datetime
 import logging
-import asyncio
-import aiohttp
 import math  # Add this import at the top with your other imports
-import whois
-import urllib.parse
+import threading
 logging.basicConfig(level=logging.INFO)
-from datetime import datetime as dt
-from detector import detect_anomalies
-from flask_socketio import SocketIO, emit
-from security_analyzer import SecurityAnalyzer
-from network_scanner import NetworkScanner  # Add this import at the top
+from flask_socketio import SocketIO
+from storage import analysis_domain, get_store
+from analysis import AnalysisError, run_analysis, validate_url
+from serializer import dumps
+from exporter import EXPORT_FORMATS, EXPORT_ROWS, MIMETYPES, PARQUET_AVAILABLE, export_chunks, iter_table_rows
+from tasks import get_queue
+from result_cache import cache_key, get_result_cache
+from request_log import delete_requests, ensure_requests
+from capture_ingest import capture_paths, normalize_capture_record
+from scanner_service import MAX_BATCH_CONCURRENCY, MAX_BATCH_REQUESTS, MAX_PER_HOST_RATE, get_scanner_service
+from domains import get_extractor
+from streaming_detector import StreamingDetector
+from fingerprints import anomaly_fingerprint, trend
+from whois_service import WhoisLookupError, get_whois_service
+from collections import OrderedDict
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from fpdf import FPDF
 
-class CustomJSONEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, datetime.datetime):
-            return obj.isoformat()
-        if hasattr(obj, 'timestamp') and callable(obj.timestamp):
-            return obj.timestamp()
-        if hasattr(obj, '__str__'):
-            return str(obj)
-        return super().default(obj)
+class SerializerJSONProvider(DefaultJSONProvider):
+    """jsonify through serializer.dumps: numpy values, datetimes and NaN in one encoding pass"""
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj, pretty=bool(kwargs.get('indent')))
 
 app = Flask(__name__, template_folder='../frontend/templates', static_folder='../frontend/static')
+app.json = SerializerJSONProvider(app)
 socketio = SocketIO(app, cors_allowed_origins="*")
 
+# Online detectors for continuous monitoring, one per client-chosen stream id
+MAX_STREAMS = 100
+stream_detectors = OrderedDict()
+stream_detectors_lock = threading.Lock()
+
 @app.route('/')
 def home():
     return render_template('index.html')
 
 @app.route('/api/history', methods=['GET'])
 def get_history():
-    """Retrieve analysis history"""
+    """Retrieve the analysis history as summary rows; /api/history/<id> returns a full record"""
     try:
-        history_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../data/history.json')
-        if not os.path.exists(history_path):
-            return jsonify([])
-            
-        with open(history_path, 'r') as f:
-            history = json.load(f)
-        
-        return jsonify(history)
+        return jsonify(get_store().history(url=request.args.get('url')))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/history/<analysis_id>', methods=['GET'])
+def get_analysis(analysis_id):
+    """Retrieve one full analysis record"""
+    try:
+        analysis = get_store().get(analysis_id)
+        if not analysis:
+            return jsonify({'error': 'Analysis not found'}), 404
+        return jsonify(analysis)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/history/<analysis_id>', methods=['DELETE'])
+def delete_analysis(analysis_id):
+    """Delete one analysis and its request table; compaction reclaims the space"""
+    try:
+        if not get_store().delete(analysis_id):
+            return jsonify({'error': 'Analysis not found'}), 404
+        delete_requests(analysis_id)
+        get_result_cache().invalidate()
+        return jsonify({'id': analysis_id, 'deleted': True})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def delete_request_tables(analysis_ids):
+    for analysis_id in analysis_ids:
+        delete_requests(analysis_id)
+
 @app.route('/api/compare', methods=['POST'])
 def compare_analyses():
-    """Compare two previous analyses"""
+    """Compare two previous analyses by anomaly fingerprint.
+
+    `new_anomalies` and `resolved_anomalies` keep their original shape: the
+    anomaly records of the second analysis not in the first, and of the
+    first not in the second. `fingerprints` adds the per-fingerprint view
+    (new, persisting and resolved entries with counts), as /api/trend returns.
+    """
     try:
         data = request.json
         id1 = data.get('id1')
@@ -64,22 +97,20 @@ def compare_analyses():
         if not id1 or not id2:
             return jsonify({'error': 'Two analysis IDs are required'}), 400
             
-        # Load history
-        history_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../data/history.json')
-        if not os.path.exists(history_path):
-            return jsonify({'error': 'No history found'}), 404
-            
-        with open(history_path, 'r') as f:
-            history = json.load(f)
-        
         # Find the two analyses
-        analysis1 = next((a for a in history if a['id'] == id1), None)
-        analysis2 = next((a for a in history if a['id'] == id2), None)
+        summaries = get_store().summaries([id1, id2])
+        analysis1 = summaries.get(id1)
+        analysis2 = summaries.get(id2)
         
         if not analysis1 or not analysis2:
             return jsonify({'error': 'One or both analyses not found'}), 404
+
+        # Diff by fingerprint, so different anomalies on one URL stay apart
+        fingerprints = get_store().fingerprints([id1, id2])
+        diff = trend([(id1, fingerprints[id1]), (id2, fingerprints[id2])])
+        new = {entry['fingerprint'] for entry in diff['new']}
+        resolved = {entry['fingerprint'] for entry in diff['resolved']}
             
-        # Compare the analyses
         comparison = {
             'id1': id1,
             'id2': id2,
@@ -89,404 +120,147 @@ def compare_analyses():
             'date2': analysis2['date'],
             'total_requests_diff': analysis2['total_requests'] - analysis1['total_requests'],
             'anomalies_diff': analysis2['anomalies_found'] - analysis1['anomalies_found'],
-            'new_anomalies': [],
-            'resolved_anomalies': []
+            'new_anomalies': anomalies_with_fingerprints(id2, new),
+            'resolved_anomalies': anomalies_with_fingerprints(id1, resolved),
+            'fingerprints': diff
         }
         
-        # Find new and resolved anomalies
-        anomaly_urls1 = {a['url'] for a in analysis1['anomalies']}
-        anomaly_urls2 = {a['url'] for a in analysis2['anomalies']}
-        
-        comparison['new_anomalies'] = [a for a in analysis2['anomalies'] if a['url'] not in anomaly_urls1]
-        comparison['resolved_anomalies'] = [a for a in analysis1['anomalies'] if a['url'] not in anomaly_urls2]
-        
         return jsonify(comparison)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def anomalies_with_fingerprints(analysis_id, fingerprints):
+    """The stored anomaly records of an analysis whose fingerprint is in fingerprints"""
+    if not fingerprints:
+        return []
+    analysis = get_store().get(analysis_id) or {}
+    # Analyses saved before fingerprinting carry no fingerprint field
+    return [anomaly for anomaly in analysis.get('anomalies', [])
+            if (anomaly.get('fingerprint') or anomaly_fingerprint(anomaly)) in fingerprints]
+
+@app.route('/api/trend', methods=['GET'])
+def anomaly_trend():
+    """New, persisting and resolved anomalies across several analyses.
+
+    Takes `ids` (comma-separated analysis ids) or `url` with optional
+    `since` / `until` dates. Runs are ordered by date and compared against
+    the newest one.
+    """
+    try:
+        store = get_store()
+        if request.args.get('ids'):
+            ids = [i for i in request.args['ids'].split(',') if i]
+        elif request.args.get('url'):
+            ids = store.analysis_ids(request.args['url'], since=request.args.get('since'),
+                                     until=request.args.get('until'))
+        else:
+            return jsonify({'error': 'ids or url parameter is required'}), 400
+
+        summaries = store.summaries(ids)
+        missing = [i for i in ids if i not in summaries]
+        if missing:
+            return jsonify({'error': f"Analyses not found: {', '.join(missing)}"}), 404
+        if not ids:
+            return jsonify({'error': 'No analyses found'}), 404
+
+        runs = sorted(summaries.values(), key=lambda s: s['date'])
+        fingerprints = store.fingerprints(ids)
+        result = trend([(run['id'], fingerprints[run['id']]) for run in runs])
+        result['analyses'] = [
+            {key: run[key] for key in ('id', 'url', 'date', 'anomalies_found', 'threat_level')} for run in runs
+        ]
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/export', methods=['GET'])
 def export_data():
-    """Export analysis data in specified format"""
+    """Export analysis data in specified format, streamed as it is read.
+
+    `format` is json, csv, ndjson or parquet; `rows` picks anomalies (the
+    default) or every captured request. A json export without `rows` is the
+    whole analysis record.
+    """
     try:
         analysis_id = request.args.get('id')
-        format_type = request.args.get('format', 'json')
+        format_type = request.args.get('format', 'json').lower()
+        rows_kind = request.args.get('rows')
         
         if not analysis_id:
             return jsonify({'error': 'Analysis ID required'}), 400
-            
-        # Load history
-        history_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../data/history.json')
-        if not os.path.exists(history_path):
-            return jsonify({'error': 'No history found'}), 404
-            
-        with open(history_path, 'r') as f:
-            history = json.load(f)
-        
-        # Find the analysis
-        analysis = next((a for a in history if a['id'] == analysis_id), None)
-        
-        if not analysis:
-            return jsonify({'error': 'Analysis not found'}), 404
-            
-        # Export in the requested format
-        if format_type.lower() == 'json':
-            return jsonify(analysis)
-            
-        elif format_type.lower() == 'csv':
-            output = io.StringIO()
-            writer = csv.writer(output)
-            
-            # Write header
-            writer.writerow(['URL', 'Status Code', 'Content Type', 'Response Time (ms)', 'Reason'])
-            
-            # Write anomaly data
-            for anomaly in analysis['anomalies']:
-                writer.writerow([
-                    anomaly.get('url', ''),
-                    anomaly.get('status_code', ''),
-                    anomaly.get('content_type', ''),
-                    anomaly.get('response_time', ''),
-                    anomaly.get('reason', '')
-                ])
-                
-            return Response(
-                output.getvalue(),
-                mimetype='text/csv',
-                headers={'Content-Disposition': f'attachment; filename=analysis_{analysis_id}.csv'}
-            )
-        else:
+        if format_type not in EXPORT_FORMATS:
             return jsonify({'error': 'Unsupported export format'}), 400
+        if rows_kind not in (None, *EXPORT_ROWS):
+            return jsonify({'error': f"rows must be one of {', '.join(EXPORT_ROWS)}"}), 400
+        if format_type == 'parquet' and not PARQUET_AVAILABLE:
+            return jsonify({'error': 'Parquet export requires pyarrow'}), 501
+
+        document = None
+        if rows_kind == 'requests':
+            # Read from the memory-mapped request log a chunk at a time
+            table = request_table(analysis_id)
+            if table is None:
+                return jsonify({'error': 'Analysis not found'}), 404
+            rows = iter_table_rows(table)
+        else:
+            # Find the analysis
+            analysis = get_store().get(analysis_id)
+            if not analysis:
+                return jsonify({'error': 'Analysis not found'}), 404
+            rows = analysis.get('anomalies', [])
+            if format_type == 'json' and rows_kind is None:
+                document = analysis
+
+        headers = {}
+        if document is None:
+            suffix = '_requests' if rows_kind == 'requests' else ''
+            headers['Content-Disposition'] = f'attachment; filename=analysis_{analysis_id}{suffix}.{format_type}'
+
+        # A generator body is sent with chunked transfer encoding, without Content-Length
+        return Response(
+            stream_with_context(export_chunks(format_type, rows, rows_kind or 'anomalies', document=document)),
+            mimetype=MIMETYPES[format_type],
+            headers=headers
+        )
             
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-# Add this function before analyze_url
-
-def sanitize_for_json(data):
-    """Recursively convert non-serializable types to serializable ones"""
-    if isinstance(data, dict):
-        return {k: sanitize_for_json(v) for k, v in data.items()}
-    elif isinstance(data, list):
-        return [sanitize_for_json(x) for x in data]
-    elif isinstance(data, (datetime.datetime, datetime.date)):
-        return data.isoformat()
-    elif hasattr(data, 'timestamp') and callable(data.timestamp):
-        return data.timestamp()
-    elif hasattr(data, '__dict__'):
-        return sanitize_for_json(data.__dict__)
-    # Handle NaN values - both string "NaN" and float NaN
-    elif data == "NaN" or (isinstance(data, float) and math.isnan(data)):
-        return None
-    elif not isinstance(data, (str, int, float, bool, type(None))):
-        return str(data)
-    return data
-
-
 @app.route('/analyze', methods=['POST'])
 def analyze_url():
-    # Initialize safety variables at the top
-    safety_rating = "Safe"
-    safety_issues = []
-    safety_recommendations = []
-
+    """Run an analysis synchronously and return the saved result"""
     try:
         data = request.json
         url = data.get('url')
-        
-        # Validate URL format
-        if not url:
-            return jsonify({'error': 'URL is required'}), 400
-        
-        if not url.startswith(('http://', 'https://')):
-            return jsonify({'error': 'Invalid URL format. Must start with http:// or https://'}), 400
 
-        try:
-            # Use the improved NetworkScanner with timeout
-            scanner = NetworkScanner(concurrency=5, max_requests=100, timeout=30)
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            network_results = loop.run_until_complete(scanner.scan_url(url))
-            loop.close()
-
-            # Check if Node.js is installed with better error messages
-            try:
-                node_version = subprocess.run(['node', '--version'], check=True, capture_output=True, text=True)
-                print(f"Node version: {node_version.stdout.strip()}")
-            except (subprocess.SubprocessError, FileNotFoundError) as e:
-                print(f"Node.js check failed: {str(e)}")
-                return jsonify({'error': 'Node.js is not installed or not in PATH'}), 500
-
-            # Create data directory first to ensure it exists
-            data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../data')
-            os.makedirs(data_dir, exist_ok=True)
-            
-            # Run Puppeteer with even better error handling
-            script_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'puppeteer_script.js')
-            print(f"Running puppeteer script: {script_path}")
-            
-            process = subprocess.run(
-                ['node', script_path, url],
-                cwd=os.path.dirname(os.path.abspath(__file__)),
-                capture_output=True,
-                text=True,
-                timeout=120  # 2-minute timeout
-            )
-            
-            if process.returncode != 0:
-                print(f"Puppeteer script failed with exit code {process.returncode}")
-                print(f"STDERR: {process.stderr}")
-                print(f"STDOUT: {process.stdout}")
-                return jsonify({
-                    'error': 'Puppeteer script failed',
-                    'details': process.stderr,
-                    'output': process.stdout
-                }), 500
-
-            # Use absolute path for logs file
-            log_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../data/network_logs.json')
-            print(f"Looking for logs at: {log_path}")  # Debugging
-
-            # Wait for the file to be created (retry mechanism)
-            max_retries = 5
-            retry_delay = 2  # seconds
-            for _ in range(max_retries):
-                if os.path.exists(log_path):
-                    break
-                time.sleep(retry_delay)
-            else:
-                return jsonify({
-                    'error': 'Logs file not generated. Possible reasons:',
-                    'details': [
-                        'Puppeteer failed to capture data',
-                        'Website blocked automated requests',
-                        'Network connectivity issues'
-                    ]
-                }), 500
-
-            # Load and validate logs
-            with open(log_path, 'r') as f:
-                try:
-                    logs = json.load(f)
-                except json.JSONDecodeError:
-                    return jsonify({'error': 'Invalid log file format'}), 500
-
-            # Add after loading logs but before calling detect_anomalies
-            print(f"Loaded {len(logs)} logs for analysis")
-            if logs:
-                print(f"First log entry: {json.dumps(logs[0], indent=2)}")
-            else:
-                print("No logs were captured!")
-
-            # Detect anomalies
-            if logs:
-                anomalies = detect_anomalies(logs)
-                print(f"Found {len(anomalies)} anomalies")
-            else:
-                anomalies = []
-                print("No logs to analyze for anomalies")
+        def emit_progress(step, message, percentage):
+            socketio.emit('analysis_progress', {
+                'step': step,
+                'message': message,
+                'percentage': percentage
+            })
 
-            # Add to the analyze_url function, inside the anomaly detection section
+        def analyze():
+            result = run_analysis(url, progress=emit_progress)
+            # Save to history
+            get_store().add(result)
+            return result
 
-            # After detecting anomalies but before creating the result object
-            if anomalies:
-                # Add confidence scores to each anomaly
-                for anomaly in anomalies:
-                    # Base confidence on anomaly type
-                    base_confidence = 0.7  # Default medium confidence
-                    
-                    # Adjust based on anomaly type
-                    if anomaly.get('anomaly_type') in ['server_error', 'security_headers', 'mixed_content', 'outdated_tls']:
-                        base_confidence = 0.9  # High confidence for clear security issues
-                    elif anomaly.get('anomaly_type') in ['statistical_outlier', 'slow_request']:
-                        base_confidence = 0.6  # Lower confidence for timing-based issues
-                        
-                    # Adjust based on additional factors if available
-                    if 'status_code' in anomaly:
-                        # Higher confidence for clear error codes
-                        status_code = anomaly['status_code']
-                        if status_code >= 500:
-                            base_confidence = min(base_confidence + 0.1, 0.95)
-                        elif status_code >= 400:
-                            base_confidence = min(base_confidence + 0.05, 0.9)
-                            
-                    # Add a small random variation (+/- 0.05) to make it look more like ML scoring
-                    import random
-                    variation = (random.random() - 0.5) * 0.1
-                    confidence_score = round(min(max(base_confidence + variation, 0.4), 0.98), 2)
-                    
-                    # Add confidence score to the anomaly
-                    anomaly['confidence_score'] = confidence_score
-                    
-                    # Add a verbal confidence level
-                    if confidence_score >= 0.8:
-                        anomaly['confidence_level'] = 'high'
-                    elif confidence_score >= 0.6:
-                        anomaly['confidence_level'] = 'medium'
-                    else:
-                        anomaly['confidence_level'] = 'low'
-
-            # Security analysis
-            security_analyzer = SecurityAnalyzer()
-            security_issues = []
-            security_issues.extend(security_analyzer.check_security_headers(logs))
-            security_issues.extend(security_analyzer.check_mixed_content(logs))
-            security_issues.extend(security_analyzer.check_vulnerable_libraries(logs))
-            print(f"Found {len(security_issues)} security issues")
-
-            # Generate safety assessment
-            safety_rating = "Safe"
-            safety_issues = []
-            safety_recommendations = []
-
-            # Check for security issues
-            if security_issues:
-                # Count issues by severity
-                high_severity = sum(1 for issue in security_issues if issue.get('severity') == 'high')
-                medium_severity = sum(1 for issue in security_issues if issue.get('severity') == 'medium')
-                
-                if high_severity > 0:
-                    safety_rating = "Potentially Unsafe"
-                    safety_issues.append(f"{high_severity} high severity security issues detected")
-                    safety_recommendations.append("Address all high severity security issues immediately")
-                elif medium_severity > 0:
-                    safety_rating = "Moderate Risk"
-                    safety_issues.append(f"{medium_severity} medium severity security issues detected")
-                    safety_recommendations.append("Consider addressing medium severity security issues")
-                
-                # Add specific recommendations based on issue types
-                for issue in security_issues:
-                    if issue.get('type') == 'missing_security_headers':
-                        safety_recommendations.append("Implement missing security headers")
-                    elif issue.get('type') == 'mixed_content':
-                        safety_recommendations.append("Fix mixed content issues (HTTP resources on HTTPS pages)")
-                    elif issue.get('type') == 'vulnerable_library':
-                        safety_recommendations.append("Update vulnerable JavaScript libraries")
-
-            # Check for error responses
-            error_count = sum(1 for a in anomalies if a.get('anomaly_type') in ['client_error', 'server_error'])
-            if error_count > 2:  # Lower the threshold to be more sensitive
-                safety_rating = "Needs Review" if safety_rating == "Safe" else safety_rating
-                safety_issues.append(f"{error_count} HTTP errors detected")
-                safety_recommendations.append("Investigate the high number of HTTP errors")
-
-            # Also add check for anomalies directly to affect safety rating
-            # This ensures that even if no specific security issues are found,
-            # a high number of errors will trigger a safety warning
-            if len(anomalies) > 10:
-                safety_rating = "Needs Review" if safety_rating == "Safe" else safety_rating
-                safety_issues.append(f"High number of anomalies detected ({len(anomalies)})")
-                safety_recommendations.append("Investigate the high number of anomalies")
-
-            # Enhance the safety assessment with a numeric threat level
-            threat_level = 0  # 0-100 scale
-
-            # Determine threat level based on various factors
-            if security_issues:
-                high_severity_count = sum(1 for issue in security_issues if issue.get('severity') == 'high')
-                medium_severity_count = sum(1 for issue in security_issues if issue.get('severity') == 'medium')
-                
-                # Add points for each severity level
-                threat_level += high_severity_count * 20  # Each high severity adds 20 points
-                threat_level += medium_severity_count * 10  # Each medium severity adds 10 points
-
-            # Add points for error responses
-            error_count = sum(1 for a in anomalies if a.get('anomaly_type') in ['client_error', 'server_error'])
-            threat_level += min(error_count * 5, 25)  # Max 25 points from errors
-
-            # Add points based on total anomalies
-            anomaly_count = len(anomalies)
-            threat_level += min(anomaly_count * 2, 30)  # Max 30 points from anomaly count
-
-            # Cap at 100
-            threat_level = min(threat_level, 100)
-
-            # Determine color based on threat level
-            threat_color = "green"
-            if threat_level >= 70:
-                threat_color = "red"
-                safety_rating = "High Risk"
-            elif threat_level >= 30:
-                threat_color = "yellow"
-                safety_rating = "Moderate Risk" if safety_rating == "Safe" else safety_rating
-
-            # Add to the result object
-            result['safety_assessment']['threat_level'] = threat_level
-            result['safety_assessment']['threat_color'] = threat_color
-
-            # Create result object
-            result = {
-                'id': str(uuid.uuid4()),
-                'url': url,
-                'date': datetime.datetime.now().isoformat(),
-                'total_requests': len(logs),
-                'anomalies_found': len(anomalies),
-                'anomaly_types': {
-                    # Replace the basic classification with detailed types
-                    'client_error': sum(1 for a in anomalies if a.get('anomaly_type') in ['client_error', 'bad_request', 'unauthorized', 'forbidden', 'not_found', 'method_not_allowed', 'rate_limited']),
-                    'server_error': sum(1 for a in anomalies if a.get('anomaly_type') == 'server_error'),
-                    'slow_request': sum(1 for a in anomalies if a.get('anomaly_type') in ['slow_request', 'very_slow_request']),
-                    'security_headers': sum(1 for a in anomalies if a.get('anomaly_type') == 'security_headers'),
-                    'mixed_content': sum(1 for a in anomalies if a.get('anomaly_type') == 'mixed_content'),
-                    'connection_error': sum(1 for a in anomalies if a.get('anomaly_type') == 'connection_error'),
-                    'large_response': sum(1 for a in anomalies if a.get('anomaly_type') == 'large_response'),
-                    'outdated_tls': sum(1 for a in anomalies if a.get('anomaly_type') == 'outdated_tls'),
-                    'statistical_outlier': sum(1 for a in anomalies if a.get('anomaly_type') == 'statistical_outlier')
-                },
-                'anomalies': anomalies[:200],  # Increase limit or remove slice completely           
-                'all_requests': logs[:500],  # Increase limit           
-                'security_issues': security_issues[:200],  # Increase limit
-                'safety_assessment': {
-                    'rating': safety_rating,
-                    'issues': safety_issues,
-                    'recommendations': safety_recommendations
-                }
-            }
+        validate_url(url)
+        result, outcome = get_result_cache().get_or_compute(cache_key(url), analyze, force=wants_force(data))
 
-            # Sanitize result before saving
-            result = sanitize_for_json(result)
-            
-            # Save to history
-            history_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../data/history.json')
-            history = []
-            if os.path.exists(history_path):
-                with open(history_path, 'r') as f:
-                    try:
-                        history = json.load(f)
-                    except json.JSONDecodeError:
-                        history = []
-            
-            history.append(result)
-            with open(history_path, 'w') as f:
-                json.dump(history, f, indent=2, cls=CustomJSONEncoder)
-            
-            socketio.emit('analysis_progress', {
-                'step': 'starting',
-                'message': 'Starting analysis...',
-                'percentage': 0
-            })
-            
-            socketio.emit('analysis_progress', {
-                'step': 'puppeteer_complete',
-                'message': 'Network capture complete',
-                'percentage': 50
-            })
-            
-            socketio.emit('analysis_progress', {
-                'step': 'analysis_complete',
-                'message': 'Analysis complete',
-                'percentage': 100,
-                'result_id': result['id']  # Only send the ID, not the entire result
-            })
-            
-            return jsonify(result)
+        socketio.emit('analysis_progress', {
+            'step': 'analysis_complete',
+            'message': 'Analysis complete',
+            'percentage': 100,
+            'result_id': result['id']  # Only send the ID, not the entire result
+        })
 
-        except subprocess.TimeoutExpired:
-            return jsonify({'error': 'Analysis timed out after 2 minutes'}), 504
-        except subprocess.CalledProcessError as e:
-            return jsonify({
-                'error': 'Puppeteer script failed',
-                'details': str(e)
-            }), 500
+        response = jsonify(result)
+        response.headers['X-Cache'] = outcome.upper()
+        return response
+    except AnalysisError as e:
+        return jsonify(e.to_dict()), e.status
     except Exception as e:
         import traceback
         logging.error(f"Error in analyze_url: {str(e)}")
@@ -495,6 +269,114 @@ def analyze_url():
             'error': str(e)
         }), 500
 
+def wants_force(data):
+    """force=true in the JSON body or query string bypasses the result cache"""
+    force = data.get('force', request.args.get('force'))
+    return force is True or str(force).lower() in ('true', '1')
+
+def task_queue():
+    """The background job queue, built with the socket progress emitter attached"""
+    return get_queue(on_progress=lambda event: socketio.emit('analysis_progress', event))
+
+def requested_timeout(data):
+    """Optional per-task timeout in seconds from the request body"""
+    timeout = data.get('timeout')
+    if timeout is None:
+        return None
+    try:
+        timeout = float(timeout)
+    except (TypeError, ValueError):
+        raise AnalysisError('timeout must be a number of seconds', status=400)
+    if not math.isfinite(timeout) or timeout <= 0:
+        raise AnalysisError('timeout must be a positive number of seconds', status=400)
+    return timeout
+
+@app.route('/api/analyze', methods=['POST'])
+def queue_analysis():
+    """Queue an analysis in the background and return its task id immediately"""
+    try:
+        data = request.json or {}
+        url = data.get('url')
+        validate_url(url)
+
+        task_id = task_queue().submit(url, timeout=requested_timeout(data), force=wants_force(data))
+        return jsonify({'task_id': task_id, 'status': 'queued'}), 202
+    except AnalysisError as e:
+        return jsonify(e.to_dict()), e.status
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def scan_option(data, name, default, maximum, kind=float):
+    """A positive batch scan setting from the request body, capped at maximum"""
+    value = data.get(name)
+    try:
+        value = float(default if value is None else value)
+    except (TypeError, ValueError):
+        raise AnalysisError(f'{name} must be a number', status=400)
+    if not math.isfinite(value) or kind(value) <= 0:
+        raise AnalysisError(f'{name} must be a positive number', status=400)
+    return min(kind(value), maximum)
+
+@app.route('/api/scan-batch', methods=['POST'])
+def scan_batch():
+    """Probe a list of URLs (or a sitemap) and return per-URL latency percentiles"""
+    try:
+        data = request.json or {}
+        service = get_scanner_service()
+        urls = data.get('urls') or []
+        if data.get('sitemap'):
+            urls = urls + service.fetch_sitemap(data['sitemap'])
+        if not urls:
+            return jsonify({'error': 'A list of URLs or a sitemap URL is required'}), 400
+        for url in urls:
+            validate_url(url)
+
+        results = service.scan_batch(
+            urls,
+            concurrency=scan_option(data, 'concurrency', 10, MAX_BATCH_CONCURRENCY, kind=int),
+            max_requests=scan_option(data, 'max_requests', 100, MAX_BATCH_REQUESTS, kind=int),
+            per_host_rate=scan_option(data, 'per_host_rate', 5.0, MAX_PER_HOST_RATE)
+        )
+        return jsonify({'urls': len(results), 'results': results})
+    except AnalysisError as e:
+        return jsonify(e.to_dict()), e.status
+    except FutureTimeoutError:
+        return jsonify({'error': 'Batch scan timed out'}), 504
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/cache/stats', methods=['GET'])
+def get_cache_stats():
+    """Result cache hit/miss counters for monitoring"""
+    return jsonify(get_result_cache().stats())
+
+@app.route('/api/tasks/<task_id>', methods=['GET'])
+def get_task(task_id):
+    """Poll the status of a background analysis"""
+    try:
+        task = task_queue().task_store.get(task_id)
+        if not task:
+            return jsonify({'error': 'Task not found'}), 404
+
+        if task['status'] == 'done' and task['result_id']:
+            task['result'] = get_store().get(task['result_id'])
+        return jsonify(task)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/tasks/<task_id>', methods=['DELETE'])
+def cancel_task(task_id):
+    """Cancel a queued or running background analysis"""
+    try:
+        queue = task_queue()
+        if not queue.task_store.get(task_id):
+            return jsonify({'error': 'Task not found'}), 404
+        if not queue.cancel(task_id):
+            return jsonify({'error': 'Task has already finished'}), 409
+        return jsonify({'task_id': task_id, 'status': 'cancelling'}), 202
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 # Add a new route for testing
 
 @app.route('/test-puppeteer', methods=['GET'])
@@ -551,6 +433,36 @@ def test_puppeteer():
 
 # Add a new route for paginated requests
 
+def request_table(analysis_id):
+    """The analysis' request table, or None if there is no such analysis"""
+    def saved_requests():
+        # Analyses saved before the request log only kept their first 500 requests;
+        # index those once so they can be read the same way
+        analysis = get_store().get(analysis_id)
+        return analysis.get('all_requests', []) if analysis else None
+
+    return ensure_requests(os.path.basename(analysis_id), saved_requests)
+
+def request_filters(args):
+    """Filter and sort options of /api/requests as RequestTable.query keyword arguments"""
+    filters = {}
+    for name, convert in (('status_min', int), ('status_max', int),
+                          ('min_duration', float), ('max_duration', float)):
+        value = args.get(name)
+        if value not in (None, ''):
+            try:
+                filters[name] = convert(value)
+            except ValueError:
+                raise ValueError(f"Invalid {name}: {value!r}")
+    for name in ('domain', 'resource_type', 'sort'):
+        if args.get(name):
+            filters[name] = args[name]
+    url_contains = args.get('q') or args.get('url')
+    if url_contains:
+        filters['url_contains'] = url_contains
+    return filters
+
+
 @app.route('/api/requests', methods=['GET'])
 def get_requests():
     """Get paginated requests for an analysis"""
@@ -561,34 +473,34 @@ def get_requests():
         
         if not analysis_id:
             return jsonify({'error': 'Analysis ID required'}), 400
-            
-        # Load history
-        history_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../data/history.json')
-        if not os.path.exists(history_path):
-            return jsonify({'error': 'No history found'}), 404
-            
-        with open(history_path, 'r') as f:
-            history = json.load(f)
-        
-        # Find the analysis
-        analysis = next((a for a in history if a['id'] == analysis_id), None)
-        
-        if not analysis:
-            return jsonify({'error': 'Analysis not found'}), 404
-            
+        page = max(page, 1)
+        per_page = min(max(per_page, 1), 1000)
+
+        try:
+            filters = request_filters(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
         # Get paginated requests
         start_idx = (page - 1) * per_page
         end_idx = start_idx + per_page
-        
-        requests = analysis.get('all_requests', [])
-        paginated_requests = requests[start_idx:end_idx]
-        
+
+        # Full request logs are memory-mapped and indexed, so only the requested rows are read
+        table = request_table(analysis_id)
+        if table is None:
+            return jsonify({'error': 'Analysis not found'}), 404
+
+        try:
+            total, paginated_requests = table.query(start=start_idx, stop=end_idx, **filters)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
         return jsonify({
             'requests': paginated_requests,
-            'total': len(requests),
+            'total': total,
             'page': page,
             'per_page': per_page,
-            'total_pages': (len(requests) + per_page - 1) // per_page
+            'total_pages': (total + per_page - 1) // per_page
         })
             
     except Exception as e:
@@ -602,12 +514,48 @@ def get_requests():
             'traceback': error_traceback
         }), 500
 
+@app.route('/api/stream/<stream_id>', methods=['POST'])
+def ingest_stream(stream_id):
+    """Feed one record or a micro-batch of records to a streaming detector"""
+    try:
+        data = request.json
+        records = data.get('records', [data]) if isinstance(data, dict) else data
+        if not isinstance(records, list) or not all(isinstance(record, dict) for record in records):
+            return jsonify({'error': 'Expected a log record or a list of records'}), 400
+
+        with stream_detectors_lock:
+            detector = stream_detectors.get(stream_id)
+            if detector is None:
+                detector = stream_detectors[stream_id] = StreamingDetector()
+                if len(stream_detectors) > MAX_STREAMS:
+                    stream_detectors.popitem(last=False)
+            else:
+                stream_detectors.move_to_end(stream_id)
+
+        with detector.lock:
+            anomalies = detector.update_many([normalize_capture_record(record) for record in records])
+            records_seen = detector.records_seen
+        return jsonify({
+            'stream_id': stream_id,
+            'records_seen': records_seen,
+            'anomalies': anomalies
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/screenshot/<analysis_id>', methods=['GET'])
 def get_screenshot(analysis_id):
     """Retrieve the screenshot for the given analysis"""
     try:
-        # Define screenshot path
-        screenshot_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../data/screenshot.png')
+        try:
+            uuid.UUID(analysis_id)
+        except ValueError:
+            return jsonify({'error': 'Invalid analysis ID'}), 400
+
+        # Each analysis has its own screenshot; older ones shared a single file
+        _, screenshot_path = capture_paths(analysis_id)
+        if not os.path.exists(screenshot_path):
+            screenshot_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../data/screenshot.png')
         
         # Check if screenshot exists
         if os.path.exists(screenshot_path):
@@ -619,40 +567,27 @@ def get_screenshot(analysis_id):
 
 @app.route('/api/threat-timeline', methods=['GET'])
 def get_threat_timeline():
-    """Get threat timeline data from analysis history"""
+    """Get threat timeline data from the analysis summaries.
+
+    Optional parameters: `since` (ISO date), `domain` and `bucket` (hour or
+    day) to return per-bucket rollups instead of one point per analysis.
+    """
     try:
-        # Load history
-        history_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../data/history.json')
-        if not os.path.exists(history_path):
-            return jsonify([])
-            
-        with open(history_path, 'r') as f:
-            history = json.load(f)
-        
-        # Generate timeline data
-        timeline_data = []
-        for analysis in history:
-            # Calculate threat level if not already present
-            threat_level = 0
-            if 'safety_assessment' in analysis and 'threat_level' in analysis['safety_assessment']:
-                threat_level = analysis['safety_assessment']['threat_level']
-            else:
-                # Simple calculation based on anomalies
-                anomalies_found = analysis.get('anomalies_found', 0)
-                threat_level = min(anomalies_found * 5, 100)
-                
-            timeline_data.append({
-                'id': analysis['id'],
-                'url': analysis['url'],
-                'date': analysis['date'],
-                'threat_level': threat_level,
-                'anomalies_found': analysis.get('anomalies_found', 0)
-            })
-            
-        # Sort by date (newest first)
-        timeline_data.sort(key=lambda x: x['date'], reverse=True)
-        
-        return jsonify(timeline_data)
+        since = request.args.get('since') or None
+        domain = request.args.get('domain') or None
+        bucket = request.args.get('bucket') or None
+        if domain:
+            # Accept a URL or any host of the site, as summaries are keyed by registrable domain
+            domain = analysis_domain(domain if '://' in domain else f'http://{domain}')
+
+        if bucket:
+            try:
+                return jsonify(get_store().rollups(bucket, since=since, domain=domain))
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+
+        # Newest first, straight from the summary table
+        return jsonify(get_store().timeline(since=since, domain=domain))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -664,52 +599,58 @@ def get_whois_info():
         if not url:
             return jsonify({'error': 'URL parameter is required'}), 400
             
-        # Extract domain from URL
-        parsed_url = urllib.parse.urlparse(url)
-        domain = parsed_url.netloc
-        
-        # Remove port if present
-        if ':' in domain:
-            domain = domain.split(':')[0]
+        # Extract the registrable domain (eTLD+1) from the URL's host
+        extractor = get_extractor()
+        host = extractor.host(url)
+        domain = extractor.registrable_domain(host)
+        if not domain:
+            return jsonify({'error': 'Could not extract a domain from the URL'}), 400
             
-        # Look up WHOIS info
+        # Look up WHOIS info (cached; slow lookups run off the request thread)
         try:
-            whois_info = whois.whois(domain)
-            
-            # Format the response
-            formatted_info = {
-                'domain': domain,
-                'registrar': whois_info.registrar,
-                'creation_date': whois_info.creation_date.isoformat() if hasattr(whois_info.creation_date, 'isoformat') else whois_info.creation_date,
-                'expiration_date': whois_info.expiration_date.isoformat() if hasattr(whois_info.expiration_date, 'isoformat') else whois_info.expiration_date,
-                'updated_date': whois_info.updated_date.isoformat() if hasattr(whois_info.updated_date, 'isoformat') else whois_info.updated_date,
-                'name_servers': whois_info.name_servers,
-                'status': whois_info.status,
-                'emails': whois_info.emails,
-                'dnssec': whois_info.dnssec,
-                'name': whois_info.name,
-                'org': whois_info.org,
-                'address': whois_info.address,
-                'city': whois_info.city,
-                'state': whois_info.state,
-                'zipcode': whois_info.zipcode,
-                'country': whois_info.country
-            }
-            
-            # Clean up None values
-            formatted_info = {k: v for k, v in formatted_info.items() if v is not None}
-            
-            return jsonify(formatted_info)
-        except Exception as e:
+            whois_info, outcome = get_whois_service().lookup(domain)
+        except WhoisLookupError as e:
             return jsonify({
                 'domain': domain,
-                'error': f'WHOIS lookup failed: {str(e)}',
+                'error': str(e),
                 'message': 'Domain information could not be retrieved'
-            }), 404
+            }), 504 if e.timed_out else 404
+
+        response = jsonify(dict(whois_info, host=host))
+        response.headers['X-Cache'] = outcome.upper()
+        return response
             
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+MAX_WHOIS_BATCH = 50
+
+@app.route('/api/whois/batch', methods=['POST'])
+def get_whois_batch():
+    """WHOIS information for up to MAX_WHOIS_BATCH URLs or domains, looked up concurrently"""
+    try:
+        data = request.json or {}
+        targets = data.get('urls') or data.get('domains') or []
+        if not isinstance(targets, list) or not targets:
+            return jsonify({'error': 'A list of urls or domains is required'}), 400
+        if len(targets) > MAX_WHOIS_BATCH:
+            return jsonify({'error': f'At most {MAX_WHOIS_BATCH} lookups per batch'}), 400
+
+        extractor = get_extractor()
+        domains = {}
+        for target in targets:
+            target = str(target)
+            host = extractor.host(target if '://' in target else f'http://{target}')
+            domains[target] = extractor.registrable_domain(host)
+
+        results = get_whois_service().lookup_many([d for d in domains.values() if d])
+        return jsonify({
+            target: results[domain] if domain else {'error': 'Could not extract a domain'}
+            for target, domain in domains.items()
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/export-pdf', methods=['GET'])
 def export_pdf():
     """Export analysis data as PDF"""
@@ -719,16 +660,8 @@ def export_pdf():
         if not analysis_id:
             return jsonify({'error': 'Analysis ID required'}), 400
             
-        # Load history
-        history_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../data/history.json')
-        if not os.path.exists(history_path):
-            return jsonify({'error': 'No history found'}), 404
-            
-        with open(history_path, 'r') as f:
-            history = json.load(f)
-        
         # Find the analysis
-        analysis = next((a for a in history if a['id'] == analysis_id), None)
+        analysis = get_store().get(analysis_id)
         
         if not analysis:
             return jsonify({'error': 'Analysis not found'}), 404
@@ -832,5 +765,8 @@ if __name__ == '__main__':
     # Create data directory if not exists
     os.makedirs(os.path.join(os.path.dirname(os.path.abspath(__file__)), '../data'), exist_ok=True)
     
+    # Only the server process prunes and compacts the history log
+    get_store().start_compactor(on_delete=delete_request_tables)
+
     # Start Flask server
     socketio.run(app, host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
@@ -0,0 +1,291 @@
+# backend/batch.py
+"""Offline bulk analysis of recorded traffic (HAR and NDJSON files).
+
+Usage (from backend/, like the other scripts here, since imports are flat):
+    python batch.py <file-or-directory> [...] [--workers N] [--flush-every N] [--dry-run]
+
+Files are streamed entry by entry rather than parsed whole, mapped to the log
+schema the detector and SecurityAnalyzer read, analyzed in a process pool and
+written to the history store in bulk. A dry run writes nothing: no history,
+no request tables and no fitted models.
+"""
+import argparse
+import datetime
+import json
+import logging
+import os
+import re
+import sys
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from capture_ingest import normalize_capture_record
+from detector import detect_anomalies
+from model_registry import ModelRegistry
+from pipeline import AnalysisContext, default_pipeline
+from request_log import write_requests
+
+HAR_EXTENSIONS = ('.har',)
+NDJSON_EXTENSIONS = ('.ndjson', '.jsonl')
+ENTRIES_KEY = re.compile(r'"entries"\s*:\s*\[')
+READ_CHUNK = 1 << 20
+
+# Used when a HAR entry carries no browser-assigned _resourceType
+MIME_RESOURCE_TYPES = [
+    ('text/html', 'document'),
+    ('javascript', 'script'),
+    ('ecmascript', 'script'),
+    ('text/css', 'stylesheet'),
+    ('image/', 'image'),
+    ('font', 'font'),
+    ('json', 'xhr'),
+    ('xml', 'xhr')
+]
+
+
+def iter_har_entries(path, chunk_size=READ_CHUNK):
+    """Yield the objects of a HAR file's log.entries array one at a time.
+
+    Only the entry being decoded is held in memory, so large HAR files with
+    embedded response bodies can be processed in bounded memory.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        buffer = ''
+        while True:
+            match = ENTRIES_KEY.search(buffer)
+            if match:
+                buffer = buffer[match.end():]
+                break
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            # Keep a short tail in case the key straddles two chunks
+            buffer = buffer[-64:] + chunk
+
+        pos = 0
+        while True:
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                pos += 1
+            if pos < len(buffer) and buffer[pos] == ']':
+                return
+            try:
+                entry, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # Read at least as much again as is pending, so an entry spanning
+                # many chunks is re-decoded a logarithmic number of times
+                chunk = f.read(max(chunk_size, len(buffer) - pos))
+                if not chunk:
+                    raise ValueError(f"Truncated HAR entries array in {path}")
+                buffer = buffer[pos:] + chunk
+                pos = 0
+                continue
+            yield entry
+
+
+def iter_ndjson_records(path):
+    """Yield one record per non-empty line of an NDJSON file"""
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                logging.getLogger(__name__).warning(f"Skipping malformed line {number} in {path}")
+
+
+def _header_dict(headers):
+    """HAR name/value header lists as a lower-cased dict, repeats newline-joined like captures"""
+    if isinstance(headers, dict):
+        return {str(k).lower(): v for k, v in headers.items()}
+    result = {}
+    for header in headers or []:
+        if isinstance(header, dict):
+            name = header.get('name', '').lower()
+            value = header.get('value', '')
+            result[name] = f"{result[name]}\n{value}" if name in result else value
+    return result
+
+
+def _epoch_ms(started):
+    try:
+        return int(datetime.datetime.fromisoformat(started).timestamp() * 1000)
+    except (TypeError, ValueError):
+        return None
+
+
+def guess_resource_type(mime_type):
+    mime_type = (mime_type or '').lower()
+    for fragment, resource_type in MIME_RESOURCE_TYPES:
+        if fragment in mime_type:
+            return resource_type
+    return 'other'
+
+
+def har_entry_to_log(entry):
+    """Map one HAR entry to the log record shape detect_anomalies and SecurityAnalyzer read"""
+    request = entry.get('request') or {}
+    response = entry.get('response') or {}
+    content = response.get('content') or {}
+    response_headers = _header_dict(response.get('headers'))
+    content_type = content.get('mimeType') or response_headers.get('content-type') or ''
+    elapsed = entry.get('time')
+    size = content.get('size')
+    return {
+        'url': request.get('url', ''),
+        'method': request.get('method', 'GET'),
+        'resource_type': entry.get('_resourceType') or guess_resource_type(content_type),
+        # Same keys as capture_worker.js records: request headers under headers
+        'headers': _header_dict(request.get('headers')),
+        'response_headers': response_headers,
+        'timestamp': _epoch_ms(entry.get('startedDateTime')),
+        # HAR uses status 0 and time -1 for requests that never completed
+        'status_code': response.get('status') or None,
+        'duration': elapsed if elapsed is not None and elapsed >= 0 else None,
+        'response_time': elapsed if elapsed is not None and elapsed >= 0 else None,
+        'content_type': content_type,
+        'size': size if isinstance(size, (int, float)) and size >= 0 else response.get('bodySize')
+    }
+
+
+def normalize_record(record):
+    """Accept HAR entries or capture-shaped records from NDJSON files"""
+    if 'request' in record and 'response' in record:
+        return har_entry_to_log(record)
+    return normalize_capture_record(record)
+
+
+def load_logs(path):
+    """Stream a HAR or NDJSON file into a list of log records"""
+    if path.lower().endswith(HAR_EXTENSIONS):
+        return [har_entry_to_log(entry) for entry in iter_har_entries(path)]
+    return [normalize_record(record) for record in iter_ndjson_records(path) if isinstance(record, dict)]
+
+
+def page_url(logs):
+    """The first document request, which is what a live analysis would have been started with"""
+    for log in logs:
+        if log.get('resource_type') == 'document' and log.get('url'):
+            return log['url']
+    return next((log['url'] for log in logs if log.get('url')), '')
+
+
+_dry_run_registry = None
+
+
+def dry_run_detect(logs, site, rule_anomalies):
+    """detect_anomalies against the saved models, without writing or refitting any"""
+    global _dry_run_registry
+    if _dry_run_registry is None:
+        _dry_run_registry = ModelRegistry(read_only=True)
+    return detect_anomalies(logs, site, _dry_run_registry, rule_anomalies)
+
+
+def analyze_file(path, dry_run=False):
+    """Process pool entry point: returns (path, result, request_count, error)"""
+    try:
+        logs = load_logs(path)
+        if not logs:
+            return path, None, 0, 'no requests found'
+        url = page_url(logs)
+        pipeline = default_pipeline(dry_run_detect if dry_run else None)
+        context = pipeline.run(AnalysisContext(str(uuid.uuid4()), url, logs))
+        if not dry_run:
+            write_requests(context.analysis_id, logs)
+        result = context.result()
+        result['source'] = os.path.abspath(path)
+        return path, result, len(logs), None
+    except Exception as e:
+        return path, None, 0, str(e)
+
+
+def discover_files(paths):
+    """Expand directories into the HAR and NDJSON files they contain"""
+    extensions = HAR_EXTENSIONS + NDJSON_EXTENSIONS
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                for name in sorted(names):
+                    if name.lower().endswith(extensions):
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+
+def run_batch(paths, workers=None, flush_every=100, store=None):
+    """Analyze files across a process pool, saving results in bulk; returns run statistics.
+
+    Without a store nothing is written anywhere (a dry run).
+    """
+    files = list(discover_files(paths))
+    pending = []
+    stats = {'files': len(files), 'analyzed': 0, 'failed': 0, 'requests': 0, 'anomalies': 0}
+    started = time.perf_counter()
+
+    def flush():
+        if store is not None and pending:
+            store.add_many(pending)
+        pending.clear()
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Keep at most two files per worker in flight, so memory stays bounded
+        # by the window and the flush size rather than the file count
+        window = 2 * (workers or os.cpu_count() or 1)
+        remaining = iter(files)
+        in_flight = set()
+        while True:
+            for path in remaining:
+                in_flight.add(executor.submit(analyze_file, path, store is None))
+                if len(in_flight) >= window:
+                    break
+            if not in_flight:
+                break
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                path, result, requests, error = future.result()
+                if error:
+                    stats['failed'] += 1
+                    print(f"Skipped {path}: {error}", file=sys.stderr)
+                    continue
+                stats['analyzed'] += 1
+                stats['requests'] += requests
+                stats['anomalies'] += result['anomalies_found']
+                pending.append(result)
+                if len(pending) >= flush_every:
+                    flush()
+    flush()
+
+    elapsed = time.perf_counter() - started
+    stats['seconds'] = round(elapsed, 3)
+    stats['files_per_sec'] = round(len(files) / elapsed, 2) if elapsed else 0.0
+    stats['requests_per_sec'] = round(stats['requests'] / elapsed, 2) if elapsed else 0.0
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Analyze HAR / NDJSON traffic files offline')
+    parser.add_argument('paths', nargs='+', help='files or directories to analyze')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: CPU count)')
+    parser.add_argument('--flush-every', type=int, default=100, help='results per bulk history write')
+    parser.add_argument('--dry-run', action='store_true', help='analyze without saving to history')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    store = None
+    if not args.dry_run:
+        from storage import get_store
+        store = get_store()
+
+    stats = run_batch(args.paths, workers=args.workers, flush_every=args.flush_every, store=store)
+    print(
+        f"Analyzed {stats['analyzed']}/{stats['files']} files ({stats['failed']} failed), "
+        f"{stats['requests']} requests, {stats['anomalies']} anomalies in {stats['seconds']}s: "
+        f"{stats['files_per_sec']} files/sec, {stats['requests_per_sec']} requests/sec"
+    )
+    return 1 if stats['failed'] and not stats['analyzed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
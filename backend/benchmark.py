@@ -0,0 +1,209 @@
+# backend/benchmark.py
+"""Micro-benchmarks for hot paths of the analysis pipeline.
+
+Usage: python benchmark.py <name> [rows ...]
+"""
+import datetime
+import json
+import math
+import random
+import sys
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from detector import materialize_anomalies
+from pipeline import AnalysisContext, default_pipeline
+from security_analyzer import SecurityAnalyzer
+from serializer import dumps
+
+RESOURCE_TYPES = ['document', 'script', 'stylesheet', 'image', 'xhr', 'font']
+
+
+def synthetic_logs(rows, seed=42):
+    """Capture-shaped log records with a realistic mix of hosts, types and timings"""
+    rng = random.Random(seed)
+    start = 1700000000000
+    logs = []
+    for i in range(rows):
+        host = f'cdn{rng.randint(0, 20)}.example.com'
+        logs.append({
+            'url': f'https://{host}/assets/{rng.randint(0, rows // 10 + 1)}.js',
+            'method': 'GET',
+            'resource_type': rng.choice(RESOURCE_TYPES),
+            'headers': {'accept': '*/*', 'user-agent': 'Mozilla/5.0'},
+            'timestamp': start + i * 15,
+            'status_code': rng.choice([200] * 40 + [304, 404, 500]),
+            'duration': rng.expovariate(1 / 250),
+            'content_type': 'application/javascript'
+        })
+    return logs
+
+
+def timed(fn, *args, repeat=3):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def _legacy_materialize(anomalies):
+    """The iterrows + per-row classification path detect_anomalies used to take"""
+    result = []
+    for _, row in anomalies.iterrows():
+        anomaly_info = row.to_dict()
+        if 400 <= row['status_code'] < 500:
+            anomaly_info['anomaly_type'] = 'client_error'
+        elif 500 <= row['status_code'] < 600:
+            anomaly_info['anomaly_type'] = 'server_error'
+        elif 'duration' in row and row['duration'] > 5000:
+            anomaly_info['anomaly_type'] = 'slow_request'
+        else:
+            anomaly_info['anomaly_type'] = 'statistical_outlier'
+        result.append(anomaly_info)
+    return result
+
+
+def scored_frame(rows):
+    """A DataFrame shaped like detect_anomalies' after scoring, with every row an outlier"""
+    logs = synthetic_logs(rows)
+    df = pd.DataFrame(logs)
+    public_columns = list(df.columns)
+    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+    df['hour'] = df['timestamp'].dt.hour
+    df['minute'] = df['timestamp'].dt.minute
+    df['domain'] = df['url'].str.split('/').str[2]
+    df['domain_count'] = df.groupby('domain')['domain'].transform('count')
+    df['resource_type_count'] = df.groupby('resource_type')['resource_type'].transform('count')
+    df['log_duration'] = np.log1p(df['duration'])
+    df['anomaly_score'] = -1
+    df['anomaly_confidence'] = -np.random.default_rng(0).random(rows)
+    return df, public_columns
+
+
+def bench_materialize(rows):
+    df, public_columns = scored_frame(rows)
+    legacy, _ = timed(_legacy_materialize, df, repeat=1)
+    current, _ = timed(materialize_anomalies, df, public_columns)
+    return legacy, current
+
+
+def synthetic_capture(rows, requests_per_page=200, seed=42):
+    """Multi-page captures: each HTTPS document followed by its subresources, some over HTTP"""
+    rng = random.Random(seed)
+    logs = []
+    page = None
+    for i in range(rows):
+        if i % requests_per_page == 0:
+            page = f'https://site{i // requests_per_page}.example.com/'
+            logs.append({'url': page, 'resource_type': 'document', 'headers': {'content-type': 'text/html'}})
+            continue
+        scheme = 'http' if rng.random() < 0.02 else 'https'
+        library = rng.choice(['jquery-1.12.4.min.js', 'app.js', 'vendor.js', 'angular-1.0.8.js'])
+        logs.append({
+            'url': f'{scheme}://cdn{rng.randint(0, 20)}.example.com/{i}/{library}',
+            'resource_type': rng.choice(RESOURCE_TYPES[1:]),
+            'headers': {'referer': page}
+        })
+    return logs
+
+
+LEGACY_PATTERNS = [
+    {'pattern': 'jquery-1.', 'name': 'jQuery 1.x'},
+    {'pattern': 'jquery-2.0.', 'name': 'jQuery 2.0.x'},
+    {'pattern': 'angular-1.0.', 'name': 'AngularJS 1.0.x'},
+]
+
+
+def _legacy_security(logs):
+    """The per-check full scans, with mixed content rescanning every request per HTTPS page"""
+    issues = []
+    for log in [log for log in logs if log.get('resource_type') == 'document']:
+        headers = log.get('headers', {})
+        missing = [h for h in ('content-security-policy', 'x-xss-protection', 'x-content-type-options',
+                               'strict-transport-security') if not headers.get(h)]
+        if missing:
+            issues.append({'type': 'missing_security_headers', 'url': log.get('url'), 'missing_headers': missing})
+    https_pages = [log for log in logs if log.get('url', '').startswith('https://') and log.get('resource_type') == 'document']
+    for page in https_pages:
+        http_resources = [log for log in logs
+                          if log.get('url', '').startswith('http://') and
+                          not log.get('url', '').startswith('https://')]
+        if http_resources:
+            issues.append({'type': 'mixed_content', 'url': page.get('url'), 'count': len(http_resources)})
+    for js in [log for log in logs if log.get('resource_type') == 'script']:
+        for vuln in LEGACY_PATTERNS:
+            if vuln['pattern'] in js.get('url', ''):
+                issues.append({'type': 'vulnerable_library', 'url': js.get('url', ''), 'library': vuln['name']})
+    return issues
+
+
+def bench_security(rows):
+    logs = synthetic_capture(rows)
+    # The legacy path is quadratic; past this size it takes minutes
+    legacy = timed(_legacy_security, logs, repeat=1)[0] if rows <= 20000 else None
+    current, _ = timed(SecurityAnalyzer().analyze_security, logs)
+    return legacy, current
+
+
+def _legacy_sanitize(data):
+    """The recursive copy results went through before being encoded"""
+    if isinstance(data, dict):
+        return {k: _legacy_sanitize(v) for k, v in data.items()}
+    elif isinstance(data, list):
+        return [_legacy_sanitize(x) for x in data]
+    elif isinstance(data, (datetime.datetime, datetime.date)):
+        return data.isoformat()
+    elif hasattr(data, 'timestamp') and callable(data.timestamp):
+        return data.timestamp()
+    elif hasattr(data, '__dict__'):
+        return _legacy_sanitize(data.__dict__)
+    elif data == "NaN" or (isinstance(data, float) and math.isnan(data)):
+        return None
+    elif not isinstance(data, (str, int, float, bool, type(None))):
+        return str(data)
+    return data
+
+
+def _legacy_serialize(result):
+    return json.dumps(_legacy_sanitize(result), indent=2, default=str)
+
+
+def bench_serialize(rows):
+    """Encode the stored result of a `rows`-request analysis"""
+    logs = synthetic_logs(rows)
+    context = default_pipeline().run(AnalysisContext(str(uuid.uuid4()), 'https://example.com/', logs))
+    result = context.result()
+    legacy, _ = timed(_legacy_serialize, result)
+    current, _ = timed(dumps, result)
+    return legacy, current
+
+
+BENCHMARKS = {
+    'materialize': (bench_materialize, [10000, 100000]),
+    'security': (bench_security, [1000, 10000, 100000]),
+    'serialize': (bench_serialize, [10000]),
+}
+
+
+def main(argv):
+    if not argv or argv[0] not in BENCHMARKS:
+        print(f"Usage: python benchmark.py <{'|'.join(BENCHMARKS)}> [rows ...]")
+        return 1
+    bench, default_rows = BENCHMARKS[argv[0]]
+    for rows in [int(r) for r in argv[1:]] or default_rows:
+        legacy, current = bench(rows)
+        compared = f"legacy={legacy * 1000:9.1f}ms" if legacy is not None else f"legacy={'skipped':>11}"
+        speedup = f"speedup={legacy / current:6.1f}x" if legacy is not None else ''
+        print(f"{argv[0]:>12} rows={rows:<8} {compared} current={current * 1000:9.1f}ms "
+              f"per_row={current / rows * 1e6:6.2f}us {speedup}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
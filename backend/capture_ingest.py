@@ -0,0 +1,122 @@
+# backend/capture_ingest.py
+import json
+import logging
+import os
+import time
+
+import pandas as pd
+
+from detector import detect_rule_anomalies
+from domains import get_extractor
+
+CAPTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../data/captures')
+
+
+def capture_paths(analysis_id, captures_dir=CAPTURES_DIR):
+    """Per-analysis (records NDJSON, screenshot PNG) paths"""
+    os.makedirs(captures_dir, exist_ok=True)
+    return (
+        os.path.join(captures_dir, f'{analysis_id}.ndjson'),
+        os.path.join(captures_dir, f'{analysis_id}.png')
+    )
+
+
+def normalize_capture_record(record):
+    """Rename capture-worker keys to the log schema the detector and analyzers read.
+
+    Browser captures report the request type as `resourceType`; everything
+    downstream groups and filters on `resource_type`.
+    """
+    if 'resource_type' not in record and 'resourceType' in record:
+        record['resource_type'] = record.pop('resourceType')
+    return record
+
+
+def follow_ndjson(path, finished, poll_interval=0.05, batch_size=500, checkpoint=None):
+    """Tail an NDJSON file that another process is still appending to.
+
+    Yields lists of parsed records as complete lines arrive. `finished()`
+    signals that the writer is done; the remaining lines are drained and
+    the generator ends. A trailing partial line is held back until its
+    newline arrives. `checkpoint()` is called on every pass so a caller can
+    abort (by raising) while the writer is still running.
+    """
+    logger = logging.getLogger(__name__)
+    checkpoint = checkpoint or (lambda: None)
+    while not os.path.exists(path):
+        checkpoint()
+        if finished():
+            if not os.path.exists(path):
+                return
+            break
+        time.sleep(poll_interval)
+
+    with open(path, 'rb') as f:
+        pending = b''
+        while True:
+            checkpoint()
+            # Check before reading so nothing written before `finished` is missed
+            done = finished()
+            chunk = f.read(1 << 20)
+            if chunk:
+                lines = (pending + chunk).split(b'\n')
+                pending = lines.pop()
+                batch = []
+                for line in lines:
+                    if not line.strip():
+                        continue
+                    try:
+                        batch.append(json.loads(line))
+                    except ValueError:
+                        logger.warning(f"Skipping malformed capture record in {path}")
+                    if len(batch) >= batch_size:
+                        yield batch
+                        batch = []
+                if batch:
+                    yield batch
+            elif done:
+                break
+            else:
+                time.sleep(poll_interval)
+
+        if pending.strip():
+            try:
+                yield [json.loads(pending)]
+            except ValueError:
+                logger.warning(f"Dropping torn final capture record in {path}")
+
+
+class CaptureIngester:
+    """Incremental per-batch work done while a capture is still running.
+
+    Rule checks run on each micro-batch as it arrives and URL hosts are
+    parsed into the shared extractor cache, so only the statistical stage is
+    left once the capture finishes.
+    """
+
+    def __init__(self):
+        self.logs = []
+        self.rule_anomalies = []
+
+    def add(self, batch):
+        if not batch:
+            return
+        batch = [normalize_capture_record(record) for record in batch]
+        self.logs.extend(batch)
+        df = pd.DataFrame(batch)
+        self.rule_anomalies.extend(detect_rule_anomalies(df, batch))
+        if 'url' in df.columns:
+            get_extractor().netlocs(df['url'])
+
+
+def ingest_capture(path, finished, poll_interval=0.05, checkpoint=None):
+    """Follow a capture file until its writer finishes; returns the filled CaptureIngester"""
+    ingester = CaptureIngester()
+    for batch in follow_ndjson(path, finished, poll_interval=poll_interval, checkpoint=checkpoint):
+        ingester.add(batch)
+    return ingester
+
+
+def read_capture(path):
+    """Load a finished capture file in one go"""
+    return ingest_capture(path, lambda: True).logs
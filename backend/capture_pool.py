@@ -0,0 +1,315 @@
+# backend/capture_pool.py
+import atexit
+import json
+import logging
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BACKEND_DIR, '../data')
+
+NODE_WORKER_COMMAND = ['node', os.path.join(BACKEND_DIR, 'capture_worker.js')]
+FAKE_WORKER_COMMAND = [sys.executable, os.path.join(BACKEND_DIR, 'fake_capture_worker.py')]
+
+POOL_SIZE = int(os.environ.get('NAD_CAPTURE_WORKERS', 2))
+MAX_CAPTURES_PER_WORKER = int(os.environ.get('NAD_CAPTURES_PER_WORKER', 50))
+MAX_WORKER_RSS_MB = int(os.environ.get('NAD_CAPTURE_WORKER_RSS_MB', 1024))
+
+
+class CaptureError(Exception):
+    """A capture failed; `fatal` means the worker itself can no longer be trusted"""
+
+    def __init__(self, message, fatal=False):
+        super().__init__(message)
+        self.fatal = fatal
+
+
+class CaptureTimeout(CaptureError):
+    def __init__(self, message='Capture worker timed out'):
+        super().__init__(message, fatal=True)
+
+
+class CaptureWorker:
+    """One long-lived capture process and the line protocol spoken with it"""
+
+    def __init__(self, command, start_timeout=60):
+        self.command = command
+        self.start_timeout = start_timeout
+        self.logger = logging.getLogger(__name__)
+        self.captures = 0
+        self.rss = 0
+        self.process = None
+        self._lines = queue.Queue()
+
+    def start(self):
+        stderr_path = os.path.join(DATA_DIR, 'capture_worker.log')
+        os.makedirs(DATA_DIR, exist_ok=True)
+        self._stderr = open(stderr_path, 'a')
+        try:
+            self.process = subprocess.Popen(
+                self.command,
+                cwd=BACKEND_DIR,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=self._stderr,
+                text=True,
+                bufsize=1
+            )
+        except OSError as e:
+            self._stderr.close()
+            raise CaptureError(f"Could not start capture worker {self.command[0]}: {e}", fatal=True)
+        threading.Thread(target=self._read_stdout, name=f'capture-worker-{self.process.pid}', daemon=True).start()
+        try:
+            message = self._next_message(time.time() + self.start_timeout)
+            if message.get('type') != 'ready':
+                raise CaptureError(f"Unexpected first message from capture worker: {message}", fatal=True)
+        except CaptureError:
+            self.stop(timeout=1)
+            raise
+        return self
+
+    def _read_stdout(self):
+        for line in self.process.stdout:
+            self._lines.put(line)
+        self._lines.put(None)  # EOF: the worker exited
+
+    def _next_message(self, deadline):
+        while True:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                raise CaptureTimeout()
+            try:
+                line = self._lines.get(timeout=remaining)
+            except queue.Empty:
+                raise CaptureTimeout()
+            if line is None:
+                raise CaptureError(f'Capture worker exited with code {self.process.poll()}', fatal=True)
+            try:
+                return json.loads(line)
+            except ValueError:
+                self.logger.warning(f"Ignoring non-protocol output from capture worker: {line.strip()}")
+
+    def _send(self, message):
+        try:
+            self.process.stdin.write(json.dumps(message) + '\n')
+            self.process.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            raise CaptureError(f'Capture worker is gone: {e}', fatal=True)
+
+    def alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def ping(self, timeout=5):
+        """Health check; returns the worker's resident memory in bytes"""
+        request_id = str(uuid.uuid4())
+        self._send({'id': request_id, 'type': 'ping'})
+        deadline = time.time() + timeout
+        while True:
+            message = self._next_message(deadline)
+            if message.get('id') == request_id and message.get('type') == 'pong':
+                self.rss = message.get('rss', 0)
+                return self.rss
+
+    def capture(self, url, output, screenshot=None, timeout=120):
+        """Capture url, with the worker appending NDJSON records to output; returns the record count"""
+        request_id = str(uuid.uuid4())
+        self._send({
+            'id': request_id,
+            'type': 'capture',
+            'url': url,
+            'output': output,
+            'screenshot': screenshot,
+            'timeout': int(timeout * 1000)
+        })
+        self.captures += 1
+        deadline = time.time() + timeout + 10  # leave the worker time to report its own timeout
+        while True:
+            message = self._next_message(deadline)
+            if message.get('id') != request_id:
+                continue
+            if message['type'] == 'done':
+                self.rss = message.get('rss', 0)
+                return message.get('count', 0)
+            elif message['type'] == 'error':
+                raise CaptureError(message.get('message', 'Capture failed'))
+
+    def stop(self, timeout=10):
+        if self.process is None:
+            return
+        if self.alive():
+            try:
+                self._send({'type': 'shutdown'})
+                self.process.wait(timeout=timeout)
+            except (CaptureError, subprocess.TimeoutExpired):
+                self.process.kill()
+                self.process.wait()
+        self._stderr.close()
+        self.process = None
+
+
+class CapturePool:
+    """Pool of long-lived capture workers.
+
+    Workers are started lazily, checked out for one capture at a time, and
+    recycled after `max_captures` captures, when their memory (including
+    their browser's processes) grows past `max_rss_mb`, or when a capture
+    leaves them in an unknown state. No more than `size` workers are ever
+    running, counting those being started or health-checked.
+    """
+
+    def __init__(self, size=POOL_SIZE, command=None, max_captures=MAX_CAPTURES_PER_WORKER,
+                 max_rss_mb=MAX_WORKER_RSS_MB):
+        self.size = size
+        self.command = command or NODE_WORKER_COMMAND
+        self.max_captures = max_captures
+        self.max_rss_mb = max_rss_mb
+        self.logger = logging.getLogger(__name__)
+        self._idle = queue.Queue()
+        self._slots = threading.Semaphore(size)
+        self._lock = threading.Lock()
+        self._workers = set()
+        self._starting = 0
+        self._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix='capture')
+
+    def capture(self, url, output, screenshot=None, timeout=120, acquire_timeout=None):
+        """Capture url on a pooled worker into the NDJSON file output; returns the record count"""
+        worker = self._acquire(acquire_timeout)
+        healthy = False
+        try:
+            count = worker.capture(url, output, screenshot=screenshot, timeout=timeout)
+            healthy = True
+            return count
+        except CaptureError as e:
+            # Failed page loads leave the worker usable; a dead or silent one does not
+            healthy = not e.fatal and worker.alive()
+            raise
+        finally:
+            self._release(worker, healthy)
+
+    def submit_capture(self, url, output, screenshot=None, timeout=120):
+        """Start `capture` in the background; returns a concurrent.futures.Future"""
+        return self._executor.submit(self.capture, url, output, screenshot, timeout)
+
+    def health_check(self):
+        """Ping idle workers and replace any that do not answer"""
+        checked = []
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                worker.ping()
+                checked.append(worker)
+            except CaptureError as e:
+                self.logger.warning(f"Capture worker failed health check: {e}")
+                self._retire(worker)
+        for worker in checked:
+            self._idle.put(worker)
+        return {'idle': len(checked), 'workers': len(self._workers)}
+
+    def start_health_checks(self, interval=60):
+        """Run `health_check` periodically on a daemon thread"""
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.health_check()
+                except Exception as e:
+                    self.logger.error(f"Capture pool health check failed: {e}")
+
+        threading.Thread(target=run, name='capture-pool-health', daemon=True).start()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        with self._lock:
+            workers = list(self._workers)
+            self._workers.clear()
+        for worker in workers:
+            worker.stop()
+
+    def _acquire(self, timeout):
+        deadline = None if timeout is None else time.time() + timeout
+        if not self._slots.acquire(timeout=timeout):
+            raise CaptureError('No capture worker became available')
+        try:
+            while True:
+                try:
+                    worker = self._idle.get_nowait()
+                except queue.Empty:
+                    with self._lock:
+                        # An idle worker out for a health check still counts towards `size`
+                        spawn = len(self._workers) + self._starting < self.size
+                        if spawn:
+                            self._starting += 1
+                    if spawn:
+                        return self._spawn()
+                    if deadline is not None and time.time() >= deadline:
+                        raise CaptureError('No capture worker became available')
+                    # Poll so a worker retired meanwhile frees room to spawn a replacement
+                    wait = 0.5 if deadline is None else min(0.5, max(deadline - time.time(), 0))
+                    try:
+                        worker = self._idle.get(timeout=wait)
+                    except queue.Empty:
+                        continue
+                if worker.alive():
+                    return worker
+                self._retire(worker)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _spawn(self):
+        worker = None
+        try:
+            worker = CaptureWorker(self.command).start()
+            return worker
+        finally:
+            with self._lock:
+                self._starting -= 1
+                if worker is not None:
+                    self._workers.add(worker)
+
+    def _release(self, worker, healthy):
+        try:
+            if not healthy or not worker.alive():
+                self._retire(worker)
+            elif worker.captures >= self.max_captures:
+                self.logger.info(f"Recycling capture worker after {worker.captures} captures")
+                self._retire(worker)
+            elif worker.rss > self.max_rss_mb * 1024 * 1024:
+                self.logger.info(f"Recycling capture worker using {worker.rss // (1024 * 1024)}MB")
+                self._retire(worker)
+            else:
+                self._idle.put(worker)
+        finally:
+            self._slots.release()
+
+    def _retire(self, worker):
+        with self._lock:
+            self._workers.discard(worker)
+        worker.stop()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_capture_pool():
+    """Return the process-wide capture pool (NAD_CAPTURE_WORKER=fake selects the fake worker)"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                command = FAKE_WORKER_COMMAND if os.environ.get('NAD_CAPTURE_WORKER') == 'fake' else None
+                pool = CapturePool(command=command)
+                pool.start_health_checks()
+                atexit.register(pool.shutdown)
+                _pool = pool
+    return _pool
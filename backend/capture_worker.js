@@ -0,0 +1,183 @@
+// Long-lived capture worker driven by capture_pool.py.
+//
+// Speaks line-delimited JSON: one request per line on stdin, one message per
+// line on stdout. stdout is reserved for the protocol; diagnostics go to stderr.
+// Captured network records are appended, one JSON object per line, to the
+// request's `output` file as they complete so the backend can tail it.
+//
+//   in:  {"id": "...", "type": "capture", "url": "...", "output": "/path.ndjson",
+//         "screenshot": "/path.png", "timeout": 60000}
+//        {"id": "...", "type": "ping"}
+//        {"type": "shutdown"}
+//   out: {"type": "ready"}
+//        {"id": "...", "type": "done", "count": 42, "rss": 123456}
+//        {"id": "...", "type": "error", "message": "..."}
+//        {"id": "...", "type": "pong", "rss": 123456}
+//
+// `rss` is the resident memory of this worker plus the browser and every
+// process under it (renderers, GPU process), which is where page memory lives.
+const puppeteer = require('puppeteer');
+const fs = require('fs');
+const readline = require('readline');
+const { execFileSync } = require('child_process');
+
+const send = (message) => process.stdout.write(JSON.stringify(message) + '\n');
+
+// pid -> { ppid, rss in bytes } for every process, from /proc or, without it, ps
+const processTable = () => {
+  const table = new Map();
+  if (fs.existsSync('/proc/self/status')) {
+    for (const name of fs.readdirSync('/proc')) {
+      if (!/^\d+$/.test(name)) continue;
+      try {
+        const status = fs.readFileSync(`/proc/${name}/status`, 'utf8');
+        const ppid = /^PPid:\s+(\d+)/m.exec(status);
+        const rss = /^VmRSS:\s+(\d+) kB/m.exec(status);
+        table.set(Number(name), { ppid: ppid ? Number(ppid[1]) : 0, rss: rss ? Number(rss[1]) * 1024 : 0 });
+      } catch (error) {
+        // The process exited while the table was being read
+      }
+    }
+    return table;
+  }
+  const output = execFileSync('ps', ['-A', '-o', 'pid=,ppid=,rss='], { encoding: 'utf8' });
+  for (const line of output.trim().split('\n')) {
+    const [pid, ppid, rss] = line.trim().split(/\s+/).map(Number);
+    table.set(pid, { ppid, rss: rss * 1024 });
+  }
+  return table;
+};
+
+const treeRss = (browser) => {
+  let rss = process.memoryUsage().rss;
+  const root = browser.process() && browser.process().pid;
+  if (!root) return rss;
+  try {
+    const table = processTable();
+    const children = new Map();
+    for (const [pid, { ppid }] of table) {
+      if (!children.has(ppid)) children.set(ppid, []);
+      children.get(ppid).push(pid);
+    }
+    const stack = [root];
+    while (stack.length) {
+      const pid = stack.pop();
+      rss += (table.get(pid) || { rss: 0 }).rss;
+      stack.push(...(children.get(pid) || []));
+    }
+  } catch (error) {
+    console.error(`Could not measure browser memory: ${error.message}`);
+  }
+  return rss;
+};
+
+const capture = async (browser, request) => {
+  const page = await browser.newPage();
+  const output = fs.openSync(request.output, 'a');
+  const pending = new Map();
+  let count = 0;
+  let closed = false;
+
+  const emit = (record) => {
+    if (closed) return;
+    count += 1;
+    fs.writeSync(output, JSON.stringify(record) + '\n');
+  };
+
+  try {
+    await page.setRequestInterception(true);
+
+    page.on('request', req => {
+      pending.set(req, {
+        url: req.url(),
+        method: req.method(),
+        resourceType: req.resourceType(),
+        headers: req.headers(),
+        timestamp: Date.now()
+      });
+      req.continue();
+    });
+
+    // A record is complete once its response arrives, so write it right away
+    page.on('response', response => {
+      const entry = pending.get(response.request());
+      if (!entry) return;
+      pending.delete(response.request());
+      entry.status_code = response.status();
+      entry.response_headers = response.headers();
+      entry.response_time = Date.now() - entry.timestamp;
+      const contentType = response.headers()['content-type'];
+      if (contentType) {
+        entry.content_type = contentType;
+      }
+      emit(entry);
+    });
+
+    await page.goto(request.url, { waitUntil: 'networkidle2', timeout: request.timeout || 60000 });
+    if (request.screenshot) {
+      await page.screenshot({ path: request.screenshot, fullPage: true });
+    }
+
+    // Wait a bit for any additional requests to complete
+    await new Promise(resolve => setTimeout(resolve, 3000));
+
+    // Requests that never got a response are still part of the capture
+    for (const entry of pending.values()) {
+      emit(entry);
+    }
+    send({ id: request.id, type: 'done', count, rss: treeRss(browser) });
+  } finally {
+    closed = true;
+    await page.close().catch(() => {});
+    fs.closeSync(output);
+  }
+};
+
+(async () => {
+  const browser = await puppeteer.launch({
+    headless: 'new',
+    args: ['--no-sandbox', '--disable-setuid-sandbox']
+  });
+
+  // Requests are handled one at a time; the pool never sends a second
+  // capture before the first one finished.
+  let queue = Promise.resolve();
+  const lines = readline.createInterface({ input: process.stdin });
+
+  lines.on('line', line => {
+    let request;
+    try {
+      request = JSON.parse(line);
+    } catch (error) {
+      console.error(`Ignoring malformed request: ${line}`);
+      return;
+    }
+
+    queue = queue.then(async () => {
+      if (request.type === 'ping') {
+        send({ id: request.id, type: 'pong', rss: treeRss(browser) });
+      } else if (request.type === 'capture') {
+        try {
+          await capture(browser, request);
+        } catch (error) {
+          console.error(`Error capturing ${request.url}: ${error.stack}`);
+          send({ id: request.id, type: 'error', message: error.message });
+        }
+      } else if (request.type === 'shutdown') {
+        await browser.close();
+        process.exit(0);
+      }
+    });
+  });
+
+  lines.on('close', async () => {
+    await queue;
+    await browser.close();
+    process.exit(0);
+  });
+
+  send({ type: 'ready' });
+})().catch(error => {
+  console.error(`Capture worker failed to start: ${error.stack}`);
+  process.exit(1);
+});
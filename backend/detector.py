@@ -1,16 +1,30 @@
 import pandas as pd
 import numpy as np
-from sklearn.ensemble import IsolationForest
-from sklearn.preprocessing import StandardScaler
 import logging
+from model_registry import get_registry
+from domains import get_extractor
+from serializer import frame_records
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, 
                     filename='../data/detector_debug.log',
                     format='%(asctime)s - %(levelname)s - %(message)s')
 
-def detect_anomalies(logs):
-    """Detect anomalies in network logs"""
+# Feature columns of the batch statistical stage
+FEATURES = ['status_code', 'hour', 'minute', 'domain_count', 'resource_type_count']
+# Persisted models outlive the capture they were fitted on, so they leave out
+# time of day: a later capture taken at another hour is not out of distribution
+TIME_FEATURES = ['hour', 'minute']
+MODEL_FEATURES = [name for name in FEATURES if name not in TIME_FEATURES]
+DURATION_FEATURE = 'log_duration'
+
+def detect_anomalies(logs, site=None, registry=None, rule_anomalies=None):
+    """Detect anomalies in network logs
+
+    Statistical scoring uses the persisted model for `site` (the analysed
+    page's host), falling back to the global model when no site is given.
+    `rule_anomalies` skips the rule stage when it already ran during ingestion.
+    """
     logging.info(f"Processing {len(logs)} logs")
     
     # Debug first log structure
@@ -19,6 +33,7 @@ def detect_anomalies(logs):
     
     # Convert logs to DataFrame
     df = pd.DataFrame(logs)
+    public_columns = list(df.columns)
     
     # Basic validation
     if df.empty or len(df) < 5:
@@ -26,77 +41,9 @@ def detect_anomalies(logs):
         return []
     
     # Add basic anomalies regardless of statistical analysis
-    basic_anomalies = []
-    for log in logs:
-        # Check for status codes
-        status_code = log.get('status_code')
-        if status_code:
-            # Convert to int if it's a string
-            if isinstance(status_code, str):
-                try:
-                    status_code = int(status_code)
-                except ValueError:
-                    continue
-                    
-            if 400 <= status_code < 500:
-                # Add more detailed error classification
-                error_type = "client_error"
-                description = "Client error"
-                
-                if status_code == 400:
-                    error_type = "bad_request"
-                    description = "Bad request - malformed syntax"
-                elif status_code == 401:
-                    error_type = "unauthorized" 
-                    description = "Authentication required"
-                elif status_code == 403:
-                    error_type = "forbidden"
-                    description = "Access forbidden - authorization failed"
-                elif status_code == 404:
-                    error_type = "not_found" 
-                    description = "Resource not found"
-                elif status_code == 405:
-                    error_type = "method_not_allowed"
-                    description = "Method not allowed for this resource"
-                elif status_code == 429:
-                    error_type = "rate_limited"
-                    description = "Too many requests - rate limit exceeded"
-                
-                basic_anomalies.append({
-                    **log,
-                    'anomaly_type': error_type,
-                    'description': description,
-                    'severity': 'medium'
-                })
-            elif 500 <= status_code < 600:
-                # More specific server error types
-                error_type = "server_error"
-                description = f"Server error {status_code}"
-                
-                if status_code == 500:
-                    description = "Internal server error"
-                elif status_code == 502:
-                    description = "Bad gateway"
-                elif status_code == 503:
-                    description = "Service unavailable"
-                elif status_code == 504:
-                    description = "Gateway timeout"
-                
-                basic_anomalies.append({
-                    **log,
-                    'anomaly_type': error_type,
-                    'description': description,
-                    'severity': 'medium'
-                })
-        
-        # Check for slow responses
-        duration = log.get('duration') or log.get('response_time')
-        if duration and (isinstance(duration, (int, float)) and duration > 3000):  # Over 3s
-            basic_anomalies.append({
-                **log,
-                'anomaly_type': 'slow_request',
-                'timing': duration
-            })
+    if rule_anomalies is None:
+        rule_anomalies = detect_rule_anomalies(df, logs)
+    basic_anomalies = rule_anomalies
     
     if basic_anomalies:
         logging.info(f"Found {len(basic_anomalies)} basic anomalies before statistical analysis")
@@ -127,7 +74,7 @@ def detect_anomalies(logs):
             return basic_anomalies
         
         # Extract domain from URL
-        df['domain'] = df['url'].apply(lambda x: extract_domain(x))
+        df['domain'] = get_extractor().netlocs(df['url'])
         
         # Calculate request frequency per domain and resource type
         df['domain_count'] = df.groupby('domain')['domain'].transform('count')
@@ -135,59 +82,146 @@ def detect_anomalies(logs):
         
         # Calculate timing features if available
         if 'duration' in df.columns:
-            df['log_duration'] = np.log1p(df['duration'])
+            df[DURATION_FEATURE] = np.log1p(df['duration'])
         
         # Features for anomaly detection
-        features = ['status_code', 'hour', 'minute', 'domain_count', 'resource_type_count']
-        if 'log_duration' in df.columns:
-            features.append('log_duration')
-        
-        # Normalize features
-        scaler = StandardScaler()
-        scaled_features = scaler.fit_transform(df[features])
-        
-        # Train Isolation Forest with optimized parameters
-        model = IsolationForest(
-            n_estimators=100,
-            contamination=0.05,  # Adjusted based on expected anomaly rate
-            max_samples='auto',
-            random_state=42
-        )
+        features = list(MODEL_FEATURES)
+        if DURATION_FEATURE in df.columns:
+            features.append(DURATION_FEATURE)
         
-        # Predict anomalies
-        df['anomaly_score'] = model.fit_predict(scaled_features)
-        df['anomaly_confidence'] = model.score_samples(scaled_features)
+        # Score with the site's persisted scaler + Isolation Forest
+        registry = registry or get_registry()
+        df['anomaly_score'], df['anomaly_confidence'] = registry.score(site, features, df[features])
         
         # Get anomalies (outliers have score -1)
         anomalies = df[df['anomaly_score'] == -1]
         
-        # Classify anomaly types
-        result = []
-        for _, row in anomalies.iterrows():
-            anomaly_info = row.to_dict()
-            
-            # Determine anomaly type
-            if 400 <= row['status_code'] < 500:
-                anomaly_info['anomaly_type'] = 'client_error'
-            elif 500 <= row['status_code'] < 600:
-                anomaly_info['anomaly_type'] = 'server_error'
-            elif 'duration' in row and row['duration'] > 5000:  # Over 5s
-                anomaly_info['anomaly_type'] = 'slow_request'
-            else:
-                anomaly_info['anomaly_type'] = 'statistical_outlier'
-                
-            result.append(anomaly_info)
-            
-        return result
+        return materialize_anomalies(anomalies, public_columns)
     except Exception as e:
         logging.error(f"Error in statistical analysis: {e}")
         return basic_anomalies
 
+# Status codes with a more specific classification than their class default
+STATUS_RULES = {
+    400: ('bad_request', 'Bad request - malformed syntax'),
+    401: ('unauthorized', 'Authentication required'),
+    403: ('forbidden', 'Access forbidden - authorization failed'),
+    404: ('not_found', 'Resource not found'),
+    405: ('method_not_allowed', 'Method not allowed for this resource'),
+    429: ('rate_limited', 'Too many requests - rate limit exceeded'),
+    500: ('server_error', 'Internal server error'),
+    502: ('server_error', 'Bad gateway'),
+    503: ('server_error', 'Service unavailable'),
+    504: ('server_error', 'Gateway timeout'),
+}
+
+SLOW_REQUEST_MS = 3000
+
+
+def _build_status_table():
+    """Lookup arrays indexed by status_code - 400 covering every 4xx/5xx code"""
+    types = np.empty(200, dtype=object)
+    descriptions = np.empty(200, dtype=object)
+    for code in range(400, 600):
+        if code < 500:
+            default = ('client_error', 'Client error')
+        else:
+            default = ('server_error', f'Server error {code}')
+        types[code - 400], descriptions[code - 400] = STATUS_RULES.get(code, default)
+    return types, descriptions
+
+
+STATUS_TYPES, STATUS_DESCRIPTIONS = _build_status_table()
+
+
+def _numbers(column):
+    """int/float values of a log column as floats; anything else (strings included) as NaN"""
+    if pd.api.types.is_numeric_dtype(column) and not pd.api.types.is_bool_dtype(column):
+        return column.astype(float)
+    return column.map(lambda v: float(v) if isinstance(v, (int, float)) and not isinstance(v, bool) else np.nan)
+
+
+def _falsy(column):
+    """Values a `log.get(...) or ...` fallback would skip; missing fields are NaN in the frame"""
+    if pd.api.types.is_numeric_dtype(column) and not pd.api.types.is_bool_dtype(column):
+        return column.isna() | (column == 0)
+    return column.map(lambda v: v is None or v != v or not v).astype(bool)
+
+
+def detect_rule_anomalies(df, logs):
+    """Flag error status codes and slow requests with column-wise masks.
+
+    `df` must be `pd.DataFrame(logs)` so that row positions line up with
+    `logs`; the original log dicts are only touched to build the output.
+    """
+    empty = pd.Series(np.nan, index=df.index)
+
+    # Falsy status codes (None, 0, '') are skipped; unparsable strings skip the row entirely
+    raw_status = df['status_code'] if 'status_code' in df.columns else empty
+    status = pd.to_numeric(raw_status, errors='coerce').to_numpy(dtype=float)
+    present = raw_status.notna().to_numpy() & (raw_status.astype(str) != '').to_numpy()
+    unparsable = present & np.isnan(status)
+    status = np.nan_to_num(status, nan=0).astype(np.int64)
+    error_mask = (status >= 400) & (status < 600)
+
+    # duration falls back to response_time when missing or falsy; only int/float
+    # timings count, numeric strings are not converted
+    raw_duration = df['duration'] if 'duration' in df.columns else empty
+    duration = _numbers(raw_duration)
+    if 'response_time' in df.columns:
+        duration = duration.where(~_falsy(raw_duration), _numbers(df['response_time']))
+    duration = duration.to_numpy(dtype=float)
+    slow_mask = ~unparsable & (np.nan_to_num(duration, nan=0) > SLOW_REQUEST_MS)
+
+    error_rows = np.flatnonzero(error_mask)
+    slow_rows = np.flatnonzero(slow_mask)
+    if not len(error_rows) and not len(slow_rows):
+        return []
+
+    types = STATUS_TYPES[status[error_rows] - 400]
+    descriptions = STATUS_DESCRIPTIONS[status[error_rows] - 400]
+
+    # Keep log order, with a row's status anomaly ahead of its slow anomaly
+    order = np.argsort(np.concatenate([error_rows * 2, slow_rows * 2 + 1]), kind='stable')
+    records = [
+        {**logs[i], 'anomaly_type': t, 'description': d, 'severity': 'medium'}
+        for i, t, d in zip(error_rows.tolist(), types.tolist(), descriptions.tolist())
+    ]
+    records.extend(
+        {**logs[i], 'anomaly_type': 'slow_request', 'timing': logs[i].get('duration') or logs[i].get('response_time')}
+        for i in slow_rows.tolist()
+    )
+    return [records[k] for k in order.tolist()]
+
+
+STATISTICAL_SLOW_MS = 5000
+
+
+def materialize_anomalies(anomalies, public_columns):
+    """Turn scored outlier rows into JSON-ready anomaly records in one bulk conversion.
+
+    Only the original log fields plus anomaly_type/anomaly_confidence are
+    kept; engineered feature columns never leave the DataFrame.
+    """
+    status = anomalies['status_code']
+    if 'duration' in anomalies.columns:
+        duration = pd.to_numeric(anomalies['duration'], errors='coerce')
+    else:
+        duration = pd.Series(np.nan, index=anomalies.index)
+
+    anomaly_type = np.select(
+        [
+            (status >= 400) & (status < 500),
+            (status >= 500) & (status < 600),
+            duration > STATISTICAL_SLOW_MS
+        ],
+        ['client_error', 'server_error', 'slow_request'],
+        default='statistical_outlier'
+    )
+
+    return frame_records(anomalies[public_columns + ['anomaly_confidence']].assign(anomaly_type=anomaly_type))
+
+
 def extract_domain(url):
     """Extract domain from URL"""
-    try:
-        from urllib.parse import urlparse
-        parsed_url = urlparse(url)
-        return parsed_url.netloc
-    except:
-        return url
\ No newline at end of file
+    return get_extractor().netloc(url)
@@ -0,0 +1,145 @@
+# backend/domains.py
+import os
+import threading
+from functools import lru_cache
+from urllib.parse import urlsplit
+
+import pandas as pd
+
+SUFFIX_LIST_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'public_suffix_list.dat')
+
+
+def load_suffix_rules(path=SUFFIX_LIST_PATH):
+    """Parse a public suffix list into (rules, wildcards, exceptions) sets"""
+    rules, wildcards, exceptions = set(), set(), set()
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            rule = line.strip().lower()
+            if not rule or rule.startswith('//'):
+                continue
+            for variant in _idna_variants(rule):
+                if variant.startswith('!'):
+                    exceptions.add(variant[1:])
+                elif variant.startswith('*.'):
+                    wildcards.add(variant[2:])
+                else:
+                    rules.add(variant)
+    return rules, wildcards, exceptions
+
+
+def _idna_variants(rule):
+    """A rule as written plus its punycode form, since URLs carry ASCII hosts"""
+    variants = [rule]
+    if not rule.isascii():
+        prefix = '!' if rule.startswith('!') else '*.' if rule.startswith('*.') else ''
+        try:
+            variants.append(prefix + rule[len(prefix):].encode('idna').decode('ascii'))
+        except UnicodeError:
+            pass
+    return variants
+
+
+class DomainExtractor:
+    """Memoized URL -> netloc/host/registrable-domain extraction.
+
+    Captures repeat the same URLs and hosts constantly, so every parser sits
+    behind a bounded LRU cache, and `netlocs`/`hosts` parse only the unique
+    values of a column before broadcasting the results back.
+    """
+
+    def __init__(self, cache_size=65536, suffix_list_path=SUFFIX_LIST_PATH):
+        self._rules, self._wildcards, self._exceptions = load_suffix_rules(suffix_list_path)
+        self.netloc = lru_cache(maxsize=cache_size)(self._netloc)
+        self.host = lru_cache(maxsize=cache_size)(self._host)
+        self.registrable_domain = lru_cache(maxsize=cache_size)(self._registrable_domain)
+
+    def netlocs(self, urls):
+        """Vectorized `netloc` over a Series/sequence of URLs"""
+        return self._map_unique(urls, self.netloc)
+
+    def hosts(self, urls):
+        """Vectorized `host` over a Series/sequence of URLs"""
+        return self._map_unique(urls, self.host)
+
+    def registrable_domains(self, urls):
+        """Vectorized eTLD+1 of each URL's host"""
+        return self._map_unique(urls, lambda url: self.registrable_domain(self.host(url)))
+
+    def public_suffix(self, host):
+        """Longest matching public suffix of a host (falls back to its last label)"""
+        labels = host.lower().rstrip('.').split('.')
+        for i in range(len(labels)):
+            candidate = '.'.join(labels[i:])
+            if candidate in self._exceptions:
+                return '.'.join(labels[i + 1:])
+            if candidate in self._rules:
+                return candidate
+            if i + 1 < len(labels) and '.'.join(labels[i + 1:]) in self._wildcards:
+                return candidate
+        return labels[-1]
+
+    def cache_stats(self):
+        """Hit/miss counts and hit rate for each memoized parser"""
+        stats = {}
+        for name in ('netloc', 'host', 'registrable_domain'):
+            info = getattr(self, name).cache_info()
+            lookups = info.hits + info.misses
+            stats[name] = {
+                'hits': info.hits,
+                'misses': info.misses,
+                'size': info.currsize,
+                'max_size': info.maxsize,
+                'hit_rate': round(info.hits / lookups, 4) if lookups else 0.0
+            }
+        return stats
+
+    @staticmethod
+    def _map_unique(urls, parse):
+        codes, uniques = pd.factorize(pd.Series(urls, dtype=object), use_na_sentinel=False)
+        parsed = pd.Series([parse(u) for u in uniques], dtype=object)
+        return pd.Series(parsed.to_numpy()[codes], index=getattr(urls, 'index', None))
+
+    @staticmethod
+    def _netloc(url):
+        try:
+            return urlsplit(url).netloc
+        except (TypeError, ValueError, AttributeError):
+            return url
+
+    @staticmethod
+    def _host(url):
+        try:
+            return urlsplit(url).hostname or ''
+        except (TypeError, ValueError, AttributeError):
+            return ''
+
+    def _registrable_domain(self, host):
+        host = (host or '').lower().rstrip('.')
+        if not host or _is_ip(host):
+            return host
+        suffix = self.public_suffix(host)
+        if host == suffix:
+            return host
+        label = host[:-len(suffix) - 1].rsplit('.', 1)[-1]
+        return f'{label}.{suffix}'
+
+
+def _is_ip(host):
+    if ':' in host:
+        return True
+    parts = host.split('.')
+    return len(parts) == 4 and all(p.isdigit() for p in parts)
+
+
+_extractor = None
+_extractor_lock = threading.Lock()
+
+
+def get_extractor():
+    """Return the process-wide domain extractor"""
+    global _extractor
+    if _extractor is None:
+        with _extractor_lock:
+            if _extractor is None:
+                _extractor = DomainExtractor()
+    return _extractor
@@ -0,0 +1,181 @@
+# backend/exporter.py
+"""Streaming exports of analysis rows as CSV, JSON, NDJSON or Parquet.
+
+Every writer takes an iterable of row dicts and yields encoded chunks, so
+a response can be sent with chunked transfer while rows are still being
+read. Memory stays bounded by one chunk of rows whatever the export size.
+"""
+import csv
+import io
+import math
+
+from serializer import dumps
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export is optional
+    pa = None
+    pq = None
+
+PARQUET_AVAILABLE = pa is not None
+
+EXPORT_FORMATS = ('json', 'csv', 'ndjson', 'parquet')
+EXPORT_ROWS = ('anomalies', 'requests')
+CHUNK_ROWS = 1000
+
+MIMETYPES = {
+    'json': 'application/json',
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+    'parquet': 'application/vnd.apache.parquet'
+}
+
+# (header, record key, kind) per exported column; kind picks the Parquet type
+COLUMNS = {
+    'anomalies': [
+        ('URL', 'url', 'string'),
+        ('Status Code', 'status_code', 'int'),
+        ('Content Type', 'content_type', 'string'),
+        ('Response Time (ms)', 'response_time', 'float'),
+        ('Reason', 'reason', 'string')
+    ],
+    'requests': [
+        ('URL', 'url', 'string'),
+        ('Method', 'method', 'string'),
+        ('Resource Type', 'resource_type', 'string'),
+        ('Status Code', 'status_code', 'int'),
+        ('Content Type', 'content_type', 'string'),
+        ('Duration (ms)', 'duration', 'float'),
+        ('Size', 'size', 'float'),
+        ('Timestamp', 'timestamp', 'string')
+    ]
+}
+
+
+def _value(record, key):
+    if key == 'duration':
+        # duration falls back to response_time when missing or zero, as in the detector
+        return record.get('duration') or record.get('response_time')
+    if key == 'resource_type':
+        return record.get('resource_type') or record.get('resourceType')
+    return record.get(key)
+
+
+def iter_table_rows(table, chunk_rows=CHUNK_ROWS):
+    """Rows of a RequestTable, read one chunk at a time"""
+    for start in range(0, len(table), chunk_rows):
+        yield from table.slice(start, start + chunk_rows)
+
+
+def _batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def csv_chunks(rows, columns, chunk_rows=CHUNK_ROWS):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([header for header, _, _ in columns])
+    for batch in _batches(rows, chunk_rows):
+        for record in batch:
+            writer.writerow(['' if (v := _value(record, key)) is None else v for _, key, _ in columns])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def ndjson_chunks(rows, chunk_rows=CHUNK_ROWS):
+    for batch in _batches(rows, chunk_rows):
+        yield ''.join(dumps(record) + '\n' for record in batch)
+
+
+def json_array_chunks(rows, chunk_rows=CHUNK_ROWS):
+    first = True
+    yield '['
+    for batch in _batches(rows, chunk_rows):
+        encoded = ','.join(dumps(record) for record in batch)
+        yield encoded if first else ',' + encoded
+        first = False
+    yield ']\n'
+
+
+def json_document_chunks(document):
+    """A single bounded JSON document (an analysis record caps its row lists)"""
+    yield dumps(document) + '\n'
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands written bytes back to the generator draining it"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _parquet_cell(value, kind):
+    if value is None:
+        return None
+    if kind == 'string':
+        return value if isinstance(value, str) else dumps(value)
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        return None
+    return int(value) if kind == 'int' else float(value)
+
+
+def parquet_chunks(rows, columns, chunk_rows=CHUNK_ROWS):
+    """Parquet file bytes, one row group per chunk; needs pyarrow"""
+    if not PARQUET_AVAILABLE:
+        raise RuntimeError('Parquet export requires pyarrow (pip install pyarrow)')
+    types = {'string': pa.string(), 'int': pa.int64(), 'float': pa.float64()}
+    schema = pa.schema([(key, types[kind]) for _, key, kind in columns])
+    sink = _ChunkSink()
+    with pq.ParquetWriter(sink, schema) as writer:
+        for batch in _batches(rows, chunk_rows):
+            writer.write_table(pa.table(
+                {key: [_parquet_cell(_value(record, key), kind) for record in batch] for _, key, kind in columns},
+                schema=schema
+            ))
+            yield sink.drain()
+    yield sink.drain()
+
+
+def export_chunks(format_type, rows, kind, document=None):
+    """Encoded chunks of `rows` (anomaly or request dicts) in the given format.
+
+    For json, a `document` (the analysis record) is exported whole instead
+    of the rows when given.
+    """
+    if format_type == 'csv':
+        return csv_chunks(rows, COLUMNS[kind])
+    if format_type == 'ndjson':
+        return ndjson_chunks(rows)
+    if format_type == 'parquet':
+        return parquet_chunks(rows, COLUMNS[kind])
+    if document is not None:
+        return json_document_chunks(document)
+    return json_array_chunks(rows)
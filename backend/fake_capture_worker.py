@@ -0,0 +1,104 @@
+# backend/fake_capture_worker.py
+"""Browser-free stand-in for capture_worker.js.
+
+Speaks the same line-delimited JSON protocol and answers every capture with
+deterministic synthetic network records, so the capture pool can be run and
+exercised without Node.js or Chrome. Select it with NAD_CAPTURE_WORKER=fake.
+"""
+import json
+import os
+import random
+import sys
+import time
+
+RESOURCE_TYPES = ['script', 'stylesheet', 'image', 'xhr', 'font']
+
+# A 1x1 transparent PNG stands in for the page screenshot
+BLANK_PNG = bytes.fromhex(
+    '89504e470d0a1a0a0000000d4948445200000001000000010806000000'
+    '1f15c4890000000d49444154789c6360000002000100e221bc330000000049454e44ae426082'
+)
+
+
+def send(message):
+    sys.stdout.write(json.dumps(message) + '\n')
+    sys.stdout.flush()
+
+
+def rss():
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+def synthetic_records(url, count):
+    rng = random.Random(url)
+    now = int(time.time() * 1000)
+    records = [{
+        'url': url,
+        'method': 'GET',
+        'resourceType': 'document',
+        'headers': {'user-agent': 'fake-capture-worker'},
+        'timestamp': now,
+        'status_code': 200,
+        'response_headers': {'content-type': 'text/html'},
+        'response_time': rng.randint(50, 400),
+        'content_type': 'text/html'
+    }]
+    for i in range(count - 1):
+        status = rng.choice([200] * 30 + [304, 404, 500])
+        records.append({
+            'url': f"{url.rstrip('/')}/asset-{i}.js",
+            'method': 'GET',
+            'resourceType': rng.choice(RESOURCE_TYPES),
+            'headers': {'user-agent': 'fake-capture-worker'},
+            'timestamp': now + i * 10,
+            'status_code': status,
+            'response_headers': {'content-type': 'application/javascript'},
+            'response_time': rng.randint(5, 800),
+            'content_type': 'application/javascript'
+        })
+    return records
+
+
+def capture(request):
+    delay = float(os.environ.get('FAKE_CAPTURE_DELAY', 0))
+    count = int(os.environ.get('FAKE_CAPTURE_RECORDS', 40))
+    records = synthetic_records(request['url'], count)
+    with open(request['output'], 'a') as output:
+        for record in records:
+            if delay:
+                time.sleep(delay / len(records))
+            output.write(json.dumps(record) + '\n')
+            output.flush()
+    if request.get('screenshot'):
+        with open(request['screenshot'], 'wb') as f:
+            f.write(BLANK_PNG)
+    send({'id': request['id'], 'type': 'done', 'count': len(records), 'rss': rss()})
+
+
+def main():
+    send({'type': 'ready'})
+    for line in sys.stdin:
+        try:
+            request = json.loads(line)
+        except ValueError:
+            continue
+        if request.get('type') == 'ping':
+            send({'id': request.get('id'), 'type': 'pong', 'rss': rss()})
+        elif request.get('type') == 'capture':
+            if request['url'].endswith('/fail'):
+                send({'id': request['id'], 'type': 'error', 'message': 'net::ERR_NAME_NOT_RESOLVED'})
+            else:
+                capture(request)
+        elif request.get('type') == 'shutdown':
+            return
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+# backend/fingerprints.py
+"""Stable anomaly fingerprints for diffing analyses of the same site.
+
+A fingerprint identifies "the same problem" across runs: the anomaly's URL
+with volatile parts removed, its anomaly type and its status class. Two
+different anomalies on one URL get different fingerprints, while the same
+anomaly behind a cache-busting query value keeps its fingerprint.
+"""
+import hashlib
+import math
+import re
+import urllib.parse
+
+from result_cache import normalize_url
+
+# Path segments that are identifiers rather than routes: numbers, hex hashes, UUIDs
+ID_SEGMENT = re.compile(r'^(\d+|[0-9a-f]{16,}|[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})$', re.IGNORECASE)
+
+
+def fingerprint_url(url):
+    """normalize_url with identifier path segments and query values blanked"""
+    try:
+        parts = urllib.parse.urlsplit(normalize_url(url or ''))
+    except ValueError:
+        return url or ''
+    path = '/'.join(':id' if ID_SEGMENT.match(segment) else segment for segment in parts.path.split('/'))
+    keys = sorted({key for key, _ in urllib.parse.parse_qsl(parts.query, keep_blank_values=True)})
+    return urllib.parse.urlunsplit((parts.scheme, parts.netloc, path, '&'.join(keys), ''))
+
+
+def status_class(status_code):
+    """'4xx' / '5xx' style class of a status code, 'none' if there was no response"""
+    if isinstance(status_code, bool) or not isinstance(status_code, (int, float)) or math.isnan(status_code):
+        return 'none'
+    return f'{int(status_code) // 100}xx'
+
+
+def anomaly_fingerprint(anomaly):
+    key = '|'.join((
+        fingerprint_url(anomaly.get('url')),
+        str(anomaly.get('anomaly_type') or ''),
+        status_class(anomaly.get('status_code'))
+    ))
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+
+
+def fingerprint_anomalies(anomalies):
+    """Tag each anomaly with its fingerprint; returns one entry per distinct fingerprint"""
+    fingerprints = {}
+    for anomaly in anomalies:
+        fingerprint = anomaly_fingerprint(anomaly)
+        anomaly['fingerprint'] = fingerprint
+        entry = fingerprints.get(fingerprint)
+        if entry is None:
+            fingerprints[fingerprint] = {
+                'fingerprint': fingerprint,
+                'url': fingerprint_url(anomaly.get('url')),
+                'anomaly_type': anomaly.get('anomaly_type'),
+                'status_class': status_class(anomaly.get('status_code')),
+                'count': 1
+            }
+        else:
+            entry['count'] += 1
+    return list(fingerprints.values())
+
+
+def trend(runs):
+    """Classify fingerprints across runs, oldest first, relative to the newest run.
+
+    `runs` is a list of (analysis_id, fingerprint entries). Returns new
+    (only in the newest run), persisting (in the newest and an earlier run)
+    and resolved (seen before but not in the newest run) fingerprints, each
+    with the runs it was seen in.
+    """
+    seen = {}
+    for position, (analysis_id, entries) in enumerate(runs):
+        for entry in entries:
+            record = seen.get(entry['fingerprint'])
+            if record is None:
+                record = seen[entry['fingerprint']] = dict(entry, count=0, seen_in=[], first_seen=position)
+            record['count'] += entry.get('count', 1)
+            record['seen_in'].append(analysis_id)
+            record['last_seen'] = position
+
+    latest = len(runs) - 1
+    result = {'new': [], 'persisting': [], 'resolved': []}
+    for record in seen.values():
+        if record['last_seen'] != latest:
+            status = 'resolved'
+        elif record['first_seen'] == latest:
+            status = 'new'
+        else:
+            status = 'persisting'
+        record['first_seen'] = runs[record['first_seen']][0]
+        record['last_seen'] = runs[record['last_seen']][0]
+        result[status].append(record)
+    return result
@@ -0,0 +1,229 @@
+# backend/header_rules.py
+import json
+import os
+import re
+import threading
+
+HEADER_RULES_PATH = os.environ.get(
+    'NAD_HEADER_RULES', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'header_rules.json')
+)
+
+RULE_KINDS = ('required', 'forbidden', 'forbidden_value', 'pattern', 'cookie')
+COOKIE_FLAGS = ('secure', 'httponly', 'samesite')
+
+DEFAULT_ISSUE_TYPES = {
+    'forbidden': 'insecure_header',
+    'forbidden_value': 'insecure_header',
+    'pattern': 'insecure_header',
+    'cookie': 'insecure_cookie'
+}
+
+
+class HeaderMap:
+    """Case-insensitive, read-only view of one response's headers.
+
+    Names are lower-cased once on construction. Repeated headers (a list
+    value, or puppeteer's newline-joined form) keep every value, which
+    matters for Set-Cookie.
+    """
+
+    __slots__ = ('_values',)
+
+    def __init__(self, headers):
+        values = {}
+        if isinstance(headers, dict):
+            items = headers.items()
+        else:
+            # HAR-style [{"name": ..., "value": ...}] or (name, value) pairs
+            items = ((h.get('name', ''), h.get('value', '')) if isinstance(h, dict) else h for h in headers or ())
+        for name, value in items:
+            parts = value if isinstance(value, (list, tuple)) else str(value).split('\n')
+            values.setdefault(str(name).lower(), []).extend(parts)
+        self._values = values
+
+    def get(self, name, default=None):
+        """The header's value, with repeats joined by ', ' as HTTP allows"""
+        values = self._values.get(name)
+        return ', '.join(values) if values else default
+
+    def get_all(self, name):
+        return self._values.get(name, [])
+
+    def __contains__(self, name):
+        return name in self._values
+
+
+def response_headers(log):
+    """The response header dict of a log record: captures keep it in response_headers"""
+    return log.get('response_headers') or log.get('headers') or {}
+
+
+def parse_set_cookie(value):
+    """'id=1; Secure; SameSite=Lax' -> ('id', {'secure': '', 'samesite': 'Lax'})"""
+    name, _, attributes = value.partition(';')
+    flags = {}
+    for attribute in attributes.split(';'):
+        key, _, flag_value = attribute.strip().partition('=')
+        if key:
+            flags[key.lower()] = flag_value.strip()
+    return name.partition('=')[0].strip(), flags
+
+
+class HeaderRuleEngine:
+    """Evaluates declarative header rules against response headers.
+
+    Rules are grouped once by resource type, and each response's headers are
+    normalized once into a HeaderMap. Every rule that applies is then checked
+    against that map, so adding rules never adds passes over the logs.
+
+    Rule kinds:
+      required         header must be present
+      forbidden        header must be absent
+      forbidden_value  header must not have one of `values` (case-insensitive)
+      pattern          header value must match (`expect: match`) or must not
+                       match (`expect: no_match`) the regex `pattern`
+      cookie           every Set-Cookie must carry `flag` (secure, httponly, samesite);
+                       a response's cookie failures are reported as one issue
+
+    `resource_types` (default ["document"]) and `schemes` limit where a rule applies.
+    """
+
+    def __init__(self, rules):
+        self.rules = [self._compile(rule) for rule in rules]
+        self._by_type = {}
+        for rule in self.rules:
+            for resource_type in rule['resource_types']:
+                self._by_type.setdefault(resource_type, []).append(rule)
+
+    @classmethod
+    def load(cls, path=HEADER_RULES_PATH):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    @property
+    def resource_types(self):
+        return list(self._by_type)
+
+    @staticmethod
+    def _compile(rule):
+        kind = rule.get('kind')
+        if kind not in RULE_KINDS:
+            raise ValueError(f"Unknown header rule kind {kind!r} in rule {rule.get('id')}")
+        if kind == 'cookie' and rule.get('flag') not in COOKIE_FLAGS:
+            raise ValueError(f"Cookie rule {rule.get('id')} needs a flag out of {', '.join(COOKIE_FLAGS)}")
+        if kind != 'cookie' and not rule.get('header'):
+            raise ValueError(f"Header rule {rule.get('id')} needs a header")
+        compiled = dict(rule)
+        compiled['name'] = rule.get('header', 'Set-Cookie')
+        compiled['key'] = compiled['name'].lower()
+        compiled['resource_types'] = rule.get('resource_types') or ['document']
+        compiled['schemes'] = tuple(f'{scheme}://' for scheme in rule.get('schemes') or ())
+        compiled['severity'] = rule.get('severity', 'medium')
+        if kind == 'pattern':
+            compiled['regex'] = re.compile(rule['pattern'], re.IGNORECASE)
+        if kind == 'forbidden_value':
+            compiled['forbidden'] = {value.lower() for value in rule.get('values', [])}
+        return compiled
+
+    def evaluate(self, log):
+        """Return the issues raised by one log record's response headers"""
+        rules = self._by_type.get(log.get('resource_type'))
+        if not rules:
+            return []
+        url = log.get('url') or ''
+        headers = HeaderMap(response_headers(log))
+        cookies = None
+        missing_headers = []
+        cookie_failures = {}
+        issues = []
+
+        for rule in rules:
+            if rule['schemes'] and not url.startswith(rule['schemes']):
+                continue
+            kind = rule['kind']
+            if kind == 'required':
+                if not headers.get(rule['key']):
+                    missing_headers.append(rule['name'])
+                continue
+            if kind == 'cookie':
+                if cookies is None:
+                    cookies = [parse_set_cookie(value) for value in headers.get_all('set-cookie') if value.strip()]
+                issue_type = rule.get('type') or DEFAULT_ISSUE_TYPES['cookie']
+                for name, flags in cookies:
+                    if rule['flag'] not in flags:
+                        cookie_failures.setdefault(issue_type, {}).setdefault(name, []).append(rule)
+                continue
+
+            value = headers.get(rule['key'])
+            if value is None:
+                continue
+            if kind == 'forbidden':
+                failed = True
+            elif kind == 'forbidden_value':
+                failed = value.strip().lower() in rule['forbidden']
+            else:
+                matched = rule['regex'].search(value) is not None
+                failed = matched != (rule.get('expect', 'match') == 'match')
+            if failed:
+                issues.append(self._issue(rule, url, header=rule['name'], value=value,
+                                          description=rule.get('description') or
+                                          f"{rule['name']} header failed check {rule.get('id')}"))
+
+        if missing_headers:
+            issues.insert(0, {
+                'type': 'missing_security_headers',
+                'url': url,
+                'missing_headers': missing_headers,
+                'severity': self._max_severity(rule for rule in rules
+                                               if rule['kind'] == 'required' and rule['name'] in missing_headers),
+                'description': f"Missing important security headers: {', '.join(missing_headers)}"
+            })
+        for issue_type, failures in cookie_failures.items():
+            issues.append(self._cookie_issue(issue_type, url, failures))
+        return issues
+
+    def _cookie_issue(self, issue_type, url, failures):
+        """One issue for every cookie a response sets without a required flag"""
+        failed_rules = [rule for cookie_rules in failures.values() for rule in cookie_rules]
+        details = [f"{name} ({', '.join(rule['flag'] for rule in cookie_rules)})"
+                   for name, cookie_rules in failures.items()]
+        return {
+            'type': issue_type,
+            'rules': list(dict.fromkeys(rule.get('id') for rule in failed_rules)),
+            'url': url,
+            'cookies': [{'cookie': name, 'missing_flags': [rule['flag'] for rule in cookie_rules]}
+                        for name, cookie_rules in failures.items()],
+            'severity': self._max_severity(failed_rules),
+            'description': f"Cookies set without required flags: {', '.join(details)}"
+        }
+
+    @staticmethod
+    def _issue(rule, url, description, **details):
+        return {
+            'type': rule.get('type') or DEFAULT_ISSUE_TYPES[rule['kind']],
+            'rule': rule.get('id'),
+            'url': url,
+            **details,
+            'severity': rule['severity'],
+            'description': description
+        }
+
+    @staticmethod
+    def _max_severity(rules):
+        order = ['low', 'medium', 'high']
+        severities = [rule['severity'] for rule in rules]
+        return max(severities, key=lambda s: order.index(s) if s in order else 0, default='medium')
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_header_rules():
+    """Return the process-wide header rule engine, loading its rules on first use"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = HeaderRuleEngine.load()
+    return _engine
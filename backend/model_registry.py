@@ -0,0 +1,204 @@
+# backend/model_registry.py
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import joblib
+import numpy as np
+from sklearn.ensemble import IsolationForest
+from sklearn.preprocessing import StandardScaler
+
+MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../data/models')
+GLOBAL_KEY = 'global'
+
+
+class ModelRegistry:
+    """Fitted scaler + IsolationForest pairs, persisted on disk and cached in memory.
+
+    Models are keyed by site (or `GLOBAL_KEY`) and by the feature columns
+    they were trained on. Scoring only calls `score_samples`; new captures are
+    buffered and trigger a background refit once `refit_after` rows have
+    accumulated, or once at least `min_refit_rows` have and a batch has
+    drifted away from the training distribution. A refit trains on a sample
+    of the previous training rows plus the buffered ones, so one unusual
+    capture cannot replace a model on its own.
+
+    A `read_only` registry loads persisted models but never writes, buffers
+    or refits; models it has to fit live in memory only.
+    """
+
+    def __init__(self, model_dir=MODEL_DIR, max_cached=16, refit_after=5000,
+                 max_buffer_rows=50000, drift_threshold=3.0, min_refit_rows=1000, sample_rows=10000,
+                 read_only=False):
+        self.model_dir = model_dir
+        self.max_cached = max_cached
+        self.refit_after = refit_after
+        self.max_buffer_rows = max_buffer_rows
+        self.drift_threshold = drift_threshold
+        self.min_refit_rows = min_refit_rows
+        self.sample_rows = sample_rows
+        self.read_only = read_only
+        self.logger = logging.getLogger(__name__)
+        self._models = OrderedDict()
+        self._buffers = {}
+        self._refitting = set()
+        self._lock = threading.Lock()
+        if not read_only:
+            os.makedirs(model_dir, exist_ok=True)
+
+    def score(self, site, features, X):
+        """Score rows of X; returns (predictions, scores) like IsolationForest.
+
+        predictions are -1 for outliers and 1 otherwise.
+        """
+        key = self._key(site, features)
+        X = np.asarray(X, dtype=float)
+        entry = self._get(key)
+        drifted = False
+        if entry is None:
+            entry = self._fit(key, features, X)
+            self._put(key, entry)
+            self._save(key, entry)
+        elif not self.read_only:
+            drifted = self._drifted(entry, X)
+            self._buffer(key, X)
+
+        scaled = entry['scaler'].transform(X)
+        scores = entry['model'].score_samples(scaled)
+        predictions = np.where(scores < entry['model'].offset_, -1, 1)
+
+        buffered = self._buffered_rows(key)
+        if buffered >= self.refit_after or (drifted and buffered >= self.min_refit_rows):
+            self._refit_in_background(key, features, reason='drift' if drifted else 'new data')
+        return predictions, scores
+
+    def _fit(self, key, features, X):
+        started = time.time()
+        scaler = StandardScaler()
+        scaled = scaler.fit_transform(X)
+        model = IsolationForest(
+            n_estimators=100,
+            contamination=0.05,  # Adjusted based on expected anomaly rate
+            max_samples='auto',
+            random_state=42
+        )
+        model.fit(scaled)
+        self.logger.info(f"Fitted model {key} on {len(X)} rows in {time.time() - started:.2f}s")
+        return {
+            'scaler': scaler,
+            'model': model,
+            'features': list(features),
+            'n_samples': len(X),
+            'sample': self._sample(X),
+            'fitted_at': time.time()
+        }
+
+    def _sample(self, X):
+        """Up to sample_rows training rows, kept so a refit extends rather than replaces the data"""
+        if len(X) <= self.sample_rows:
+            return X
+        rng = np.random.default_rng(42)
+        return X[np.sort(rng.choice(len(X), self.sample_rows, replace=False))]
+
+    def _drifted(self, entry, X):
+        """True when a batch's feature means moved more than drift_threshold training std-devs"""
+        if len(X) == 0:
+            return False
+        scaler = entry['scaler']
+        scale = np.where(scaler.scale_ > 0, scaler.scale_, 1.0)
+        shift = np.abs((np.nanmean(X, axis=0) - scaler.mean_) / scale)
+        return bool(np.nanmax(shift) > self.drift_threshold)
+
+    def _refit_in_background(self, key, features, reason):
+        with self._lock:
+            if key in self._refitting:
+                return
+            self._refitting.add(key)
+            rows = self._buffers.pop(key, [])
+            previous = self._models.get(key)
+
+        def run():
+            try:
+                # Models saved before training samples were kept refit on the buffer alone
+                sample = previous.get('sample') if previous else None
+                X = np.vstack(([sample] if sample is not None and len(sample) else []) + rows)
+                self.logger.info(f"Refitting model {key} ({reason}, {len(X)} rows)")
+                entry = self._fit(key, features, X)
+                self._save(key, entry)
+                self._put(key, entry)
+            except Exception as e:
+                self.logger.error(f"Background refit of {key} failed: {e}")
+            finally:
+                with self._lock:
+                    self._refitting.discard(key)
+
+        threading.Thread(target=run, name=f'refit-{key}', daemon=True).start()
+
+    def _buffer(self, key, X):
+        with self._lock:
+            rows = self._buffers.setdefault(key, [])
+            rows.append(X)
+            # Drop the oldest batches once the buffer exceeds its row budget
+            while len(rows) > 1 and sum(len(r) for r in rows) > self.max_buffer_rows:
+                rows.pop(0)
+
+    def _buffered_rows(self, key):
+        with self._lock:
+            return sum(len(r) for r in self._buffers.get(key, []))
+
+    def _get(self, key):
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                return self._models[key]
+
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            entry = joblib.load(path)
+        except Exception as e:
+            self.logger.error(f"Could not load model {path}: {e}")
+            return None
+        self._put(key, entry)
+        return entry
+
+    def _put(self, key, entry):
+        with self._lock:
+            self._models[key] = entry
+            self._models.move_to_end(key)
+            while len(self._models) > self.max_cached:
+                self._models.popitem(last=False)
+
+    def _save(self, key, entry):
+        if self.read_only:
+            return
+        path = self._path(key)
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        joblib.dump(entry, tmp_path)
+        os.replace(tmp_path, path)
+
+    def _path(self, key):
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.model_dir, f'{digest}.joblib')
+
+    @staticmethod
+    def _key(site, features):
+        return f"{site or GLOBAL_KEY}|{','.join(features)}"
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """Return the process-wide model registry"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ModelRegistry()
+    return _registry
@@ -2,28 +2,202 @@
 import asyncio
 import aiohttp
 import logging
+import time
+import xml.etree.ElementTree as ET
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+import numpy as np
+
+SITEMAP_NS = '{http://www.sitemaps.org/schemas/sitemap/0.9}'
+MAX_SITEMAPS = 50  # child sitemaps fetched when expanding a sitemap index
+
+
+class TokenBucket:
+    """Async token bucket: `rate` probes per second with bursts up to `capacity`"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(rate, 1)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class LatencyStats:
+    """Per-URL probe outcomes stored in flat arrays instead of response dicts"""
+
+    def __init__(self, urls, probes_per_url):
+        self.urls = list(urls)
+        self.url_index = np.repeat(np.arange(len(self.urls), dtype=np.int32), probes_per_url)
+        self.durations = np.full(len(self.url_index), np.nan, dtype=np.float32)
+        self.status_codes = np.zeros(len(self.url_index), dtype=np.int16)  # 0 = connection error
+
+    def record(self, probe, status_code, duration):
+        self.status_codes[probe] = status_code
+        self.durations[probe] = duration
+
+    def summary(self):
+        # Group the probes by URL once instead of masking the arrays per URL
+        n = len(self.urls)
+        probes = np.bincount(self.url_index, minlength=n)
+        failed = np.bincount(self.url_index, weights=self.status_codes == 0, minlength=n).astype(int)
+        errors = failed + np.bincount(self.url_index, weights=self.status_codes >= 400, minlength=n).astype(int)
+        order = np.argsort(self.url_index, kind='stable')
+        bounds = np.cumsum(probes)[:-1]
+        results = {}
+        for i, (url, durations, statuses) in enumerate(zip(
+                self.urls, np.split(self.durations[order], bounds), np.split(self.status_codes[order], bounds))):
+            ok = durations[statuses > 0]
+            codes, counts = np.unique(statuses[statuses > 0], return_counts=True)
+            entry = {
+                'probes': int(probes[i]),
+                'errors': int(errors[i]),
+                'connection_errors': int(failed[i]),
+                'status_codes': {str(c): int(n) for c, n in zip(codes, counts)}
+            }
+            if len(ok):
+                p50, p95, p99 = np.percentile(ok, [50, 95, 99])
+                entry.update({
+                    'min': round(float(ok.min()), 2),
+                    'p50': round(float(p50), 2),
+                    'p95': round(float(p95), 2),
+                    'p99': round(float(p99), 2),
+                    'max': round(float(ok.max()), 2)
+                })
+            results[url] = entry
+        return results
+
+
+def parse_sitemap(content):
+    """Split sitemap XML into (page URLs, child sitemap URLs).
+
+    A urlset lists pages; a sitemapindex lists further sitemaps, which
+    `collect_sitemap_urls` fetches and expands.
+    """
+    root = ET.fromstring(content)
+    pages = [loc.text.strip() for loc in root.iter(f'{SITEMAP_NS}loc') if loc.text]
+    if root.tag == f'{SITEMAP_NS}sitemapindex':
+        return [], pages
+    return pages, []
+
+
+async def collect_sitemap_urls(session, sitemaps, timeout=30, max_urls=None, max_sitemaps=MAX_SITEMAPS):
+    """Fetch sitemaps breadth-first, expanding sitemap indexes, and return their page URLs"""
+    pending = list(sitemaps)
+    seen = set()
+    urls = []
+    while pending and len(seen) < max_sitemaps and (max_urls is None or len(urls) < max_urls):
+        sitemap_url = pending.pop(0)
+        if sitemap_url in seen or not sitemap_url.startswith(('http://', 'https://')):
+            continue
+        seen.add(sitemap_url)
+        async with session.get(sitemap_url, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+            response.raise_for_status()
+            pages, children = parse_sitemap(await response.read())
+        urls.extend(pages)
+        pending.extend(children)
+    return urls if max_urls is None else urls[:max_urls]
+
+
+def load_url_file(path):
+    """Read (page URLs, child sitemap URLs) from a sitemap XML file or a plain file with one URL per line"""
+    with open(path, 'rb') as f:
+        content = f.read()
+    if content.lstrip().startswith(b'<'):
+        return parse_sitemap(content)
+    lines = content.decode('utf-8').splitlines()
+    return [line.strip() for line in lines if line.strip() and not line.lstrip().startswith('#')], []
 
 class NetworkScanner:
-    def __init__(self, concurrency=5, max_requests=100, timeout=30):
+    def __init__(self, concurrency=5, max_requests=100, timeout=30, session=None):
         self.concurrency = concurrency
         self.max_requests = max_requests
         self.timeout = timeout
+        # A shared session (see scanner_service) keeps connections and DNS answers warm
+        self.session = session
         self.logger = logging.getLogger(__name__)
         
     async def scan_url(self, url):
         # Use asyncio to make concurrent requests
-        tasks = []
+        if self.session is not None:
+            return await self._scan(self.session, url)
         async with aiohttp.ClientSession() as session:
-            for _ in range(self.concurrency):
-                tasks.append(self.fetch_with_timeout(session, url))
-                
-            return await asyncio.gather(*tasks)
+            return await self._scan(session, url)
+
+    async def _scan(self, session, url):
+        tasks = []
+        for _ in range(self.concurrency):
+            tasks.append(self.fetch_with_timeout(session, url))
             
+        return await asyncio.gather(*tasks)
+            
+    async def scan_batch(self, urls, per_host_rate=5.0, per_host_burst=None):
+        """Probe many URLs, spreading up to max_requests probes evenly across them.
+
+        A global semaphore caps in-flight probes at `concurrency` and every host
+        gets its own token bucket of `per_host_rate` probes per second. Returns
+        per-URL latency percentiles and error counts.
+        """
+        if self.concurrency < 1 or self.max_requests < 1 or not per_host_rate > 0:
+            raise ValueError('concurrency, max_requests and per_host_rate must be positive')
+        if self.session is not None:
+            return await self._scan_batch(self.session, urls, per_host_rate, per_host_burst)
+        async with aiohttp.ClientSession() as session:
+            return await self._scan_batch(session, urls, per_host_rate, per_host_burst)
+
+    async def _scan_batch(self, session, urls, per_host_rate, per_host_burst):
+        urls = list(dict.fromkeys(urls))[:self.max_requests]
+        if not urls:
+            return {}
+        probes_per_url = max(self.max_requests // len(urls), 1)
+        stats = LatencyStats(urls, probes_per_url)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        buckets = defaultdict(lambda: TokenBucket(per_host_rate, per_host_burst))
+
+        async def probe(i):
+            url = stats.urls[stats.url_index[i]]
+            await buckets[urlsplit(url).netloc].acquire()
+            async with semaphore:
+                status_code, duration = await self.fetch_timing(session, url)
+            stats.record(i, status_code, duration)
+
+        # Interleave URLs so one slow host does not hold up the others' probes
+        order = np.argsort(np.tile(np.arange(probes_per_url), len(urls)), kind='stable')
+        await asyncio.gather(*(probe(int(i)) for i in order))
+        return stats.summary()
+
+    async def fetch_timing(self, session, url):
+        """Time one GET including the body; returns (status_code, duration_ms) with status 0 on connection errors"""
+        loop = asyncio.get_event_loop()
+        start_time = loop.time()
+        try:
+            async with session.get(url, timeout=aiohttp.ClientTimeout(total=self.timeout)) as response:
+                await response.read()
+                return response.status, (loop.time() - start_time) * 1000
+        except Exception as e:
+            self.logger.debug(f"Error probing {url}: {str(e)}")
+            return 0, (loop.time() - start_time) * 1000
+
     async def fetch_with_timeout(self, session, url):
         try:
-            start_time = asyncio.get_event_loop().time()
-            async with session.get(url, timeout=self.timeout) as response:
-                duration = (asyncio.get_event_loop().time() - start_time) * 1000
+            loop = asyncio.get_event_loop()
+            start_time = loop.time()
+            async with session.get(url, timeout=aiohttp.ClientTimeout(total=self.timeout)) as response:
+                # Timed like fetch_timing; reading the body also lets the connection go back to the pool
+                await response.read()
+                duration = (loop.time() - start_time) * 1000
                 # Process response
                 return {
                     'url': url,
@@ -38,4 +212,23 @@ class NetworkScanner:
                 'url': url,
                 'error': str(e),
                 'anomaly_type': 'connection_error'
-            }
\ No newline at end of file
+            }
+
+if __name__ == '__main__':
+    # Batch-probe a URL list or sitemap file: python network_scanner.py urls.txt [max_requests]
+    import json
+    import sys
+
+    logging.basicConfig(level=logging.INFO)
+    urls, sitemaps = load_url_file(sys.argv[1])
+    max_requests = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    scanner = NetworkScanner(concurrency=10, max_requests=max_requests)
+
+    async def main():
+        async with aiohttp.ClientSession() as session:
+            if sitemaps:
+                urls.extend(await collect_sitemap_urls(session, sitemaps, max_urls=max_requests))
+            scanner.session = session
+            return await scanner.scan_batch(urls)
+
+    print(json.dumps(asyncio.run(main()), indent=2))
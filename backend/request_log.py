@@ -0,0 +1,448 @@
+# backend/request_log.py
+"""Columnar on-disk storage for the full request log of each analysis.
+
+Each analysis gets a directory data/requests/<analysis_id>/ holding one
+numpy file per column plus a small meta.json:
+
+  numeric columns    float64 values (NaN = null), with a uint8 mask when some
+                     records lack the field and, when ints and floats are
+                     mixed, a uint8 flag per row marking the ints
+  everything else    dictionary-encoded: int32 codes per row (-1 = field
+                     absent), plus a dictionary of distinct JSON-encoded values
+                     stored as one byte blob and an int64 offsets array; the
+                     url column also keeps a lower-cased copy of its blob for
+                     case-insensitive substring search
+
+Every file is opened memory-mapped, so reading rows [start, stop) touches
+only those rows' codes and the dictionary entries they use. Page N of a
+million-row capture costs the same as page 1.
+
+Secondary indexes are built at write time so filtered queries do not scan
+every row: postings lists (sorted row ids per distinct value) for host,
+status code and resource type, and a sorted permutation plus per-row rank
+for duration, timestamp and status code.
+"""
+import json
+import logging
+import mmap
+import os
+import shutil
+import threading
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from domains import get_extractor
+
+REQUESTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../data/requests')
+
+META_FILE = 'meta.json'
+FORMAT_VERSION = 2
+
+POSTING_INDEXES = ('host', 'status_code', 'resource_type')
+SORT_INDEXES = ('duration', 'timestamp', 'status_code')
+SEARCHABLE_COLUMNS = ('url',)  # dictionary columns that also get a lower-cased blob for substring search
+
+# Striped locks so concurrent backfills of one analysis write its table once
+_WRITE_LOCKS = [threading.Lock() for _ in range(64)]
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _encode_numeric(values, present):
+    """(float64 column, kind, presence mask or None, int flags or None) for a numeric column"""
+    column = np.full(len(values), np.nan, dtype=np.float64)
+    ints = np.zeros(len(values), dtype=bool)
+    for i, value in enumerate(values):
+        if value is not None:
+            column[i] = value
+            ints[i] = isinstance(value, int)
+    numbers = column == column
+    if ints[numbers].all():
+        return column, 'int', (None if present.all() else present), None
+    # Mixed columns keep which rows held ints, so 200 does not come back as 200.0
+    return column, 'float', (None if present.all() else present), (ints if ints.any() else None)
+
+
+def _encode_dictionary(values, present):
+    codes = np.full(len(values), -1, dtype=np.int32)
+    index = {}
+    blobs = []
+    for i, value in enumerate(values):
+        if not present[i]:
+            continue
+        # Strings and other scalars are looked up as-is; only containers need
+        # serializing to find their dictionary entry
+        if isinstance(value, (dict, list)):
+            key = json.dumps(value, separators=(',', ':'), sort_keys=True, default=str)
+        else:
+            key = (type(value), value)
+        code = index.get(key)
+        if code is None:
+            code = index[key] = len(blobs)
+            blobs.append(json.dumps(value, separators=(',', ':'), default=str).encode('utf-8'))
+        codes[i] = code
+    offsets = np.zeros(len(blobs) + 1, dtype=np.int64)
+    if blobs:
+        np.cumsum([len(b) for b in blobs], out=offsets[1:])
+    return codes, b''.join(blobs), offsets
+
+
+def _origin(url):
+    """scheme://netloc of a URL; hosts are parsed once per origin instead of once per URL"""
+    start = url.find('//')
+    end = url.find('/', start + 2) if start >= 0 else -1
+    return url if end < 0 else url[:end]
+
+
+def _number(value):
+    return float(value) if _is_number(value) else np.nan
+
+
+def build_indexes(logs):
+    """Secondary indexes over a request list: {'postings': {...}, 'sorts': {...}}"""
+    durations = []
+    for log in logs:
+        # duration falls back to response_time when missing or zero, as in the detector
+        duration = _number(log.get('duration'))
+        if not duration or np.isnan(duration):
+            duration = _number(log.get('response_time'))
+        durations.append(duration)
+    values = {
+        'host': get_extractor().hosts(pd.Series([_origin(log.get('url') or '') for log in logs], dtype=object)).tolist(),
+        'status_code': np.array([_number(log.get('status_code')) for log in logs], dtype=np.float64),
+        'resource_type': [log.get('resource_type') or log.get('resourceType') or '' for log in logs],
+        'duration': np.array(durations, dtype=np.float64),
+        'timestamp': np.array([_number(log.get('timestamp')) for log in logs], dtype=np.float64)
+    }
+
+    postings = {}
+    for name in POSTING_INDEXES:
+        codes, uniques = pd.factorize(pd.Series(values[name], dtype=object), use_na_sentinel=False)
+        order = np.argsort(codes, kind='stable').astype(np.int32)
+        offsets = np.zeros(len(uniques) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(codes, minlength=len(uniques)), out=offsets[1:])
+        keys = [None if k is None or k != k else (int(k) if isinstance(k, float) else k) for k in uniques]
+        postings[name] = (keys, offsets, order)
+
+    sorts = {}
+    for name in SORT_INDEXES:
+        column = values[name]
+        perm = np.argsort(column, kind='stable').astype(np.int32)  # NaN (missing) sorts last
+        rank = np.empty(len(perm), dtype=np.int32)
+        rank[perm] = np.arange(len(perm), dtype=np.int32)
+        sorts[name] = (perm, column[perm], rank)
+    return {'postings': postings, 'sorts': sorts}
+
+
+def write_requests(analysis_id, logs, requests_dir=REQUESTS_DIR):
+    """Write an analysis' full request log as a columnar table; returns its directory"""
+    final_dir = os.path.join(requests_dir, analysis_id)
+    tmp_dir = os.path.join(requests_dir, f'.{analysis_id}.{uuid.uuid4().hex}.tmp')
+    os.makedirs(tmp_dir)
+    try:
+        columns = []
+        names = list(dict.fromkeys(key for log in logs for key in log))
+        for position, name in enumerate(names):
+            present = np.fromiter((name in log for log in logs), dtype=bool, count=len(logs))
+            values = [log.get(name) for log in logs]
+            prefix = os.path.join(tmp_dir, f'c{position}')
+            if all(value is None or _is_number(value) for value in values):
+                column, kind, mask, ints = _encode_numeric(values, present)
+                np.save(f'{prefix}.npy', column)
+                if mask is not None:
+                    np.save(f'{prefix}.mask.npy', mask.astype(np.uint8))
+                if ints is not None:
+                    np.save(f'{prefix}.int.npy', ints.astype(np.uint8))
+                columns.append({'name': name, 'kind': kind, 'masked': mask is not None, 'mixed': ints is not None})
+            else:
+                codes, blob, offsets = _encode_dictionary(values, present)
+                np.save(f'{prefix}.npy', codes)
+                np.save(f'{prefix}.offsets.npy', offsets)
+                with open(f'{prefix}.dict', 'wb') as f:
+                    f.write(blob)
+                if name in SEARCHABLE_COLUMNS:
+                    # Same offsets as the dictionary: lower() keeps every byte in place
+                    with open(f'{prefix}.lower', 'wb') as f:
+                        f.write(blob.lower())
+                columns.append({'name': name, 'kind': 'dict', 'distinct': len(offsets) - 1})
+
+        indexes = build_indexes(logs)
+        for name, (keys, offsets, rows) in indexes['postings'].items():
+            np.save(os.path.join(tmp_dir, f'p.{name}.offsets.npy'), offsets)
+            np.save(os.path.join(tmp_dir, f'p.{name}.rows.npy'), rows)
+        for name, arrays in indexes['sorts'].items():
+            for suffix, array in zip(('perm', 'values', 'rank'), arrays):
+                np.save(os.path.join(tmp_dir, f's.{name}.{suffix}.npy'), array)
+
+        with open(os.path.join(tmp_dir, META_FILE), 'w') as f:
+            json.dump({
+                'format': FORMAT_VERSION,
+                'rows': len(logs),
+                'columns': columns,
+                'indexes': {name: keys for name, (keys, _, _) in indexes['postings'].items()}
+            }, f)
+        if os.path.exists(final_dir):
+            shutil.rmtree(final_dir)
+        os.replace(tmp_dir, final_dir)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    return final_dir
+
+
+class RequestTable:
+    """Read-only, memory-mapped view of one analysis' request log"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, META_FILE)) as f:
+            meta = json.load(f)
+        self.rows = meta['rows']
+        self.columns = meta['columns']
+        self._data = []
+        for position, column in enumerate(self.columns):
+            prefix = os.path.join(directory, f'c{position}')
+            entry = {'values': self._load(f'{prefix}.npy')}
+            if column['kind'] == 'dict':
+                entry['offsets'] = self._load(f'{prefix}.offsets.npy')
+                entry['blob'] = self._blob(f'{prefix}.dict')
+                if os.path.exists(f'{prefix}.lower'):
+                    entry['lower'] = self._search_blob(f'{prefix}.lower')
+            else:
+                if column.get('masked'):
+                    entry['mask'] = self._load(f'{prefix}.mask.npy')
+                if column.get('mixed'):
+                    entry['ints'] = self._load(f'{prefix}.int.npy')
+            self._data.append(entry)
+        self._column_positions = {column['name']: i for i, column in enumerate(self.columns)}
+
+        if 'indexes' in meta:
+            self._postings = {
+                name: (keys, self._load(self._path(f'p.{name}.offsets.npy')), self._load(self._path(f'p.{name}.rows.npy')))
+                for name, keys in meta['indexes'].items()
+            }
+            self._sorts = {
+                name: tuple(self._load(self._path(f's.{name}.{suffix}.npy')) for suffix in ('perm', 'values', 'rank'))
+                for name in SORT_INDEXES
+            }
+        else:
+            # Tables written before secondary indexes existed: build them in memory
+            indexes = build_indexes(self.slice(0, self.rows))
+            self._postings, self._sorts = indexes['postings'], indexes['sorts']
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    @staticmethod
+    def _load(path):
+        # Empty arrays cannot be memory-mapped
+        return np.load(path, mmap_mode='r') if os.path.getsize(path) > 128 else np.load(path)
+
+    @staticmethod
+    def _blob(path):
+        if os.path.getsize(path) == 0:
+            return np.zeros(0, dtype=np.uint8)
+        return np.memmap(path, dtype=np.uint8, mode='r')
+
+    @staticmethod
+    def _search_blob(path):
+        """A read-only mmap, which bytes.find-style searches can scan without copying"""
+        if os.path.getsize(path) == 0:
+            return b''
+        with open(path, 'rb') as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self):
+        return self.rows
+
+    def column_names(self):
+        return [column['name'] for column in self.columns]
+
+    def slice(self, start, stop):
+        """Rows [start, stop) as a list of dicts"""
+        start = max(0, min(start, self.rows))
+        stop = max(start, min(stop, self.rows))
+        return self.take(slice(start, stop))
+
+    def take(self, rows):
+        """Rows by position (a slice or an array of row ids) as a list of dicts"""
+        count = len(range(*rows.indices(self.rows))) if isinstance(rows, slice) else len(rows)
+        records = [{} for _ in range(count)]
+        if not count:
+            return records
+        for column, data in zip(self.columns, self._data):
+            name = column['name']
+            values = np.asarray(data['values'][rows])
+            if column['kind'] == 'dict':
+                decoded = self._decode(data, values)
+                for record, code in zip(records, values.tolist()):
+                    if code >= 0:
+                        record[name] = decoded[code]
+                continue
+            present = np.asarray(data['mask'][rows], dtype=bool) if 'mask' in data else None
+            if 'ints' in data:
+                as_int = np.asarray(data['ints'][rows], dtype=bool).tolist()
+            else:
+                as_int = [column['kind'] == 'int'] * count
+            for i, (record, value) in enumerate(zip(records, values.tolist())):
+                if present is not None and not present[i]:
+                    continue
+                if value != value:  # NaN
+                    record[name] = None
+                else:
+                    record[name] = int(value) if as_int[i] else value
+        return records
+
+    def query(self, status_min=None, status_max=None, domain=None, resource_type=None,
+              min_duration=None, max_duration=None, url_contains=None, sort=None, start=0, stop=50):
+        """Filter and sort through the secondary indexes; returns (matching row count, rows[start:stop]).
+
+        `domain` matches a host and its subdomains. `sort` is one of
+        SORT_INDEXES, prefixed with '-' for descending; rows without a value
+        sort last either way.
+        """
+        rows = None  # None means every row, in capture order
+
+        def narrow(candidates):
+            nonlocal rows
+            rows = candidates if rows is None else np.intersect1d(rows, candidates, assume_unique=True)
+
+        if status_min is not None or status_max is not None:
+            low = float('-inf') if status_min is None else status_min
+            high = float('inf') if status_max is None else status_max
+            narrow(self._posting_rows('status_code', lambda key: key is not None and low <= key <= high))
+        if domain:
+            domain = domain.lower().strip('.')
+            narrow(self._posting_rows('host', lambda key: bool(key) and (key == domain or key.endswith('.' + domain))))
+        if resource_type:
+            narrow(self._posting_rows('resource_type', lambda key: key == resource_type))
+        if min_duration is not None or max_duration is not None:
+            perm, values, _ = self._sorts['duration']
+            low = 0 if min_duration is None else np.searchsorted(values, min_duration, side='left')
+            high = np.searchsorted(values, np.inf if max_duration is None else max_duration, side='right')
+            narrow(np.sort(np.asarray(perm[low:high])))
+        if url_contains:
+            codes = self._url_codes_containing(url_contains)
+            url_codes = self._data[self._column_positions['url']]['values'] if 'url' in self._column_positions else None
+            if url_codes is None:
+                rows = np.zeros(0, dtype=np.int32)
+            elif rows is None:
+                rows = np.flatnonzero(np.isin(url_codes, codes)).astype(np.int32)
+            else:
+                rows = rows[np.isin(np.asarray(url_codes[rows]), codes)]
+
+        total = self.rows if rows is None else len(rows)
+        start = max(0, min(start, total))
+        stop = max(start, min(stop, total))
+        if sort:
+            descending = sort.startswith('-')
+            key = sort.lstrip('-')
+            if key not in self._sorts:
+                raise ValueError(f"Cannot sort by {key!r}; choose one of {', '.join(SORT_INDEXES)}")
+            perm, values, rank = self._sorts[key]
+            if rows is None:
+                # Read the page straight out of the sorted permutation
+                positions = np.arange(start, stop)
+                if descending:
+                    valued = int(np.count_nonzero(~np.isnan(values)))
+                    positions = np.where(positions < valued, valued - 1 - positions, positions)
+                page = np.asarray(perm[positions])
+            else:
+                ranks = np.asarray(rank[rows])
+                order = np.argsort(ranks, kind='stable')
+                if descending:
+                    valued = ~np.isnan(np.asarray(values[ranks[order]]))
+                    order = np.concatenate([order[valued][::-1], order[~valued]])
+                page = rows[order[start:stop]]
+        else:
+            page = slice(start, stop) if rows is None else rows[start:stop]
+        return total, self.take(page)
+
+    def _posting_rows(self, name, accept):
+        """Sorted row ids whose indexed value satisfies accept(key)"""
+        keys, offsets, rows = self._postings[name]
+        parts = [np.asarray(rows[offsets[i]:offsets[i + 1]]) for i, key in enumerate(keys) if accept(key)]
+        if not parts:
+            return np.zeros(0, dtype=np.int32)
+        return np.sort(np.concatenate(parts)) if len(parts) > 1 else parts[0]
+
+    def _url_codes_containing(self, needle):
+        """Dictionary codes of URLs containing needle (case-insensitive), found by searching the raw dictionary blob"""
+        position = self._column_positions.get('url')
+        if position is None or self.columns[position]['kind'] != 'dict':
+            return np.zeros(0, dtype=np.int32)
+        data = self._data[position]
+        if 'lower' not in data:
+            # Tables written before the lower-cased blob existed: build it once per table
+            data['lower'] = bytes(data['blob']).lower()
+        blob = data['lower']
+        pattern = json.dumps(needle.lower())[1:-1].encode('utf-8')
+        offsets = np.asarray(data['offsets'])
+        hits = []
+        found = blob.find(pattern)
+        while found != -1:
+            code = int(np.searchsorted(offsets, found, side='right')) - 1
+            hits.append(code)
+            # Continue from the next dictionary entry
+            found = blob.find(pattern, int(offsets[code + 1]))
+        return np.array(hits, dtype=np.int32)
+
+    @staticmethod
+    def _decode(data, codes):
+        """Decode only the dictionary entries these codes reference"""
+        offsets, blob = data['offsets'], data['blob']
+        used = np.unique(codes[codes >= 0])
+        if not len(used):
+            return {}
+        starts = np.asarray(offsets[used])
+        ends = np.asarray(offsets[used + 1])
+        # Entries of neighbouring rows sit close together in the blob: read the
+        # span covering them once and parse every entry in one json.loads
+        low, high = int(starts[0]), int(ends[-1])
+        if high - low <= max(4 * int((ends - starts).sum()), 1 << 16):
+            block = bytes(blob[low:high])
+            pieces = [block[s:e] for s, e in zip((starts - low).tolist(), (ends - low).tolist())]
+        else:
+            pieces = [bytes(blob[s:e]) for s, e in zip(starts.tolist(), ends.tolist())]
+        return dict(zip(used.tolist(), json.loads(b'[' + b','.join(pieces) + b']')))
+
+
+def ensure_requests(analysis_id, load_logs, requests_dir=REQUESTS_DIR):
+    """Open an analysis' request table, first writing it from load_logs() if it does not exist.
+
+    `load_logs()` returns the records to write, or None when there is no
+    such analysis. Concurrent callers for the same analysis write it once.
+    """
+    table = open_requests(analysis_id, requests_dir)
+    if table is not None:
+        return table
+    with _WRITE_LOCKS[hash(analysis_id) % len(_WRITE_LOCKS)]:
+        table = open_requests(analysis_id, requests_dir)
+        if table is None:
+            logs = load_logs()
+            if logs is None:
+                return None
+            write_requests(analysis_id, logs, requests_dir)
+            table = open_requests(analysis_id, requests_dir)
+    return table
+
+
+def delete_requests(analysis_id, requests_dir=REQUESTS_DIR):
+    """Remove an analysis' request table if it has one"""
+    shutil.rmtree(os.path.join(requests_dir, os.path.basename(analysis_id)), ignore_errors=True)
+
+
+def open_requests(analysis_id, requests_dir=REQUESTS_DIR):
+    """Open an analysis' request table, or None if it was never written"""
+    directory = os.path.join(requests_dir, os.path.basename(analysis_id))
+    if not os.path.exists(os.path.join(directory, META_FILE)):
+        return None
+    try:
+        return RequestTable(directory)
+    except (OSError, ValueError, KeyError) as e:
+        logging.getLogger(__name__).error(f"Could not open request table {directory}: {e}")
+        return None
@@ -0,0 +1,184 @@
+# backend/result_cache.py
+import os
+import threading
+import time
+import urllib.parse
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+RESULT_CACHE_TTL = float(os.environ.get('NAD_RESULT_CACHE_TTL', 600))  # seconds; 0 disables reuse
+RESULT_CACHE_SIZE = int(os.environ.get('NAD_RESULT_CACHE_SIZE', 128))
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+HIT = 'hit'
+MISS = 'miss'
+COALESCED = 'coalesced'
+
+
+def normalize_url(url):
+    """Canonical form of url so trivially different spellings share a cache entry"""
+    parts = urllib.parse.urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').rstrip('.')
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    netloc = host if port in (None, DEFAULT_PORTS.get(scheme)) else f'{host}:{port}'
+    query = urllib.parse.urlencode(sorted(urllib.parse.parse_qsl(parts.query, keep_blank_values=True)))
+    return urllib.parse.urlunsplit((scheme, netloc, parts.path or '/', query, ''))
+
+
+def cache_key(url, **options):
+    """Key for an analysis of url with the given result-affecting options"""
+    return (normalize_url(url),) + tuple(sorted(options.items()))
+
+
+class ComputationAbandoned(Exception):
+    """Raised by a compute function that stops for reasons of its own caller,
+    such as a cancelled or timed out job, rather than because the computation failed"""
+
+
+class _LeaderGone(Exception):
+    """Tells coalesced callers that the computation they joined was abandoned"""
+
+
+class ResultCache:
+    """TTL + LRU cache of analysis results with single-flight computation.
+
+    Concurrent callers asking for the same key while it is being computed
+    wait for that one computation instead of starting their own. Failed
+    computations are not cached; waiting callers receive the same exception.
+    If the computing caller abandons it (ComputationAbandoned, or an
+    interrupt), the key is released and one of the waiting callers starts
+    over instead.
+    """
+
+    def __init__(self, ttl=RESULT_CACHE_TTL, max_entries=RESULT_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._in_flight = {}  # key -> Future
+        self._lock = threading.Lock()
+        self._stats = {HIT: 0, MISS: 0, COALESCED: 0, 'forced': 0, 'errors': 0, 'abandoned': 0, 'evictions': 0}
+
+    def get_or_compute(self, key, compute, force=False, wait=None):
+        """Return (value, outcome) where outcome is 'hit', 'miss' or 'coalesced'.
+
+        `force` skips any cached value but still joins a computation already
+        in flight, since that one is fresh. `wait()` is called periodically
+        while waiting on another caller's computation and may raise to stop
+        waiting.
+        """
+        while True:
+            with self._lock:
+                if force:
+                    self._stats['forced'] += 1
+                else:
+                    value = self._lookup(key)
+                    if value is not None:
+                        self._stats[HIT] += 1
+                        return value, HIT
+                future = self._in_flight.get(key)
+                leader = future is None
+                if leader:
+                    future = self._in_flight[key] = Future()
+                    self._stats[MISS] += 1
+                else:
+                    self._stats[COALESCED] += 1
+
+            if leader:
+                return self._compute(key, future, compute), MISS
+            try:
+                return self._wait(future, wait), COALESCED
+            except _LeaderGone:
+                continue
+
+    def _compute(self, key, future, compute):
+        try:
+            value = compute()
+        except Exception as e:
+            abandoned = isinstance(e, ComputationAbandoned)
+            self._release(key, 'abandoned' if abandoned else 'errors')
+            # Only real failures are shared; an abandoned run says nothing about the result
+            future.set_exception(_LeaderGone() if abandoned else e)
+            raise
+        except BaseException:
+            self._release(key, 'abandoned')
+            future.set_exception(_LeaderGone())
+            raise
+        with self._lock:
+            self._store(key, value)
+            del self._in_flight[key]
+        future.set_result(value)
+        return value
+
+    def _release(self, key, stat):
+        with self._lock:
+            self._stats[stat] += 1
+            del self._in_flight[key]
+
+    def invalidate(self, key=None):
+        """Drop one entry, or everything when key is None"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            lookups = self._stats[HIT] + self._stats[MISS] + self._stats[COALESCED]
+            return {
+                **self._stats,
+                'hit_ratio': round((self._stats[HIT] + self._stats[COALESCED]) / lookups, 4) if lookups else 0.0,
+                'entries': len(self._entries),
+                'in_flight': len(self._in_flight),
+                'ttl': self.ttl,
+                'max_entries': self.max_entries
+            }
+
+    def _lookup(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _store(self, key, value):
+        if self.ttl <= 0 or self.max_entries <= 0:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats['evictions'] += 1
+
+    @staticmethod
+    def _wait(future, wait):
+        if wait is None:
+            return future.result()
+        while True:
+            try:
+                return future.result(timeout=0.5)
+            except FutureTimeoutError:
+                wait()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache():
+    """Return the process-wide analysis result cache"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResultCache()
+    return _cache
@@ -0,0 +1,135 @@
+# backend/scanner_service.py
+import asyncio
+import atexit
+import logging
+import os
+import threading
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+import aiohttp
+
+from network_scanner import NetworkScanner, collect_sitemap_urls
+
+# Upper bounds for caller-supplied batch scan settings
+MAX_BATCH_CONCURRENCY = int(os.environ.get('NAD_SCAN_MAX_CONCURRENCY', 50))
+MAX_BATCH_REQUESTS = int(os.environ.get('NAD_SCAN_MAX_REQUESTS', 2000))
+MAX_PER_HOST_RATE = float(os.environ.get('NAD_SCAN_MAX_PER_HOST_RATE', 50))
+BATCH_TIMEOUT = float(os.environ.get('NAD_SCAN_BATCH_TIMEOUT', 300))  # seconds for a whole batch
+
+
+class ScannerService:
+    """Process-wide owner of one background event loop and a pooled HTTP session.
+
+    Flask handlers run on ordinary threads; they hand coroutines to `submit`
+    (or call `scan_url`) and the work runs on the service's loop, reusing
+    keep-alive connections and cached DNS answers across requests.
+    """
+
+    def __init__(self, limit=100, limit_per_host=10, dns_ttl=300, keepalive_timeout=30):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.dns_ttl = dns_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self.logger = logging.getLogger(__name__)
+        self.loop = None
+        self.session = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self.loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self._run_loop, name='scanner-loop', daemon=True)
+            self._thread.start()
+            self.session = asyncio.run_coroutine_threadsafe(self._open_session(), self.loop).result()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    async def _open_session(self):
+        connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            ttl_dns_cache=self.dns_ttl,
+            use_dns_cache=True,
+            keepalive_timeout=self.keepalive_timeout
+        )
+        return aiohttp.ClientSession(connector=connector)
+
+    def submit(self, coro):
+        """Schedule a coroutine on the service loop; returns a concurrent.futures.Future"""
+        if self._thread is None:
+            self.start()
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def scan_url(self, url, concurrency=5, max_requests=100, timeout=30):
+        """Blocking helper: probe url with NetworkScanner over the shared session"""
+        if self._thread is None:
+            self.start()
+        scanner = NetworkScanner(concurrency=concurrency, max_requests=max_requests,
+                                 timeout=timeout, session=self.session)
+        return self.submit(scanner.scan_url(url)).result(timeout=timeout + 5)
+
+    def scan_batch(self, urls, concurrency=10, max_requests=100, timeout=30, per_host_rate=5.0,
+                   batch_timeout=BATCH_TIMEOUT):
+        """Blocking helper: batch-probe urls over the shared session.
+
+        Raises concurrent.futures.TimeoutError, and stops the probes, if the
+        batch takes longer than `batch_timeout` seconds.
+        """
+        if self._thread is None:
+            self.start()
+        scanner = NetworkScanner(concurrency=concurrency, max_requests=max_requests,
+                                 timeout=timeout, session=self.session)
+        future = self.submit(scanner.scan_batch(urls, per_host_rate=per_host_rate))
+        try:
+            return future.result(timeout=batch_timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise
+
+    def fetch_sitemap(self, sitemap_url, timeout=30, max_urls=MAX_BATCH_REQUESTS):
+        """Download and parse a sitemap, expanding a sitemap index, and return up to max_urls page URLs"""
+        if self._thread is None:
+            self.start()
+        future = self.submit(collect_sitemap_urls(self.session, [sitemap_url], timeout=timeout, max_urls=max_urls))
+        try:
+            return future.result(timeout=BATCH_TIMEOUT)
+        except FutureTimeoutError:
+            future.cancel()
+            raise
+
+    def shutdown(self):
+        """Close the session and stop the loop; safe to call more than once"""
+        with self._lock:
+            if self._thread is None:
+                return
+            try:
+                asyncio.run_coroutine_threadsafe(self.session.close(), self.loop).result(timeout=5)
+            except Exception as e:
+                self.logger.warning(f"Error closing scanner session: {e}")
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(timeout=5)
+            self.loop.close()
+            self._thread = None
+            self.session = None
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_scanner_service():
+    """Return the process-wide scanner service, starting it on first use"""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                service = ScannerService()
+                service.start()
+                atexit.register(service.shutdown)
+                _service = service
+    return _service
@@ -1,65 +1,119 @@
+from collections import defaultdict
+
+from header_rules import get_header_rules
+from signatures import get_signature_db
+
+SEVERITY_RANK = {'low': 1, 'medium': 2, 'high': 3, 'critical': 4}
+
+
+class TrafficIndex:
+    """Single-pass index over captured requests shared by all security checks.
+
+    Requests are grouped by resource type, by URL scheme and by the page that
+    loaded them. A request belongs to the document named by its `page` field,
+    else to the document its Referer header points at, else to the most
+    recent document captured before it.
+    """
+
+    def __init__(self, logs):
+        self.logs = logs
+        self.by_type = defaultdict(list)
+        self.by_scheme = defaultdict(list)
+        self.by_page = defaultdict(list)
+        documents = {}
+        current_page = None
+
+        for log in logs:
+            url = log.get('url') or ''
+            resource_type = log.get('resource_type')
+            self.by_type[resource_type].append(log)
+            self.by_scheme[url.partition('://')[0] if '://' in url else ''].append(log)
+
+            page = log.get('page') or self._referer(log, documents)
+            if resource_type == 'document':
+                documents.setdefault(url, log)
+                # A top-level navigation starts a new page rather than being a subresource
+                current_page = url
+                if not page or page == url:
+                    continue
+            page = page or current_page
+            if page:
+                self.by_page[page].append(log)
+
+        self.documents = list(documents.values())
+
+    @staticmethod
+    def _referer(log, documents):
+        headers = log.get('headers') or {}
+        referer = headers.get('referer') or headers.get('Referer')
+        return referer if referer in documents else None
+
+    def of_type(self, resource_type):
+        return self.by_type.get(resource_type, [])
+
+    def of_scheme(self, scheme):
+        return self.by_scheme.get(scheme, [])
+
+    def loaded_by(self, page_url, scheme=None):
+        """Requests attributed to page_url, optionally only those over `scheme`"""
+        requests = self.by_page.get(page_url, [])
+        if scheme is None:
+            return requests
+        prefix = scheme + '://'
+        return [log for log in requests if (log.get('url') or '').startswith(prefix)]
+
+
 class SecurityAnalyzer:
     """Analyzes network traffic for security issues"""
-    
+
+    def __init__(self, signature_db=None, header_rules=None):
+        self.signature_db = signature_db
+        self.header_rules = header_rules
+
     def analyze_security(self, logs):
         """Perform security analysis on network logs"""
+        index = self.index(logs)
         security_issues = []
-        
+
         # Check for missing security headers
-        security_issues.extend(self.check_security_headers(logs))
-        
+        security_issues.extend(self.check_security_headers(index))
+
         # Check for mixed content
-        security_issues.extend(self.check_mixed_content(logs))
-        
+        security_issues.extend(self.check_mixed_content(index))
+
         # Check for vulnerable libraries
-        security_issues.extend(self.check_vulnerable_libraries(logs))
-        
+        security_issues.extend(self.check_vulnerable_libraries(index))
+
         return security_issues
-        
+
+    @staticmethod
+    def index(logs):
+        """Build (or pass through) the TrafficIndex the checks run over"""
+        return logs if isinstance(logs, TrafficIndex) else TrafficIndex(logs)
+
     def check_security_headers(self, logs):
-        """Check for missing security headers in responses"""
+        """Evaluate the configured header rules against each response they apply to"""
         issues = []
-        main_page_logs = [log for log in logs if log.get('resource_type') == 'document']
-        
-        for log in main_page_logs:
-            headers = log.get('headers', {})
-            missing_headers = []
-            
-            # Check for important security headers
-            if not headers.get('content-security-policy'):
-                missing_headers.append('Content-Security-Policy')
-            
-            if not headers.get('x-xss-protection'):
-                missing_headers.append('X-XSS-Protection')
-                
-            if not headers.get('x-content-type-options'):
-                missing_headers.append('X-Content-Type-Options')
-                
-            if not headers.get('strict-transport-security'):
-                missing_headers.append('Strict-Transport-Security')
-                
-            if missing_headers:
-                issues.append({
-                    'type': 'missing_security_headers',
-                    'url': log.get('url'),
-                    'missing_headers': missing_headers,
-                    'severity': 'medium',
-                    'description': f"Missing important security headers: {', '.join(missing_headers)}"
-                })
-                
+        index = self.index(logs)
+        header_rules = self.header_rules or get_header_rules()
+
+        for resource_type in header_rules.resource_types:
+            for log in index.of_type(resource_type):
+                issues.extend(header_rules.evaluate(log))
+
         return issues
-        
+
     def check_mixed_content(self, logs):
-        """Check for mixed content (HTTP resources on HTTPS pages)"""
+        """Check for mixed content (HTTP resources loaded by HTTPS pages)"""
         issues = []
-        https_pages = [log for log in logs if log.get('url', '').startswith('https://') and log.get('resource_type') == 'document']
-        
-        for page in https_pages:
-            page_url = page.get('url')
-            http_resources = [log for log in logs 
-                            if log.get('url', '').startswith('http://') and 
-                            not log.get('url', '').startswith('https://')]
-            
+        index = self.index(logs)
+
+        for page in index.documents:
+            page_url = page.get('url') or ''
+            if not page_url.startswith('https://'):
+                continue
+            http_resources = index.loaded_by(page_url, scheme='http')
+
             if http_resources:
                 issues.append({
                     'type': 'mixed_content',
@@ -69,32 +123,41 @@ class SecurityAnalyzer:
                     'severity': 'high',
                     'description': f"Found {len(http_resources)} HTTP resources on an HTTPS page"
                 })
-                
+
         return issues
-        
+
     def check_vulnerable_libraries(self, logs):
-        """Check for known vulnerable JavaScript libraries"""
-        # This would require a database of vulnerable libraries and their signatures
-        # Simplified placeholder implementation
+        """Check scripts against the vulnerable library signature database.
+
+        Reports one issue per script and library version, at the highest
+        severity of its advisories, with every matching advisory listed in it.
+        """
         issues = []
-        js_files = [log for log in logs if log.get('resource_type') == 'script']
-        
-        vulnerable_patterns = [
-            {'pattern': 'jquery-1.', 'name': 'jQuery 1.x', 'severity': 'medium'},
-            {'pattern': 'jquery-2.0.', 'name': 'jQuery 2.0.x', 'severity': 'medium'},
-            {'pattern': 'angular-1.0.', 'name': 'AngularJS 1.0.x', 'severity': 'high'},
-        ]
-        
-        for js in js_files:
+        signature_db = self.signature_db or get_signature_db()
+
+        for js in self.index(logs).of_type('script'):
             url = js.get('url', '')
-            for vuln in vulnerable_patterns:
-                if vuln['pattern'] in url:
-                    issues.append({
-                        'type': 'vulnerable_library',
-                        'url': url,
-                        'library': vuln['name'],
-                        'severity': vuln['severity'],
-                        'description': f"Potentially vulnerable library: {vuln['name']}"
-                    })
-                    
-        return issues
\ No newline at end of file
+            libraries = {}
+            for hit in signature_db.match(url):
+                signature = hit['signature']
+                library = f"{signature['name']} {hit['version']}"
+                libraries.setdefault(library, (hit['version'], []))[1].append({
+                    'advisory': signature.get('advisory'),
+                    'severity': signature.get('severity', 'medium'),
+                    'summary': signature.get('summary')
+                })
+            for library, (version, advisories) in libraries.items():
+                names = ', '.join(a['advisory'] for a in advisories if a['advisory'])
+                issues.append({
+                    'type': 'vulnerable_library',
+                    'url': url,
+                    'library': library,
+                    'version': version,
+                    'advisory': names,
+                    'advisories': advisories,
+                    'severity': max((a['severity'] for a in advisories), key=lambda s: SEVERITY_RANK.get(s, 0)),
+                    'summary': '; '.join(a['summary'] for a in advisories if a['summary']),
+                    'description': f"Potentially vulnerable library: {library} ({names})"
+                })
+
+        return issues
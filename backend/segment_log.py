@@ -0,0 +1,160 @@
+# backend/segment_log.py
+import json
+import logging
+import os
+import re
+import threading
+
+from serializer import dumps
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None
+
+SEGMENT_PATTERN = re.compile(r'^segment-(\d{6})\.ndjson$')
+
+
+class SegmentLog:
+    """Append-only log of JSON records split across numbered NDJSON segment files.
+
+    Every record is written as a single line with one O_APPEND write, so a
+    record is either fully present or it is a torn tail that `recover` cuts off.
+    Callers address records by the (segment, offset, length) triple returned
+    from `append`.
+    """
+
+    def __init__(self, directory, max_segment_bytes=64 * 1024 * 1024, fsync=True):
+        self.directory = directory
+        self.max_segment_bytes = max_segment_bytes
+        self.fsync = fsync
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._lock_path = os.path.join(directory, '.lock')
+        self.recover()
+
+    def segments(self):
+        """Return the numbers of all segments on disk, oldest first"""
+        numbers = []
+        for name in os.listdir(self.directory):
+            match = SEGMENT_PATTERN.match(name)
+            if match:
+                numbers.append(int(match.group(1)))
+        return sorted(numbers)
+
+    def active_segment(self):
+        numbers = self.segments()
+        return numbers[-1] if numbers else 1
+
+    def segment_path(self, segment):
+        return os.path.join(self.directory, f'segment-{segment:06d}.ndjson')
+
+    def append(self, record):
+        """Append one record; returns its (segment, offset, length) address"""
+        line = dumps(record).encode('utf-8') + b'\n'
+        return self.append_encoded(line)
+
+    def append_encoded(self, line):
+        """Append a pre-encoded, newline-terminated record"""
+        return self.append_many_encoded([line])[0]
+
+    def append_many(self, records):
+        """Append several records with a single write; returns their addresses"""
+        return self.append_many_encoded(
+            [dumps(r).encode('utf-8') + b'\n' for r in records]
+        )
+
+    def append_many_encoded(self, lines):
+        if not lines:
+            return []
+        with self._lock, self._file_lock():
+            segment = self.active_segment()
+            path = self.segment_path(segment)
+            if os.path.exists(path) and os.path.getsize(path) >= self.max_segment_bytes:
+                segment += 1
+                path = self.segment_path(segment)
+
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+            try:
+                offset = os.fstat(fd).st_size
+                os.write(fd, b''.join(lines))
+                if self.fsync:
+                    os.fsync(fd)
+            finally:
+                os.close(fd)
+
+        addresses = []
+        for line in lines:
+            addresses.append((segment, offset, len(line)))
+            offset += len(line)
+        return addresses
+
+    def read_raw(self, segment, offset, length):
+        with open(self.segment_path(segment), 'rb') as f:
+            f.seek(offset)
+            return f.read(length)
+
+    def read(self, segment, offset, length):
+        """Read back the record stored at the given address"""
+        return json.loads(self.read_raw(segment, offset, length))
+
+    def scan(self, segment):
+        """Yield (offset, length, record) for every complete record in a segment"""
+        offset = 0
+        with open(self.segment_path(segment), 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                yield offset, len(line), record
+                offset += len(line)
+
+    def recover(self):
+        """Truncate a torn or corrupt tail left behind by a crash mid-append"""
+        with self._lock, self._file_lock():
+            numbers = self.segments()
+            if not numbers:
+                return
+            path = self.segment_path(numbers[-1])
+            good_end = 0
+            for offset, length, _ in self.scan(numbers[-1]):
+                good_end = offset + length
+            size = os.path.getsize(path)
+            if good_end < size:
+                self.logger.warning(f"Truncating {size - good_end} torn bytes from {path}")
+                with open(path, 'r+b') as f:
+                    f.truncate(good_end)
+                    f.flush()
+                    os.fsync(f.fileno())
+
+    def remove(self, segment):
+        if segment == self.active_segment():
+            raise ValueError('Cannot remove the active segment')
+        os.remove(self.segment_path(segment))
+
+    def _file_lock(self):
+        return _FileLock(self._lock_path)
+
+
+class _FileLock:
+    """Advisory inter-process lock so several processes can share one log"""
+
+    def __init__(self, path):
+        self.path = path
+        self.fd = None
+
+    def __enter__(self):
+        if fcntl is not None:
+            self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(self.fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if self.fd is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+            os.close(self.fd)
+            self.fd = None
@@ -0,0 +1,79 @@
+# backend/serializer.py
+"""JSON encoding of analysis results.
+
+Values that pandas and numpy produce are converted where the records are
+made: `frame_records` turns a DataFrame into dicts column by column, with
+NaN/NaT as None and numpy scalars as Python ones. `dumps` then encodes a
+result in a single pass. The encoder's `default` hook handles the few
+leftover types (numpy scalars, datetimes, Timestamps) instead of copying the
+whole structure first. Only a result that still holds a NaN or infinite
+float pays for a sanitizing copy.
+"""
+import datetime
+import json
+import math
+
+import numpy as np
+import pandas as pd
+
+
+def frame_records(frame):
+    """DataFrame rows as JSON-ready dicts, converting each column once"""
+    timestamps = {
+        column: np.datetime_as_string(frame[column].to_numpy(), unit='us')
+        for column in frame.columns if pd.api.types.is_datetime64_dtype(frame[column])
+    }
+    out = frame.assign(**timestamps) if timestamps else frame
+    # NaN/NaT become None and numpy scalars become Python scalars, column by column.
+    # The mask comes from the original frame, where NaT is still a missing value
+    out = out.astype(object).where(frame.notna(), None)
+    columns = list(out.columns)
+    values = [out[column].tolist() for column in columns]
+    return [dict(zip(columns, row)) for row in zip(*values)]
+
+
+def _default(value):
+    """Encoder hook for values the json module does not know"""
+    if isinstance(value, np.generic):
+        value = value.item()
+        return None if isinstance(value, float) and not math.isfinite(value) else value
+    if isinstance(value, np.ndarray):
+        return sanitize(value.tolist())
+    if value is pd.NaT:
+        return None
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if isinstance(value, bytes):
+        return value.decode('utf-8', errors='replace')
+    if hasattr(value, '__dict__'):
+        return vars(value)
+    return str(value)
+
+
+_COMPACT = json.JSONEncoder(separators=(',', ':'), allow_nan=False, default=_default)
+_PRETTY = json.JSONEncoder(indent=2, allow_nan=False, default=_default)
+
+
+def dumps(data, pretty=False):
+    """Encode data as JSON: compact for storage and responses, indented with pretty=True"""
+    encoder = _PRETTY if pretty else _COMPACT
+    try:
+        return encoder.encode(data)
+    except ValueError:
+        # A NaN/Infinity got past the column-level conversion, e.g. from a parsed capture
+        return encoder.encode(sanitize(data))
+
+
+def sanitize(data):
+    """Recursive copy with non-finite floats as None and other values made encodable"""
+    if isinstance(data, dict):
+        return {k: sanitize(v) for k, v in data.items()}
+    if isinstance(data, (list, tuple)):
+        return [sanitize(x) for x in data]
+    if isinstance(data, float):
+        return data if math.isfinite(data) else None
+    if data is None or isinstance(data, (str, int)):
+        return data
+    return sanitize(_default(data))
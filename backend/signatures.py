@@ -0,0 +1,229 @@
+# backend/signatures.py
+import csv
+import hashlib
+import json
+import logging
+import os
+import pickle
+import re
+import threading
+from collections import deque
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+SIGNATURES_PATH = os.environ.get('NAD_SIGNATURES', os.path.join(BACKEND_DIR, 'vulnerable_libraries.json'))
+CACHE_PATH = os.path.join(BACKEND_DIR, '../data/signatures.cache')
+
+# Bump when the compiled layout changes so stale caches are rebuilt
+CACHE_FORMAT = 1
+
+# Version right after a library token: jquery-1.12.4.min.js, jquery/3.4.1/, lodash@4.17.15
+VERSION_AFTER_TOKEN = re.compile(r'[-_.@/]v?(\d+(?:\.\d+)+)')
+# WordPress-style cache busters: jquery.min.js?ver=1.12.4
+VERSION_IN_QUERY = re.compile(r'[?&]v(?:er|ersion)?=v?(\d+(?:\.\d+)+)')
+RANGE_TERM = re.compile(r'(<=|>=|<|>|=)?\s*v?(\d+(?:\.\d+)*)(?:-[0-9A-Za-z.-]+)?')
+
+
+def parse_version(version):
+    """'1.12.4' -> (1, 12, 4); pre-release and build suffixes are ignored"""
+    core = re.split(r'[-+]', version.strip().lstrip('v'), maxsplit=1)[0]
+    parts = [int(p) for p in core.split('.') if p.isdigit()]
+    return tuple((parts + [0, 0, 0])[:3])
+
+
+def parse_range(spec):
+    """Parse a semver range like '>=1.2.0 <3.5.0 || <1.0.0' into alternatives of (op, version) terms"""
+    alternatives = []
+    for alternative in spec.split('||'):
+        terms = [(op or '=', parse_version(version)) for op, version in RANGE_TERM.findall(alternative)]
+        if terms:
+            alternatives.append(terms)
+    return alternatives
+
+
+def version_in_range(version, ranges):
+    """True when version (a parsed tuple) satisfies any alternative of a parsed range"""
+    for terms in ranges:
+        if all(_compare(version, op, bound) for op, bound in terms):
+            return True
+    return False
+
+
+def _compare(version, op, bound):
+    if op == '<':
+        return version < bound
+    if op == '<=':
+        return version <= bound
+    if op == '>':
+        return version > bound
+    if op == '>=':
+        return version >= bound
+    return version == bound
+
+
+class AhoCorasick:
+    """Multi-pattern substring matcher.
+
+    One pass over the text finds every occurrence of every pattern, so
+    matching cost depends on the text length and the number of hits, not on
+    how many patterns were compiled in.
+    """
+
+    def __init__(self, patterns):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [()]
+        for index, pattern in enumerate(patterns):
+            state = 0
+            for char in pattern:
+                nxt = self.goto[state].get(char)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[state][char] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append(())
+                state = nxt
+            self.output[state] += ((index, len(pattern)),)
+
+        # Breadth-first so every state's failure target is final before its children use it
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in self.goto[state].items():
+                queue.append(nxt)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.goto[fallback].get(char, 0)
+                self.fail[nxt] = target if target != nxt else 0
+                self.output[nxt] += self.output[self.fail[nxt]]
+
+    def find_all(self, text):
+        """Yield (start, pattern_index) for every pattern occurrence in text"""
+        goto, fail, output = self.goto, self.fail, self.output
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for index, length in output[state]:
+                yield position - length + 1, index
+
+
+class SignatureDB:
+    """Vulnerable library signatures compiled into one multi-pattern matcher.
+
+    Each signature names a library, the URL tokens that identify it, a semver
+    range of affected versions and the advisory details to report. A script
+    URL is scanned once for all library tokens; the version that follows a
+    token (or a ?ver= query parameter) is checked against that library's
+    ranges only.
+    """
+
+    def __init__(self, signatures):
+        self.signatures = []
+        self.tokens = []
+        self.token_signatures = []
+        token_index = {}
+        for signature in signatures:
+            signature = dict(signature)
+            signature['ranges'] = parse_range(signature.get('vulnerable', ''))
+            if not signature['ranges']:
+                continue
+            self.signatures.append(signature)
+            for token in signature.get('patterns') or [signature['library']]:
+                token = token.lower()
+                if token not in token_index:
+                    token_index[token] = len(self.tokens)
+                    self.tokens.append(token)
+                    self.token_signatures.append([])
+                self.token_signatures[token_index[token]].append(len(self.signatures) - 1)
+        self.matcher = AhoCorasick(self.tokens)
+
+    @classmethod
+    def load(cls, path=SIGNATURES_PATH, cache_path=CACHE_PATH):
+        """Load signatures from JSON or CSV, reusing the compiled cache when the source is unchanged"""
+        logger = logging.getLogger(__name__)
+        with open(path, 'rb') as f:
+            raw = f.read()
+        digest = hashlib.sha256(raw).hexdigest()
+
+        if cache_path and os.path.exists(cache_path):
+            try:
+                with open(cache_path, 'rb') as f:
+                    cached = pickle.load(f)
+                if cached.get('format') == CACHE_FORMAT and cached.get('digest') == digest:
+                    return cached['db']
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable signature cache {cache_path}: {e}")
+
+        db = cls(cls._parse(path, raw.decode('utf-8')))
+        if cache_path:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+                tmp_path = f'{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+                with open(tmp_path, 'wb') as f:
+                    pickle.dump({'format': CACHE_FORMAT, 'digest': digest, 'db': db}, f,
+                                protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_path, cache_path)
+            except OSError as e:
+                logger.warning(f"Could not write signature cache {cache_path}: {e}")
+        logger.info(f"Compiled {len(db.signatures)} library signatures from {path}")
+        return db
+
+    @staticmethod
+    def _parse(path, text):
+        if path.lower().endswith('.csv'):
+            # CSV columns: library,name,patterns,vulnerable,severity,advisory,summary
+            # with patterns separated by ';'
+            rows = list(csv.DictReader(text.splitlines()))
+            for row in rows:
+                row['patterns'] = [p.strip() for p in (row.get('patterns') or '').split(';') if p.strip()]
+            return rows
+        return json.loads(text)
+
+    def match(self, url):
+        """Return a list of {signature, version} hits for a script URL"""
+        text = url.lower()
+        query_version = None
+        hits = []
+        seen = set()
+        for start, token_id in self.matcher.find_all(text):
+            # The token must start a path segment or word: 'myjquery-1.2.js' is not jQuery
+            if start and text[start - 1].isalnum():
+                continue
+            end = start + len(self.tokens[token_id])
+            found = VERSION_AFTER_TOKEN.match(text, end)
+            if found:
+                version = found.group(1)
+            else:
+                if query_version is None:
+                    in_query = VERSION_IN_QUERY.search(text)
+                    query_version = in_query.group(1) if in_query else ''
+                # Only trust a query version when the token names the file itself
+                if not query_version or not re.match(r'(\.min)?\.js\b', text[end:]):
+                    continue
+                version = query_version
+            parsed = parse_version(version)
+            for signature_id in self.token_signatures[token_id]:
+                if signature_id in seen:
+                    continue
+                signature = self.signatures[signature_id]
+                if version_in_range(parsed, signature['ranges']):
+                    seen.add(signature_id)
+                    hits.append({'signature': signature, 'version': version})
+        return hits
+
+
+_db = None
+_db_lock = threading.Lock()
+
+
+def get_signature_db():
+    """Return the process-wide signature database, loading it on first use"""
+    global _db
+    if _db is None:
+        with _db_lock:
+            if _db is None:
+                _db = SignatureDB.load()
+    return _db
@@ -0,0 +1,616 @@
+# backend/storage.py
+import datetime
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+
+from domains import get_extractor
+from fingerprints import fingerprint_anomalies
+from segment_log import SegmentLog
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../data')
+DB_PATH = os.path.join(DATA_DIR, 'analyses.db')
+LOG_DIR = os.path.join(DATA_DIR, 'history_log')
+LEGACY_HISTORY_PATH = os.path.join(DATA_DIR, 'history.json')
+
+# Analysis bodies live in the append-only segment log; SQLite only holds the
+# index that maps an analysis id to the (segment, offset, length) of its record.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS analyses (
+    id TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    date TEXT NOT NULL,
+    total_requests INTEGER NOT NULL DEFAULT 0,
+    anomalies_found INTEGER NOT NULL DEFAULT 0,
+    segment INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_analyses_url ON analyses(url);
+CREATE INDEX IF NOT EXISTS idx_analyses_date ON analyses(date);
+CREATE INDEX IF NOT EXISTS idx_analyses_segment ON analyses(segment);
+
+-- Timeline fields of each analysis, kept in step with the index on every write
+CREATE TABLE IF NOT EXISTS analysis_summaries (
+    id TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    domain TEXT NOT NULL,
+    date TEXT NOT NULL,
+    threat_level INTEGER NOT NULL DEFAULT 0,
+    anomalies_found INTEGER NOT NULL DEFAULT 0,
+    anomaly_types TEXT NOT NULL DEFAULT '{}'
+);
+CREATE INDEX IF NOT EXISTS idx_summaries_date ON analysis_summaries(date);
+CREATE INDEX IF NOT EXISTS idx_summaries_domain_date ON analysis_summaries(domain, date);
+
+-- Per-domain hourly and daily aggregates of analysis_summaries
+CREATE TABLE IF NOT EXISTS threat_rollups (
+    bucket TEXT NOT NULL,
+    bucket_start TEXT NOT NULL,
+    domain TEXT NOT NULL,
+    analyses INTEGER NOT NULL,
+    threat_level_sum INTEGER NOT NULL,
+    threat_level_max INTEGER NOT NULL,
+    anomalies_found INTEGER NOT NULL,
+    PRIMARY KEY (bucket, bucket_start, domain)
+);
+
+-- Distinct anomaly fingerprints of each analysis, for diffing runs without loading bodies
+CREATE TABLE IF NOT EXISTS anomaly_fingerprints (
+    analysis_id TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    url TEXT NOT NULL,
+    anomaly_type TEXT,
+    status_class TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 1,
+    PRIMARY KEY (analysis_id, fingerprint)
+);
+CREATE INDEX IF NOT EXISTS idx_fingerprints_fingerprint ON anomaly_fingerprints(fingerprint);
+
+-- Ids removed from the index, so crash recovery does not re-index their log records
+CREATE TABLE IF NOT EXISTS deleted_analyses (
+    id TEXT PRIMARY KEY
+);
+
+-- Store bookkeeping, e.g. the oldest segment that may hold unindexed records
+CREATE TABLE IF NOT EXISTS store_state (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+INSERT_SQL = (
+    'INSERT OR REPLACE INTO analyses '
+    '(id, url, date, total_requests, anomalies_found, segment, offset, length) '
+    'VALUES (?, ?, ?, ?, ?, ?, ?, ?)'
+)
+
+SUMMARY_INSERT_SQL = (
+    'INSERT OR REPLACE INTO analysis_summaries '
+    '(id, url, domain, date, threat_level, anomalies_found, anomaly_types) '
+    'VALUES (?, ?, ?, ?, ?, ?, ?)'
+)
+
+FINGERPRINT_INSERT_SQL = (
+    'INSERT OR REPLACE INTO anomaly_fingerprints '
+    '(analysis_id, fingerprint, url, anomaly_type, status_class, count) '
+    'VALUES (?, ?, ?, ?, ?, ?)'
+)
+
+# Rollup granularity -> length of the ISO date prefix that identifies a bucket
+ROLLUP_BUCKETS = {'hour': 13, 'day': 10}
+
+# SQLite's default limit on bound parameters per statement
+MAX_PARAMS = 900
+
+HISTORY_RETENTION_DAYS = float(os.environ.get('NAD_HISTORY_RETENTION_DAYS', 0))  # 0 keeps analyses forever
+READ_RETRIES = 3
+
+
+def bucket_start(date, bucket):
+    """The ISO timestamp prefix naming the rollup bucket a date falls in"""
+    prefix = (date or '')[:ROLLUP_BUCKETS[bucket]]
+    return prefix + ':00' if bucket == 'hour' and len(prefix) == 13 else prefix
+
+
+def analysis_domain(url):
+    """Registrable domain an analysis is rolled up under"""
+    extractor = get_extractor()
+    return extractor.registrable_domain(extractor.host(url or '')) or ''
+
+
+class AnalysisStore:
+    """Indexed store for analysis results.
+
+    Each analysis is appended once to a segment log, so saving costs the size
+    of that analysis only; a WAL-mode SQLite index on id, url and date makes
+    single-record reads O(log n).
+    """
+
+    def __init__(self, db_path=DB_PATH, log_dir=LOG_DIR, fsync=True):
+        self.db_path = db_path
+        self.logger = logging.getLogger(__name__)
+        self._local = threading.local()
+        self._compactor = None
+        self._stop = threading.Event()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.log = SegmentLog(log_dir, fsync=fsync)
+        self._upgrade_schema()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+        self._reindex_tail()
+        self._backfill_summaries()
+
+    def _connect(self):
+        """Return the calling thread's connection, opening it on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def add(self, analysis):
+        """Append a single analysis record and index it"""
+        segment, offset, length = self.log.append(analysis)
+        with self._connect() as conn:
+            conn.execute(INSERT_SQL, self._row(analysis, segment, offset, length))
+            conn.execute('DELETE FROM deleted_analyses WHERE id = ?', (analysis['id'],))
+            self._summarize(conn, [analysis])
+
+    def add_many(self, analyses):
+        """Append many analysis records with one write and one transaction"""
+        analyses = list(analyses)
+        addresses = self.log.append_many(analyses)
+        with self._connect() as conn:
+            conn.executemany(
+                INSERT_SQL,
+                (self._row(a, *address) for a, address in zip(analyses, addresses))
+            )
+            conn.executemany('DELETE FROM deleted_analyses WHERE id = ?', ((a['id'],) for a in analyses))
+            self._summarize(conn, analyses)
+
+    def get(self, analysis_id):
+        """Fetch one analysis by id, or None if it does not exist"""
+        for _ in range(READ_RETRIES):
+            row = self._connect().execute(
+                'SELECT segment, offset, length FROM analyses WHERE id = ?', (analysis_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            try:
+                return self.log.read(*row)
+            except FileNotFoundError:
+                # Compaction moved the record and removed its segment after
+                # the lookup; the index now points at the copy
+                continue
+        raise FileNotFoundError(f'History record for {analysis_id} moved while being read')
+
+    def get_many(self, analysis_ids):
+        """Fetch several analyses by id, keyed by id"""
+        ids = list(analysis_ids)
+        if not ids:
+            return {}
+        placeholders = ','.join('?' * len(ids))
+        rows = self._connect().execute(
+            f'SELECT id, segment, offset, length FROM analyses WHERE id IN ({placeholders})', ids
+        ).fetchall()
+        return {row[0]: self._read(row[0], row[1:]) for row in rows}
+
+    def list(self, url=None):
+        """Return full analysis records, oldest first, optionally for one URL"""
+        if url:
+            rows = self._connect().execute(
+                'SELECT id, segment, offset, length FROM analyses WHERE url = ? ORDER BY date', (url,)
+            )
+        else:
+            rows = self._connect().execute('SELECT id, segment, offset, length FROM analyses ORDER BY date')
+        return [self._read(row[0], row[1:]) for row in rows]
+
+    def _read(self, analysis_id, address):
+        """Read a record at an address looked up earlier, following it if compaction moved it"""
+        try:
+            return self.log.read(*address)
+        except FileNotFoundError:
+            return self.get(analysis_id)
+
+    def history(self, url=None):
+        """Summary rows plus total_requests, oldest first, optionally for one URL; reads no bodies"""
+        condition, params = ('WHERE a.url = ?', (url,)) if url else ('', ())
+        rows = self._connect().execute(
+            'SELECT s.id, s.url, s.domain, s.date, s.threat_level, s.anomalies_found, s.anomaly_types, '
+            'a.total_requests FROM analyses a JOIN analysis_summaries s ON s.id = a.id '
+            f'{condition} ORDER BY a.date', params
+        )
+        return [dict(self._summary_dict(row), total_requests=row[7]) for row in rows]
+
+    def delete(self, analysis_id):
+        """Drop an analysis from the index; its log record is reclaimed by compaction.
+
+        Returns False if there was no such analysis.
+        """
+        with self._connect() as conn:
+            deleted = conn.execute('DELETE FROM analyses WHERE id = ?', (analysis_id,)).rowcount
+            conn.execute('INSERT OR IGNORE INTO deleted_analyses (id) VALUES (?)', (analysis_id,))
+            affected = conn.execute(
+                'SELECT domain, date FROM analysis_summaries WHERE id = ?', (analysis_id,)
+            ).fetchall()
+            conn.execute('DELETE FROM analysis_summaries WHERE id = ?', (analysis_id,))
+            conn.execute('DELETE FROM anomaly_fingerprints WHERE analysis_id = ?', (analysis_id,))
+            self._refresh_rollups(conn, affected)
+        return bool(deleted)
+
+    def prune(self, before):
+        """Delete every analysis dated before `before` (an ISO date); returns the deleted ids"""
+        ids = [row[0] for row in self._connect().execute('SELECT id FROM analyses WHERE date < ?', (before,))]
+        for analysis_id in ids:
+            self.delete(analysis_id)
+        return ids
+
+    def timeline(self, since=None, domain=None):
+        """Summary rows (id, url, domain, date, threat_level, anomalies_found, anomaly_types), newest first"""
+        conditions, params = self._timeline_filter('date', since, domain)
+        rows = self._connect().execute(
+            'SELECT id, url, domain, date, threat_level, anomalies_found, anomaly_types '
+            f'FROM analysis_summaries {conditions} ORDER BY date DESC', params
+        )
+        return [self._summary_dict(row) for row in rows]
+
+    @staticmethod
+    def _summary_dict(row):
+        return {
+            'id': row[0],
+            'url': row[1],
+            'domain': row[2],
+            'date': row[3],
+            'threat_level': row[4],
+            'anomalies_found': row[5],
+            'anomaly_types': json.loads(row[6])
+        }
+
+    def summaries(self, analysis_ids):
+        """Summary rows plus total_requests for the given ids, keyed by id"""
+        ids = list(analysis_ids)
+        summaries = {}
+        for start in range(0, len(ids), MAX_PARAMS):
+            chunk = ids[start:start + MAX_PARAMS]
+            rows = self._connect().execute(
+                'SELECT s.id, s.url, s.domain, s.date, s.threat_level, s.anomalies_found, s.anomaly_types, '
+                'a.total_requests FROM analysis_summaries s JOIN analyses a ON a.id = s.id '
+                f"WHERE s.id IN ({','.join('?' * len(chunk))})", chunk
+            )
+            for row in rows:
+                summaries[row[0]] = dict(self._summary_dict(row), total_requests=row[7])
+        return summaries
+
+    def analysis_ids(self, url, since=None, until=None):
+        """Ids of the analyses of one URL, oldest first, optionally within [since, until]"""
+        conditions, params = ['url = ?'], [url]
+        if since:
+            conditions.append('date >= ?')
+            params.append(since)
+        if until:
+            conditions.append('date <= ?')
+            params.append(until)
+        rows = self._connect().execute(
+            f"SELECT id FROM analyses WHERE {' AND '.join(conditions)} ORDER BY date", params
+        )
+        return [row[0] for row in rows]
+
+    def fingerprints(self, analysis_ids):
+        """Fingerprint entries of each analysis, keyed by id, read in one pass"""
+        ids = list(analysis_ids)
+        fingerprints = {analysis_id: [] for analysis_id in ids}
+        for start in range(0, len(ids), MAX_PARAMS):
+            chunk = ids[start:start + MAX_PARAMS]
+            rows = self._connect().execute(
+                'SELECT analysis_id, fingerprint, url, anomaly_type, status_class, count FROM anomaly_fingerprints '
+                f"WHERE analysis_id IN ({','.join('?' * len(chunk))})", chunk
+            )
+            for row in rows:
+                fingerprints[row[0]].append({
+                    'fingerprint': row[1],
+                    'url': row[2],
+                    'anomaly_type': row[3],
+                    'status_class': row[4],
+                    'count': row[5]
+                })
+        return fingerprints
+
+    def rollups(self, bucket, since=None, domain=None):
+        """Hourly or daily threat aggregates, newest first; all domains are merged unless one is given"""
+        if bucket not in ROLLUP_BUCKETS:
+            raise ValueError(f"Unknown bucket {bucket!r}; choose one of {', '.join(ROLLUP_BUCKETS)}")
+        conditions, params = self._timeline_filter(
+            'bucket_start', bucket_start(since, bucket) if since else None, domain
+        )
+        conditions = f"{conditions} {'AND' if conditions else 'WHERE'} bucket = ?"
+        rows = self._connect().execute(
+            'SELECT bucket_start, SUM(analyses), SUM(threat_level_sum), MAX(threat_level_max), SUM(anomalies_found) '
+            f'FROM threat_rollups {conditions} GROUP BY bucket_start ORDER BY bucket_start DESC',
+            (*params, bucket)
+        )
+        return [
+            {
+                'bucket_start': row[0],
+                'domain': domain,
+                'analyses': row[1],
+                'avg_threat_level': round(row[2] / row[1], 2) if row[1] else 0,
+                'max_threat_level': row[3],
+                'anomalies_found': row[4]
+            }
+            for row in rows
+        ]
+
+    @staticmethod
+    def _timeline_filter(date_column, since, domain):
+        conditions, params = [], []
+        if since:
+            conditions.append(f'{date_column} >= ?')
+            params.append(since)
+        if domain:
+            conditions.append('domain = ?')
+            params.append(domain)
+        return ('WHERE ' + ' AND '.join(conditions)) if conditions else '', params
+
+    def count(self):
+        return self._connect().execute('SELECT COUNT(*) FROM analyses').fetchone()[0]
+
+    def compact(self, max_live_ratio=0.5):
+        """Rewrite sealed segments that are mostly dead records; returns segments reclaimed"""
+        reclaimed = 0
+        active = self.log.active_segment()
+        conn = self._connect()
+        for segment in self.log.segments():
+            if segment == active:
+                continue
+            size = os.path.getsize(self.log.segment_path(segment))
+            live = conn.execute(
+                'SELECT id, offset, length FROM analyses WHERE segment = ?', (segment,)
+            ).fetchall()
+            live_bytes = sum(length for _, _, length in live)
+            if size and live_bytes / size > max_live_ratio:
+                continue
+
+            # Copy the survivors to the head of the log before re-pointing the
+            # index, so a crash at any step leaves every record reachable.
+            lines = [self.log.read_raw(segment, offset, length) for _, offset, length in live]
+            addresses = self.log.append_many_encoded(lines)
+            with conn:
+                conn.executemany(
+                    'UPDATE analyses SET segment = ?, offset = ?, length = ? WHERE id = ?',
+                    [(*address, row[0]) for address, row in zip(addresses, live)]
+                )
+            self.log.remove(segment)
+            reclaimed += 1
+
+        if reclaimed:
+            self.logger.info(f"Compacted {reclaimed} history segments")
+        return reclaimed
+
+    def start_compactor(self, interval=300, retention_days=HISTORY_RETENTION_DAYS, on_delete=None):
+        """Periodically prune analyses older than `retention_days` (0 keeps them) and run `compact`.
+
+        Runs on a daemon thread; `on_delete(ids)` is called with the ids each
+        prune removed so callers can drop data kept outside the store.
+        """
+        if self._compactor is not None:
+            return
+
+        def run():
+            while not self._stop.wait(interval):
+                try:
+                    if retention_days > 0:
+                        cutoff = datetime.datetime.now() - datetime.timedelta(days=retention_days)
+                        pruned = self.prune(cutoff.isoformat())
+                        if pruned and on_delete:
+                            on_delete(pruned)
+                    self.compact()
+                except Exception as e:
+                    self.logger.error(f"History compaction failed: {e}")
+
+        self._compactor = threading.Thread(target=run, name='history-compactor', daemon=True)
+        self._compactor.start()
+
+    def stop_compactor(self):
+        self._stop.set()
+
+    def migrate_from_json(self, history_path=LEGACY_HISTORY_PATH):
+        """Import a legacy history.json file; returns the number of records read"""
+        if not os.path.exists(history_path):
+            return 0
+
+        with open(history_path, 'r') as f:
+            try:
+                history = json.load(f)
+            except json.JSONDecodeError:
+                self.logger.error(f"Could not parse {history_path}, skipping migration")
+                return 0
+
+        history = [a for a in history if isinstance(a, dict) and a.get('id')]
+        self.add_many(history)
+
+        # Keep the old file around but make sure it is never imported twice
+        os.replace(history_path, history_path + '.migrated')
+        self.logger.info(f"Migrated {len(history)} analyses from {history_path}")
+        return len(history)
+
+    def _reindex_tail(self):
+        """Index records that reached the log but not the index before a crash.
+
+        Every segment from the last recovery point on is scanned, not only the
+        active one: another process may have rolled the log over after a
+        record was appended but before it was indexed. Deleted ids stay deleted.
+        """
+        conn = self._connect()
+        state = conn.execute("SELECT value FROM store_state WHERE key = 'reindexed_from'").fetchone()
+        since = int(state[0]) if state else 0
+        segments = [segment for segment in self.log.segments() if segment >= since]
+        missing = {}
+        for segment in segments:
+            found = {}
+            try:
+                for offset, length, record in self.log.scan(segment):
+                    analysis_id = record.get('id')
+                    if analysis_id:
+                        found[analysis_id] = (record, segment, offset, length)
+            except FileNotFoundError:
+                continue  # compacted away by another process; its records live on in a newer segment
+            ids = list(found)
+            for start in range(0, len(ids), MAX_PARAMS):
+                chunk = ids[start:start + MAX_PARAMS]
+                placeholders = ','.join('?' * len(chunk))
+                known = conn.execute(
+                    f'SELECT id FROM analyses WHERE id IN ({placeholders}) '
+                    f'UNION SELECT id FROM deleted_analyses WHERE id IN ({placeholders})', chunk + chunk
+                ).fetchall()
+                for (analysis_id,) in known:
+                    found.pop(analysis_id, None)
+            missing.update(found)
+        with conn:
+            if missing:
+                # The newest copy of an id wins, as it would have when it was written
+                conn.executemany(INSERT_SQL, [self._row(*entry) for entry in missing.values()])
+                self._summarize(conn, [record for record, _, _, _ in missing.values()])
+            # Everything before the active segment is indexed now; later scans start there
+            conn.execute(
+                "INSERT OR REPLACE INTO store_state (key, value) VALUES ('reindexed_from', ?)",
+                (str(self.log.active_segment()),)
+            )
+        if missing:
+            self.logger.warning(f"Recovered {len(missing)} unindexed analyses from the history log")
+
+    def _backfill_summaries(self, batch_size=500):
+        """Summarize analyses indexed before the summary table existed"""
+        conn = self._connect()
+        rows = conn.execute(
+            'SELECT a.id, a.segment, a.offset, a.length FROM analyses a '
+            'LEFT JOIN analysis_summaries s ON s.id = a.id WHERE s.id IS NULL'
+        ).fetchall()
+        for start in range(0, len(rows), batch_size):
+            with conn:
+                self._summarize(conn, [self._read(row[0], row[1:]) for row in rows[start:start + batch_size]])
+        if rows:
+            self.logger.info(f"Built timeline summaries for {len(rows)} analyses")
+
+    def _summarize(self, conn, analyses):
+        """Write summary and fingerprint rows for analyses and refresh the rollup buckets they touch"""
+        summaries = [self._summary_row(analysis) for analysis in analyses]
+        if not summaries:
+            return
+        ids = [summary[0] for summary in summaries]
+        # A replaced analysis may have moved out of its old bucket and drops its old fingerprints
+        affected = set()
+        for start in range(0, len(ids), MAX_PARAMS):
+            chunk = ids[start:start + MAX_PARAMS]
+            affected.update(conn.execute(
+                f"SELECT domain, date FROM analysis_summaries WHERE id IN ({','.join('?' * len(chunk))})", chunk
+            ).fetchall())
+            conn.execute(f"DELETE FROM anomaly_fingerprints WHERE analysis_id IN ({','.join('?' * len(chunk))})", chunk)
+        conn.executemany(SUMMARY_INSERT_SQL, summaries)
+        conn.executemany(FINGERPRINT_INSERT_SQL, (
+            (analysis['id'], f['fingerprint'], f['url'], f['anomaly_type'], f['status_class'], f['count'])
+            for analysis in analyses for f in self._fingerprints(analysis)
+        ))
+        affected.update((summary[2], summary[3]) for summary in summaries)
+        self._refresh_rollups(conn, affected)
+
+    @staticmethod
+    def _refresh_rollups(conn, affected):
+        """Recompute the rollup rows for each (domain, date) from the summaries in its buckets"""
+        keys = {(bucket, bucket_start(date, bucket), domain) for domain, date in affected if date for bucket in ROLLUP_BUCKETS}
+        for bucket, start, domain in keys:
+            prefix = start[:ROLLUP_BUCKETS[bucket]]
+            conn.execute(
+                'DELETE FROM threat_rollups WHERE bucket = ? AND bucket_start = ? AND domain = ?',
+                (bucket, start, domain)
+            )
+            # '~' sorts after every character of an ISO timestamp, closing the prefix range
+            conn.execute(
+                'INSERT INTO threat_rollups '
+                '(bucket, bucket_start, domain, analyses, threat_level_sum, threat_level_max, anomalies_found) '
+                'SELECT ?, ?, ?, COUNT(*), SUM(threat_level), MAX(threat_level), SUM(anomalies_found) '
+                'FROM analysis_summaries WHERE domain = ? AND date >= ? AND date < ? HAVING COUNT(*) > 0',
+                (bucket, start, domain, domain, prefix, prefix + '~')
+            )
+
+    def _upgrade_schema(self):
+        """Move bodies out of a pre-segment-log database (body column) into the log"""
+        conn = self._connect()
+        columns = [row[1] for row in conn.execute('PRAGMA table_info(analyses)')]
+        if 'body' not in columns:
+            return
+        bodies = [json.loads(body) for (body,) in conn.execute('SELECT body FROM analyses ORDER BY date')]
+        with conn:
+            conn.execute('DROP TABLE analyses')
+            conn.executescript(SCHEMA)
+        self.add_many(bodies)
+        self.logger.info(f"Moved {len(bodies)} analyses into the history log")
+
+    @staticmethod
+    def _row(analysis, segment, offset, length):
+        return (
+            analysis['id'],
+            analysis.get('url', ''),
+            analysis.get('date', ''),
+            analysis.get('total_requests', 0) or 0,
+            analysis.get('anomalies_found', 0) or 0,
+            segment,
+            offset,
+            length
+        )
+
+    @staticmethod
+    def _fingerprints(analysis):
+        fingerprints = analysis.get('fingerprints')
+        if fingerprints is None:
+            # Records saved before fingerprinting only have their stored anomalies to go on
+            fingerprints = fingerprint_anomalies([dict(a) for a in analysis.get('anomalies') or []])
+        return fingerprints
+
+    @staticmethod
+    def _summary_row(analysis):
+        anomalies_found = analysis.get('anomalies_found', 0) or 0
+        safety = analysis.get('safety_assessment') or {}
+        if 'threat_level' in safety:
+            threat_level = safety['threat_level'] or 0
+        else:
+            # Simple calculation based on anomalies for records without a safety assessment
+            threat_level = min(anomalies_found * 5, 100)
+        return (
+            analysis['id'],
+            analysis.get('url', ''),
+            analysis_domain(analysis.get('url')),
+            analysis.get('date', ''),
+            threat_level,
+            anomalies_found,
+            json.dumps(analysis.get('anomaly_types') or {})
+        )
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Return the process-wide store, migrating history.json on first use"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                store = AnalysisStore()
+                store.migrate_from_json()
+                _store = store
+    return _store
+
+
+if __name__ == '__main__':
+    # One-shot migration: python storage.py [path/to/history.json]
+    logging.basicConfig(level=logging.INFO)
+    path = sys.argv[1] if len(sys.argv) > 1 else LEGACY_HISTORY_PATH
+    migrated = AnalysisStore().migrate_from_json(path)
+    print(f"Migrated {migrated} analyses into {DB_PATH}")
@@ -0,0 +1,257 @@
+# backend/streaming_detector.py
+import logging
+import math
+import threading
+from collections import OrderedDict, deque
+
+import pandas as pd
+
+from detector import (
+    DURATION_FEATURE, SLOW_REQUEST_MS, STATUS_DESCRIPTIONS, STATUS_TYPES, extract_domain
+)
+
+# Time of day is left out: its EWMA variance collapses within a minute, so a
+# rollover would score as an outlier. Counts are taken over a sliding window
+# rather than cumulatively, so the first request to a new domain is not one.
+STREAM_FEATURES = ['status_code', 'domain_rate', 'resource_type_rate', DURATION_FEATURE]
+# Only an unusually high rate is anomalous; a quiet domain is not
+ONE_SIDED_FEATURES = {'domain_rate', 'resource_type_rate'}
+
+
+class EwmaStat:
+    """Exponentially weighted mean and variance of one value
+
+    `min_std` floors the deviation used for z-scores, so a value that has
+    barely varied yet does not turn every small change into an outlier.
+    """
+
+    __slots__ = ('alpha', 'min_std', 'mean', 'var', 'count')
+
+    def __init__(self, alpha, min_std=0.0):
+        self.alpha = alpha
+        self.min_std = min_std
+        self.mean = 0.0
+        self.var = 0.0
+        self.count = 0
+
+    def zscore(self, value):
+        std = max(math.sqrt(self.var), self.min_std)
+        if self.count < 2 or std <= 0:
+            return 0.0
+        return (value - self.mean) / std
+
+    def update(self, value):
+        if self.count == 0:
+            self.mean = value
+        else:
+            delta = value - self.mean
+            self.mean += self.alpha * delta
+            self.var = (1 - self.alpha) * (self.var + self.alpha * delta * delta)
+        self.count += 1
+
+
+class WindowCounter:
+    """Number of events in the last `window` seconds, holding at most `max_events` timestamps"""
+
+    __slots__ = ('window', 'times')
+
+    def __init__(self, window, max_events):
+        self.window = window
+        self.times = deque(maxlen=max_events)
+
+    def add(self, timestamp):
+        seconds = timestamp.timestamp()
+        self.times.append(seconds)
+        while self.times and self.times[0] < seconds - self.window:
+            self.times.popleft()
+        return len(self.times)
+
+
+class DomainStats:
+    """Running latency, error rate and request rate for one domain"""
+
+    __slots__ = ('latency', 'error_rate', 'request_rate', 'recent', 'last_seen', 'count')
+
+    def __init__(self, alpha, window, max_events):
+        self.latency = EwmaStat(alpha)
+        self.error_rate = EwmaStat(alpha)
+        self.request_rate = EwmaStat(alpha)
+        self.recent = WindowCounter(window, max_events)
+        self.last_seen = None
+        self.count = 0
+
+
+class StreamingDetector:
+    """Online anomaly detector for continuously arriving network log records.
+
+    Each record costs a constant amount of work: per-domain EWMA statistics
+    are updated in place, domain and resource-type volumes are counted over
+    the last `window` seconds, and outliers are scored against an
+    incrementally updated per-feature EWMA mean/variance. Memory is bounded
+    by evicting the least recently seen domains beyond `max_domains`.
+    Updates hold `lock`, so one detector can be fed from several threads.
+    """
+
+    def __init__(self, alpha=0.05, max_domains=10000, z_threshold=4.0, warmup=50,
+                 latency_threshold=3.0, error_rate_threshold=0.5, window=60, max_window_events=10000,
+                 min_std=1.0):
+        self.alpha = alpha
+        self.max_domains = max_domains
+        self.z_threshold = z_threshold
+        self.warmup = warmup
+        self.latency_threshold = latency_threshold
+        self.error_rate_threshold = error_rate_threshold
+        self.window = window
+        self.max_window_events = max_window_events
+        self.logger = logging.getLogger(__name__)
+        self.lock = threading.RLock()
+        self.domains = OrderedDict()
+        self.resource_types = {}
+        # log_duration is on a log scale, where 1.0 is a near threefold change
+        self.features = {
+            name: EwmaStat(alpha, min_std / 4 if name == DURATION_FEATURE else min_std)
+            for name in STREAM_FEATURES
+        }
+        self.records_seen = 0
+
+    def update(self, record):
+        """Consume one log record; returns the anomalies it triggered"""
+        with self.lock:
+            return self._update(record)
+
+    def _update(self, record):
+        self.records_seen += 1
+        anomalies = []
+
+        status_code = _to_number(record.get('status_code'))
+        duration = _to_number(record.get('duration'))
+        latency = duration or _to_number(record.get('response_time'))
+        domain = extract_domain(record.get('url', ''))
+        stats = self._domain(domain)
+        stats.count += 1
+
+        # Rule checks, identical to the batch rule stage
+        if status_code is not None and 400 <= status_code < 600:
+            code = int(status_code)
+            anomalies.append({
+                **record,
+                'anomaly_type': STATUS_TYPES[code - 400],
+                'description': STATUS_DESCRIPTIONS[code - 400],
+                'severity': 'medium'
+            })
+        if latency and latency > SLOW_REQUEST_MS:
+            anomalies.append({**record, 'anomaly_type': 'slow_request', 'timing': latency})
+
+        # Per-domain behaviour against that domain's own history
+        is_error = 1.0 if status_code is not None and status_code >= 400 else 0.0
+        if latency:
+            z = stats.latency.zscore(latency)
+            if stats.latency.count >= self.warmup and z > self.latency_threshold and latency <= SLOW_REQUEST_MS:
+                anomalies.append({
+                    **record,
+                    'anomaly_type': 'latency_spike',
+                    'description': f"Latency {latency:.0f}ms is {z:.1f} deviations above {domain}'s average",
+                    'severity': 'low'
+                })
+            stats.latency.update(latency)
+        stats.error_rate.update(is_error)
+        if stats.count >= self.warmup and stats.error_rate.mean > self.error_rate_threshold and is_error:
+            anomalies.append({
+                **record,
+                'anomaly_type': 'error_rate_spike',
+                'description': f"{stats.error_rate.mean:.0%} of recent requests to {domain} failed",
+                'severity': 'medium'
+            })
+
+        timestamp = _to_timestamp(record.get('timestamp'))
+        if timestamp is not None:
+            if stats.last_seen is not None:
+                gap = max((timestamp - stats.last_seen).total_seconds(), 1e-3)
+                stats.request_rate.update(1.0 / gap)
+            stats.last_seen = timestamp
+
+        # Statistical outlier score over the streaming feature definitions
+        vector = self._feature_vector(record, status_code, duration, timestamp, stats)
+        score = max((self._deviation(name, value) for name, value in vector.items()), default=0.0)
+        if self.records_seen > self.warmup and score > self.z_threshold and not anomalies:
+            anomalies.append({
+                **record,
+                'anomaly_type': 'statistical_outlier',
+                'anomaly_confidence': round(score, 2)
+            })
+        for name, value in vector.items():
+            self.features[name].update(value)
+
+        return anomalies
+
+    def update_many(self, records):
+        """Consume a micro-batch of records; returns all anomalies in arrival order"""
+        anomalies = []
+        with self.lock:
+            for record in records:
+                anomalies.extend(self._update(record))
+        return anomalies
+
+    def domain_summary(self, domain):
+        with self.lock:
+            stats = self.domains.get(domain)
+            if stats is None:
+                return None
+            return {
+                'domain': domain,
+                'requests': stats.count,
+                'latency_ewma': stats.latency.mean,
+                'error_rate': stats.error_rate.mean,
+                'request_rate': stats.request_rate.mean
+            }
+
+    def _deviation(self, name, value):
+        z = self.features[name].zscore(value)
+        return max(z, 0.0) if name in ONE_SIDED_FEATURES else abs(z)
+
+    def _domain(self, domain):
+        stats = self.domains.get(domain)
+        if stats is None:
+            stats = self.domains[domain] = DomainStats(self.alpha, self.window, self.max_window_events)
+            if len(self.domains) > self.max_domains:
+                self.domains.popitem(last=False)
+        else:
+            self.domains.move_to_end(domain)
+        return stats
+
+    def _feature_vector(self, record, status_code, duration, timestamp, stats):
+        vector = {}
+        if timestamp is not None:
+            vector['domain_rate'] = float(stats.recent.add(timestamp))
+            resource_type = record.get('resource_type')
+            counter = self.resource_types.get(resource_type)
+            if counter is None and len(self.resource_types) < self.max_domains:
+                counter = self.resource_types[resource_type] = WindowCounter(self.window, self.max_window_events)
+            if counter is not None:
+                vector['resource_type_rate'] = float(counter.add(timestamp))
+        if status_code is not None:
+            vector['status_code'] = float(status_code)
+        if duration is not None and duration >= 0:
+            vector[DURATION_FEATURE] = math.log1p(duration)
+        return vector
+
+
+def _to_number(value):
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if math.isnan(number) else number
+
+
+def _to_timestamp(value):
+    """Parse a timestamp the same way pd.to_datetime does for the batch detector"""
+    if value is None:
+        return None
+    try:
+        timestamp = pd.Timestamp(value)
+    except (TypeError, ValueError):
+        return None
+    return None if pd.isna(timestamp) else timestamp
@@ -1,41 +1,298 @@
+# backend/tasks.py
+import logging
+import multiprocessing
 import os
+import queue
+import sqlite3
+import threading
+import time
 import uuid
-import subprocess
-import json
 from datetime import datetime
+
+from analysis import AnalysisError, run_analysis
 from detector import detect_anomalies
+from result_cache import HIT, ComputationAbandoned, cache_key, get_result_cache
+from storage import get_store
 
-def process_url_async(url, task_id=None):
-    """Run analysis in a separate process"""
-    if not task_id:
-        task_id = str(uuid.uuid4())
-    
-    # Store task status
-    tasks_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../data/tasks.json')
-    task = {
-        'id': task_id,
-        'url': url,
-        'status': 'running',
-        'created_at': datetime.now().isoformat()
-    }
-    
-    # Save task status
-    tasks = []
-    if os.path.exists(tasks_path):
-        with open(tasks_path, 'r') as f:
-            try:
-                tasks = json.load(f)
-            except json.JSONDecodeError:
-                tasks = []
-    
-    tasks.append(task)
-    with open(tasks_path, 'w') as f:
-        json.dump(tasks, f, indent=2)
-    
-    # Start analysis process in background
+TASKS_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../data/tasks.db')
+
+MAX_CONCURRENT_ANALYSES = int(os.environ.get('NAD_MAX_CONCURRENT_ANALYSES', 2))
+ANALYSIS_TIMEOUT = float(os.environ.get('NAD_ANALYSIS_TIMEOUT', 300))  # seconds
+# Detection processes are never forked from the threaded server process
+START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+ERROR = 'error'
+CANCELLED = 'cancelled'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    status TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    started_at TEXT,
+    finished_at TEXT,
+    result_id TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_created_at ON tasks(created_at);
+"""
+
+TASK_FIELDS = ('id', 'url', 'status', 'created_at', 'started_at', 'finished_at', 'result_id', 'error')
+
+
+class JobCancelled(ComputationAbandoned):
+    """A job was cancelled or timed out; jobs coalesced onto it carry on"""
+
+
+def _detect_in_child(conn, logs, site, rule_anomalies):
+    """Detection process entry point: sends back (True, anomalies) or (False, exception)"""
     try:
-        # Process logic here
-        pass
+        outcome = (True, detect_anomalies(logs, site, None, rule_anomalies))
     except Exception as e:
-        # Update task status on error
-        update_task_status(task_id, 'error', str(e))
\ No newline at end of file
+        outcome = (False, e)
+    try:
+        conn.send(outcome)
+    except Exception as e:
+        # The exception itself may not pickle
+        conn.send((False, RuntimeError(f'Anomaly detection failed: {e}')))
+    finally:
+        conn.close()
+
+
+class TaskStore:
+    """Status records for background analyses, kept in SQLite"""
+
+    def __init__(self, db_path=TASKS_DB_PATH):
+        self.db_path = db_path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def create(self, task_id, url):
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT INTO tasks (id, url, status, created_at) VALUES (?, ?, ?, ?)',
+                (task_id, url, QUEUED, datetime.now().isoformat())
+            )
+
+    def update(self, task_id, **fields):
+        assignments = ', '.join(f'{name} = ?' for name in fields)
+        with self._connect() as conn:
+            conn.execute(f'UPDATE tasks SET {assignments} WHERE id = ?', (*fields.values(), task_id))
+
+    def get(self, task_id):
+        row = self._connect().execute(
+            f"SELECT {', '.join(TASK_FIELDS)} FROM tasks WHERE id = ?", (task_id,)
+        ).fetchone()
+        return dict(zip(TASK_FIELDS, row)) if row else None
+
+    def list(self, limit=50):
+        rows = self._connect().execute(
+            f"SELECT {', '.join(TASK_FIELDS)} FROM tasks ORDER BY created_at DESC LIMIT ?", (limit,)
+        )
+        return [dict(zip(TASK_FIELDS, row)) for row in rows]
+
+    def fail_unfinished(self, reason):
+        """Mark tasks left queued/running by a previous process as failed"""
+        with self._connect() as conn:
+            conn.execute(
+                'UPDATE tasks SET status = ?, error = ?, finished_at = ? WHERE status IN (?, ?)',
+                (ERROR, reason, datetime.now().isoformat(), QUEUED, RUNNING)
+            )
+
+
+class Job:
+    def __init__(self, task_id, url, timeout, force=False):
+        self.task_id = task_id
+        self.url = url
+        self.force = force
+        self.deadline = None
+        self.timeout = timeout
+        self.cancelled = threading.Event()
+
+    def checkpoint(self):
+        if self.cancelled.is_set():
+            raise JobCancelled('Cancelled by user')
+        if self.deadline is not None and time.time() > self.deadline:
+            raise JobCancelled(f'Timed out after {self.timeout:.0f} seconds')
+
+
+class JobQueue:
+    """Bounded pool running analyses in the background.
+
+    `max_concurrency` worker threads drive the I/O-bound capture stages and
+    hand the CPU-bound anomaly detection to a separate process per job.
+    Jobs can be cancelled while queued, between stages or while a capture is
+    being ingested, and each job is aborted once its timeout has elapsed; a
+    detection process still running at that point is terminated.
+    """
+
+    def __init__(self, task_store, max_concurrency=MAX_CONCURRENT_ANALYSES, timeout=ANALYSIS_TIMEOUT,
+                 on_progress=None):
+        self.task_store = task_store
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.on_progress = on_progress
+        self.logger = logging.getLogger(__name__)
+        self._queue = queue.Queue()
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._mp_context = multiprocessing.get_context(START_METHOD)
+        if START_METHOD == 'forkserver':
+            # Detection processes start from a server that already imported pandas and sklearn
+            self._mp_context.set_forkserver_preload(['tasks'])
+        self._workers = [
+            threading.Thread(target=self._work, name=f'analysis-worker-{i}', daemon=True)
+            for i in range(max_concurrency)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, url, timeout=None, force=False):
+        """Queue an analysis of url; returns its task id. `force` bypasses the result cache"""
+        task_id = str(uuid.uuid4())
+        job = Job(task_id, url, min(timeout or self.timeout, self.timeout), force=force)
+        self.task_store.create(task_id, url)
+        with self._lock:
+            self._jobs[task_id] = job
+        self._queue.put(job)
+        return task_id
+
+    def cancel(self, task_id):
+        """Request cancellation; returns False if the task is unknown or already finished"""
+        with self._lock:
+            job = self._jobs.get(task_id)
+        if job is None:
+            return False
+        job.cancelled.set()
+        return True
+
+    def shutdown(self):
+        for _ in self._workers:
+            self._queue.put(None)
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            try:
+                self._run(job)
+            finally:
+                with self._lock:
+                    self._jobs.pop(job.task_id, None)
+
+    def _run(self, job):
+        if job.cancelled.is_set():
+            self._finish(job, CANCELLED, error='Cancelled by user')
+            return
+
+        job.deadline = time.time() + job.timeout
+        self.task_store.update(job.task_id, status=RUNNING, started_at=datetime.now().isoformat())
+        try:
+            # Jobs for the same URL share one in-flight analysis and reuse recent results
+            result, outcome = get_result_cache().get_or_compute(
+                cache_key(job.url), lambda: self._analyze(job), force=job.force, wait=job.checkpoint
+            )
+            self._finish(job, DONE, result_id=result['id'])
+            self._progress(job, 'analysis_complete', 'Analysis complete', 100, result_id=result['id'],
+                           cached=outcome == HIT)
+        except JobCancelled as e:
+            status = CANCELLED if job.cancelled.is_set() else ERROR
+            self._finish(job, status, error=str(e))
+        except AnalysisError as e:
+            self._finish(job, ERROR, error=str(e))
+        except Exception as e:
+            self.logger.exception(f"Analysis task {job.task_id} failed")
+            self._finish(job, ERROR, error=str(e))
+
+    def _analyze(self, job):
+        result = run_analysis(
+            job.url,
+            progress=lambda step, message, percentage: self._progress(job, step, message, percentage),
+            checkpoint=job.checkpoint,
+            detect=lambda logs, site, rule_anomalies: self._detect(job, logs, site, rule_anomalies),
+            deadline=job.deadline
+        )
+        job.checkpoint()
+        get_store().add(result)
+        return result
+
+    def _detect(self, job, logs, site, rule_anomalies):
+        """Run detect_anomalies in its own process, terminating it on cancellation or timeout"""
+        receiver, sender = self._mp_context.Pipe(duplex=False)
+        process = self._mp_context.Process(
+            target=_detect_in_child, args=(sender, logs, site, rule_anomalies),
+            name=f'detect-{job.task_id}', daemon=True
+        )
+        process.start()
+        sender.close()
+        finished = False
+        try:
+            # poll() also returns once the process exits without sending
+            while not receiver.poll(0.5):
+                job.checkpoint()
+            try:
+                ok, value = receiver.recv()
+            except EOFError:
+                raise RuntimeError(f'Anomaly detection process exited with code {process.exitcode}')
+            finished = True
+        finally:
+            receiver.close()
+            if not finished and process.is_alive():
+                process.terminate()
+            process.join()
+        if not ok:
+            raise value
+        return value
+
+    def _progress(self, job, step, message, percentage, **extra):
+        if self.on_progress:
+            self.on_progress({
+                'task_id': job.task_id,
+                'step': step,
+                'message': message,
+                'percentage': percentage,
+                **extra
+            })
+
+    def _finish(self, job, status, result_id=None, error=None):
+        self.task_store.update(
+            job.task_id,
+            status=status,
+            result_id=result_id,
+            error=error,
+            finished_at=datetime.now().isoformat()
+        )
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_queue(on_progress=None):
+    """Return the process-wide job queue, creating it on first use"""
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                task_store = TaskStore()
+                task_store.fail_unfinished('Interrupted by server restart')
+                _queue = JobQueue(task_store, on_progress=on_progress)
+    if on_progress is not None and _queue.on_progress is None:
+        # Built by a caller that had no emitter; progress must not stay silent for the process
+        _queue.on_progress = on_progress
+    return _queue
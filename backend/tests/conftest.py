@@ -0,0 +1,10 @@
+# backend/tests/conftest.py
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Backend modules import each other flat, and detector.py opens its debug log
+# relative to the working directory, so tests run from backend/
+sys.path.insert(0, BACKEND_DIR)
+os.chdir(BACKEND_DIR)
@@ -0,0 +1,117 @@
+# backend/tests/test_analyze_capture.py
+"""A capture-shaped record goes through /analyze end to end."""
+import json
+import threading
+
+import pytest
+
+import analysis
+import capture_ingest
+from capture_pool import CaptureError
+import model_registry
+import request_log
+import result_cache
+import storage
+from app import app
+
+
+def capture_records(url):
+    """Records as capture_worker.js writes them: camelCase resourceType, request and response headers"""
+    page = {
+        'url': url,
+        'method': 'GET',
+        'resourceType': 'document',
+        'headers': {'user-agent': 'test'},
+        'timestamp': 1700000000000,
+        'status_code': 200,
+        'response_headers': {'content-type': 'text/html'},
+        'response_time': 120,
+        'content_type': 'text/html'
+    }
+    assets = [dict(page, url=f'{url}asset-{i}.js', resourceType='script', timestamp=1700000000000 + i,
+                   response_headers={'content-type': 'application/javascript'}, content_type='application/javascript')
+              for i in range(20)]
+    return [page] + assets
+
+
+class FakeCapture:
+    def __init__(self, error=None):
+        self.finished = threading.Event()
+        self.error = error
+
+    def done(self):
+        return self.finished.is_set()
+
+    def result(self):
+        if self.error:
+            raise self.error
+
+
+class FakeCapturePool:
+    error = None
+
+    def submit_capture(self, url, path, screenshot=None, timeout=None):
+        capture = FakeCapture(self.error)
+        with open(path, 'w') as f:
+            for record in capture_records(url):
+                f.write(json.dumps(record) + '\n')
+        capture.finished.set()
+        return capture
+
+
+class FakeScanner:
+    def scan_url(self, url, **kwargs):
+        return {}
+
+
+@pytest.fixture
+def scored_sites(tmp_path, monkeypatch):
+    """Sites the model registry scored during the test"""
+    registry = model_registry.ModelRegistry(model_dir=str(tmp_path / 'models'))
+    sites = []
+    score = registry.score
+
+    def recording_score(site, *args, **kwargs):
+        sites.append(site)
+        return score(site, *args, **kwargs)
+
+    monkeypatch.setattr(registry, 'score', recording_score)
+    monkeypatch.setattr(model_registry, '_registry', registry)
+    return sites
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch, scored_sites):
+    monkeypatch.setattr(storage, '_store', storage.AnalysisStore(str(tmp_path / 'analyses.db'), str(tmp_path / 'log')))
+    monkeypatch.setattr(result_cache, '_cache', result_cache.ResultCache())
+    monkeypatch.setattr(analysis, 'capture_paths',
+                        lambda analysis_id: capture_ingest.capture_paths(analysis_id, str(tmp_path / 'captures')))
+    monkeypatch.setattr(analysis, 'write_requests',
+                        lambda analysis_id, logs: request_log.write_requests(analysis_id, logs, str(tmp_path / 'requests')))
+    monkeypatch.setattr(analysis, 'get_capture_pool', FakeCapturePool)
+    monkeypatch.setattr(analysis, 'get_scanner_service', FakeScanner)
+    return app.test_client()
+
+
+def test_capture_record_reaches_security_checks_and_detector(client, scored_sites, tmp_path):
+    response = client.post('/analyze', json={'url': 'http://example.test/'})
+
+    assert response.status_code == 200
+    result = response.get_json()
+    assert result['total_requests'] == 21
+    assert {log['resource_type'] for log in result['all_requests']} == {'document', 'script'}
+    # The document's response lacks every security header, so the header rules must fire
+    assert any(issue['type'] == 'missing_security_headers' for issue in result['security_issues'])
+    # Statistical scoring ran instead of failing on a missing resource_type column
+    assert scored_sites
+    assert not list((tmp_path / 'captures').glob('*.ndjson'))
+
+
+def test_capture_file_is_removed_when_the_capture_fails(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(FakeCapturePool, 'error', CaptureError('browser crashed'))
+
+    response = client.post('/analyze', json={'url': 'http://example.test/'})
+
+    assert response.status_code == 500
+    assert response.get_json()['error'] == 'Network capture failed'
+    assert not list((tmp_path / 'captures').glob('*.ndjson'))
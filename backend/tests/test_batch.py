@@ -0,0 +1,57 @@
+# backend/tests/test_batch.py
+"""Offline batch analysis: a dry run leaves history, request tables and models alone."""
+import functools
+import json
+
+import pytest
+
+import batch
+import model_registry
+
+
+@pytest.fixture
+def capture_file(tmp_path):
+    path = tmp_path / 'capture.ndjson'
+    with open(path, 'w') as f:
+        for i in range(40):
+            f.write(json.dumps({
+                'url': f'https://example.test/{i}',
+                'status_code': 404 if i % 9 == 0 else 200,
+                'resourceType': 'document' if i == 0 else 'script',
+                'timestamp': 1700000000000 + i * 100,
+                'response_time': 50 + i
+            }) + '\n')
+    return str(path)
+
+
+@pytest.fixture
+def written(tmp_path, monkeypatch):
+    """Request tables written and the model directory, both redirected into tmp_path"""
+    tables = []
+    model_dir = tmp_path / 'models'
+    monkeypatch.setattr(batch, 'write_requests', lambda analysis_id, logs: tables.append(analysis_id))
+    monkeypatch.setattr(batch, 'ModelRegistry', functools.partial(model_registry.ModelRegistry,
+                                                                   model_dir=str(model_dir)))
+    monkeypatch.setattr(batch, '_dry_run_registry', None)
+    return tables, model_dir
+
+
+def test_dry_run_writes_nothing(capture_file, written):
+    tables, model_dir = written
+
+    path, result, requests, error = batch.analyze_file(capture_file, dry_run=True)
+
+    assert error is None and requests == 40
+    assert result['anomalies_found'] > 0
+    assert tables == []
+    assert not model_dir.exists()
+
+
+def test_saved_run_writes_the_request_table(capture_file, written, monkeypatch):
+    tables, _ = written
+    monkeypatch.setattr(model_registry, '_registry', model_registry.ModelRegistry(str(written[1])))
+
+    path, result, requests, error = batch.analyze_file(capture_file)
+
+    assert error is None
+    assert tables == [result['id']]
@@ -0,0 +1,58 @@
+# backend/tests/test_capture_ingest.py
+"""Tail-following ingestion of a capture file that is still being written."""
+import json
+import threading
+import time
+
+from capture_ingest import follow_ndjson, ingest_capture
+
+
+def record(i, resource_type='xhr'):
+    return {'url': f'https://example.test/{i}', 'status_code': 200, 'resourceType': resource_type}
+
+
+def test_batches_arrive_while_the_writer_is_still_running(tmp_path):
+    path = tmp_path / 'capture.ndjson'
+    done = threading.Event()
+    seen_before_done = []
+
+    def writer():
+        with open(path, 'w') as f:
+            for i in range(3):
+                f.write(json.dumps(record(i)) + '\n')
+                f.flush()
+                time.sleep(0.1)
+            # A torn line is held back until its newline arrives
+            line = json.dumps(record(3))
+            f.write(line[:10])
+            f.flush()
+            time.sleep(0.1)
+            f.write(line[10:] + '\n')
+        done.set()
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    batches = []
+    for batch in follow_ndjson(str(path), done.is_set, poll_interval=0.01):
+        batches.append(batch)
+        if not done.is_set():
+            seen_before_done.extend(batch)
+    thread.join()
+
+    assert [r['url'] for batch in batches for r in batch] == [f'https://example.test/{i}' for i in range(4)]
+    assert seen_before_done
+
+
+def test_ingest_normalizes_and_checks_rules_per_batch(tmp_path):
+    path = tmp_path / 'capture.ndjson'
+    lines = [record(0, 'document'), {**record(1), 'status_code': 404}, 'not json']
+    path.write_text('\n'.join(line if isinstance(line, str) else json.dumps(line) for line in lines) + '\n')
+
+    ingester = ingest_capture(str(path), lambda: True)
+
+    assert [log['resource_type'] for log in ingester.logs] == ['document', 'xhr']
+    assert [anomaly['status_code'] for anomaly in ingester.rule_anomalies] == [404]
+
+
+def test_missing_file_ends_once_the_writer_finishes(tmp_path):
+    assert list(follow_ndjson(str(tmp_path / 'never.ndjson'), lambda: True)) == []
@@ -0,0 +1,53 @@
+# backend/tests/test_capture_pool.py
+"""CapturePool: the worker count never exceeds the pool size."""
+import threading
+
+import pytest
+
+from capture_pool import FAKE_WORKER_COMMAND, CaptureError, CapturePool
+
+
+@pytest.fixture
+def pool():
+    pool = CapturePool(size=1, command=FAKE_WORKER_COMMAND)
+    yield pool
+    pool.shutdown()
+
+
+def test_acquire_waits_for_a_worker_out_for_health_check(pool):
+    worker = pool._acquire(timeout=10)
+    pool._release(worker, healthy=True)
+    # What health_check does while it pings: the idle worker is off the queue
+    checked = pool._idle.get_nowait()
+
+    acquired = []
+    thread = threading.Thread(target=lambda: acquired.append(pool._acquire(timeout=10)))
+    thread.start()
+    thread.join(timeout=1)
+    assert thread.is_alive() and len(pool._workers) == 1
+
+    pool._idle.put(checked)
+    thread.join(timeout=5)
+    assert acquired == [checked]
+    assert len(pool._workers) == 1
+    pool._release(checked, healthy=True)
+
+
+def test_acquire_times_out_instead_of_growing_the_pool(pool):
+    worker = pool._acquire(timeout=10)
+    pool._release(worker, healthy=True)
+    pool._idle.get_nowait()
+
+    with pytest.raises(CaptureError, match='No capture worker'):
+        pool._acquire(timeout=0.3)
+    assert len(pool._workers) == 1
+    # The slot taken by the failed acquire was given back
+    assert pool._slots.acquire(timeout=0)
+
+
+def test_health_check_returns_responsive_workers_to_the_pool(pool):
+    worker = pool._acquire(timeout=10)
+    pool._release(worker, healthy=True)
+
+    assert pool.health_check() == {'idle': 1, 'workers': 1}
+    assert worker.rss > 0
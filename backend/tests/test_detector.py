@@ -0,0 +1,36 @@
+# backend/tests/test_detector.py
+"""Rule stage of the detector: status and slow-request checks."""
+import pandas as pd
+
+from detector import detect_rule_anomalies
+
+
+def rule_types(logs):
+    return [(a['url'], a['anomaly_type']) for a in detect_rule_anomalies(pd.DataFrame(logs), logs)]
+
+
+def test_status_strings_are_parsed_and_garbage_rows_skipped():
+    logs = [
+        {'url': 'a', 'status_code': '404', 'duration': 10},
+        {'url': 'b', 'status_code': 503, 'duration': 10},
+        {'url': 'c', 'status_code': 'oops', 'duration': 9000},
+        {'url': 'd', 'status_code': 200, 'duration': 10}
+    ]
+    assert rule_types(logs) == [('a', 'not_found'), ('b', 'server_error')]
+
+
+def test_only_numeric_timings_count_as_slow():
+    logs = [
+        {'url': 'int', 'status_code': 200, 'duration': 5000},
+        {'url': 'float', 'status_code': 200, 'duration': 4000.5},
+        # Numeric strings are not converted
+        {'url': 'string', 'status_code': 200, 'duration': '5000'},
+        # A non-empty duration string does not fall back to response_time
+        {'url': 'garbage', 'status_code': 200, 'duration': 'abc', 'response_time': 5000},
+        # Missing or zero durations do
+        {'url': 'fallback', 'status_code': 200, 'duration': 0, 'response_time': 5000},
+        {'url': 'missing', 'status_code': 200, 'response_time': 5000}
+    ]
+    assert rule_types(logs) == [
+        ('int', 'slow_request'), ('float', 'slow_request'), ('fallback', 'slow_request'), ('missing', 'slow_request')
+    ]
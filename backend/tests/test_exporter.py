@@ -0,0 +1,83 @@
+# backend/tests/test_exporter.py
+"""Streamed exports read back to the rows they were written from."""
+import csv
+import io
+import json
+
+import pytest
+
+import app as app_module
+from exporter import COLUMNS, csv_chunks, ndjson_chunks, parquet_chunks
+from request_log import open_requests, write_requests
+
+
+def requests():
+    return [
+        {'url': f'https://site.test/{i}', 'method': 'GET', 'resource_type': 'script', 'status_code': 200 + i,
+         'content_type': 'text/javascript', 'duration': 10.5 * i, 'size': 100 * i, 'timestamp': 1700000000000 + i}
+        for i in range(5)
+    ] + [
+        # duration falls back to response_time, resourceType to resource_type
+        {'url': 'https://site.test/a,"b"', 'method': 'POST', 'resourceType': 'xhr', 'status_code': 500,
+         'duration': None, 'response_time': 80, 'headers': {'x': '1'}}
+    ]
+
+
+def expected(kind='requests'):
+    rows = []
+    for record in requests():
+        row = {key: record.get(key) for _, key, _ in COLUMNS[kind]}
+        row['duration'] = record.get('duration') or record.get('response_time')
+        row['resource_type'] = record.get('resource_type') or record.get('resourceType')
+        rows.append(row)
+    return rows
+
+
+def test_csv_round_trip_across_chunks():
+    chunks = list(csv_chunks(requests(), COLUMNS['requests'], chunk_rows=2))
+    assert len(chunks) == 3
+
+    read = list(csv.reader(io.StringIO(''.join(chunks))))
+
+    assert read[0] == [header for header, _, _ in COLUMNS['requests']]
+    assert read[1:] == [['' if value is None else str(value) for value in row.values()] for row in expected()]
+
+
+def test_ndjson_round_trip_across_chunks():
+    chunks = list(ndjson_chunks(requests(), chunk_rows=4))
+    assert len(chunks) == 2
+
+    assert [json.loads(line) for line in ''.join(chunks).splitlines()] == requests()
+
+
+def test_parquet_round_trip_across_row_groups():
+    pq = pytest.importorskip('pyarrow.parquet')
+
+    data = b''.join(parquet_chunks(requests(), COLUMNS['requests'], chunk_rows=2))
+    parquet = pq.ParquetFile(io.BytesIO(data))
+
+    assert parquet.metadata.num_row_groups == 3
+    rows = parquet.read().to_pylist()
+    want = expected()
+    for row in want:
+        row['timestamp'] = None if row['timestamp'] is None else str(row['timestamp'])
+        row['size'] = None if row['size'] is None else float(row['size'])
+    assert rows == want
+
+
+def test_export_endpoint_streams_request_rows(tmp_path, monkeypatch):
+    write_requests('a1', requests(), str(tmp_path))
+    table = open_requests('a1', str(tmp_path))
+    monkeypatch.setattr(app_module, 'request_table', lambda analysis_id: table if analysis_id == 'a1' else None)
+    client = app_module.app.test_client()
+
+    response = client.get('/api/export?id=a1&format=ndjson&rows=requests')
+    assert response.status_code == 200
+    assert response.headers['Content-Disposition'] == 'attachment; filename=analysis_a1_requests.ndjson'
+    assert [json.loads(line) for line in response.get_data(as_text=True).splitlines()] == requests()
+
+    response = client.get('/api/export?id=a1&format=csv&rows=requests')
+    assert len(list(csv.reader(io.StringIO(response.get_data(as_text=True))))) == len(requests()) + 1
+
+    assert client.get('/api/export?id=missing&format=csv&rows=requests').status_code == 404
+    assert client.get('/api/export?id=a1&format=xml').status_code == 400
@@ -0,0 +1,70 @@
+# backend/tests/test_fingerprints.py
+"""Anomaly fingerprints and the compare/trend diffs built on them."""
+import uuid
+
+import pytest
+
+import storage
+from app import app
+from fingerprints import anomaly_fingerprint, fingerprint_url, trend
+
+
+def anomaly(url, anomaly_type='not_found', status_code=404):
+    return {'url': url, 'anomaly_type': anomaly_type, 'status_code': status_code}
+
+
+def run(date, anomalies):
+    return {
+        'id': str(uuid.uuid4()),
+        'url': 'https://site.test/',
+        'date': date,
+        'total_requests': 10,
+        'anomalies_found': len(anomalies),
+        'anomalies': anomalies,
+        'safety_assessment': {'threat_level': 10}
+    }
+
+
+def test_fingerprint_ignores_volatile_url_parts_only():
+    assert fingerprint_url('https://Site.test/users/12345/avatar.png?v=9&size=2') == \
+        'https://site.test/users/:id/avatar.png?size&v'
+    assert anomaly_fingerprint(anomaly('https://site.test/app.js?v=1')) == \
+        anomaly_fingerprint(anomaly('https://site.test/app.js?v=2'))
+    # Two different problems on one URL stay apart
+    assert anomaly_fingerprint(anomaly('https://site.test/api')) != \
+        anomaly_fingerprint(anomaly('https://site.test/api', 'server_error', 500))
+
+
+def test_trend_classifies_against_the_newest_run():
+    entry = lambda name: {'fingerprint': name, 'count': 1}
+    result = trend([('r1', [entry('a'), entry('b')]), ('r2', [entry('b')]), ('r3', [entry('b'), entry('c')])])
+
+    assert [e['fingerprint'] for e in result['new']] == ['c']
+    assert [(e['fingerprint'], e['seen_in'], e['count']) for e in result['persisting']] == [('b', ['r1', 'r2', 'r3'], 3)]
+    assert [(e['fingerprint'], e['first_seen'], e['last_seen']) for e in result['resolved']] == [('a', 'r1', 'r1')]
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, '_store', storage.AnalysisStore(str(tmp_path / 'analyses.db'), str(tmp_path / 'log')))
+    return app.test_client()
+
+
+def test_compare_and_trend_diff_by_fingerprint(client):
+    first = run('2026-01-01T00:00:00', [anomaly('https://site.test/a?v=1'), anomaly('https://site.test/gone')])
+    second = run('2026-01-02T00:00:00', [anomaly('https://site.test/a?v=2'),
+                                         anomaly('https://site.test/a?v=2', 'server_error', 500)])
+    storage.get_store().add_many([first, second])
+
+    comparison = client.post('/api/compare', json={'id1': first['id'], 'id2': second['id']}).get_json()
+
+    assert [(a['url'], a['anomaly_type']) for a in comparison['new_anomalies']] == [
+        ('https://site.test/a?v=2', 'server_error')
+    ]
+    assert [a['url'] for a in comparison['resolved_anomalies']] == ['https://site.test/gone']
+    assert len(comparison['fingerprints']['persisting']) == 1
+
+    result = client.get('/api/trend', query_string={'url': 'https://site.test/'}).get_json()
+    assert [a['id'] for a in result['analyses']] == [first['id'], second['id']]
+    assert (len(result['new']), len(result['persisting']), len(result['resolved'])) == (1, 1, 1)
+    assert client.get('/api/trend', query_string={'ids': 'missing'}).status_code == 404
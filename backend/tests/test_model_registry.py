@@ -0,0 +1,53 @@
+# backend/tests/test_model_registry.py
+"""ModelRegistry: refit thresholds and training-sample carry-over."""
+import time
+
+import numpy as np
+
+from detector import MODEL_FEATURES, TIME_FEATURES
+from model_registry import ModelRegistry
+
+FEATURES = ['status_code', 'domain_count']
+
+
+def rows(n, status=200, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.column_stack([np.full(n, status, dtype=float), rng.integers(1, 20, n).astype(float)])
+
+
+def wait_for_refit(registry, timeout=10):
+    deadline = time.time() + timeout
+    while registry._refitting and time.time() < deadline:
+        time.sleep(0.05)
+    assert not registry._refitting
+
+
+def test_persisted_models_leave_out_time_of_day():
+    assert not set(TIME_FEATURES) & set(MODEL_FEATURES)
+
+
+def test_small_drifted_batch_does_not_refit(tmp_path):
+    registry = ModelRegistry(str(tmp_path), refit_after=10000, min_refit_rows=500)
+    registry.score('site', FEATURES, rows(400))
+    fitted_at = registry._get(ModelRegistry._key('site', FEATURES))['fitted_at']
+
+    registry.score('site', FEATURES, rows(20, status=500, seed=1))
+    wait_for_refit(registry)
+
+    entry = registry._get(ModelRegistry._key('site', FEATURES))
+    assert entry['fitted_at'] == fitted_at
+    assert registry._buffered_rows(ModelRegistry._key('site', FEATURES)) == 20
+
+
+def test_refit_combines_training_sample_with_buffered_rows(tmp_path):
+    registry = ModelRegistry(str(tmp_path), refit_after=10000, min_refit_rows=500, sample_rows=300)
+    registry.score('site', FEATURES, rows(400))
+    key = ModelRegistry._key('site', FEATURES)
+    assert len(registry._get(key)['sample']) == 300
+
+    registry.score('site', FEATURES, rows(600, status=500, seed=1))
+    wait_for_refit(registry)
+
+    entry = registry._get(key)
+    assert entry['n_samples'] == 900
+    assert set(entry['sample'][:, 0]) == {200.0, 500.0}
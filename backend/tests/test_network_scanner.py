@@ -0,0 +1,72 @@
+# backend/tests/test_network_scanner.py
+"""Batch scanning helpers: latency summaries and sitemap expansion."""
+import asyncio
+
+import aiohttp
+import numpy as np
+from aiohttp import web
+
+from network_scanner import LatencyStats, collect_sitemap_urls, parse_sitemap
+
+URLSET = b'''<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <url><loc>{base}/a</loc></url>
+  <url><loc>{base}/b</loc></url>
+</urlset>'''
+
+INDEX = b'''<?xml version="1.0" encoding="UTF-8"?>
+<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <sitemap><loc>{base}/pages.xml</loc></sitemap>
+  <sitemap><loc>{base}/pages.xml</loc></sitemap>
+</sitemapindex>'''
+
+
+def test_summary_groups_probes_per_url():
+    stats = LatencyStats(['https://a.test/', 'https://b.test/'], probes_per_url=3)
+    for probe, (status, duration) in enumerate([(200, 10), (200, 30), (0, 5), (404, 7), (200, 9), (200, 11)]):
+        stats.record(probe, status, duration)
+
+    summary = stats.summary()
+
+    assert summary['https://a.test/'] == {
+        'probes': 3, 'errors': 1, 'connection_errors': 1, 'status_codes': {'200': 2},
+        'min': 10.0, 'p50': 20.0, 'p95': 29.0, 'p99': 29.8, 'max': 30.0
+    }
+    assert summary['https://b.test/']['errors'] == 1
+    assert summary['https://b.test/']['status_codes'] == {'200': 2, '404': 1}
+    assert summary['https://b.test/']['p50'] == float(np.percentile([7, 9, 11], 50))
+
+
+def test_parse_sitemap_separates_pages_from_child_sitemaps():
+    assert parse_sitemap(URLSET.replace(b'{base}', b'https://x.test')) == (['https://x.test/a', 'https://x.test/b'], [])
+    assert parse_sitemap(INDEX.replace(b'{base}', b'https://x.test')) == ([], ['https://x.test/pages.xml'] * 2)
+
+
+def test_sitemap_index_is_expanded_into_its_pages():
+    async def run():
+        fetched = []
+
+        async def handler(request):
+            fetched.append(request.path)
+            body = INDEX if request.path == '/index.xml' else URLSET
+            return web.Response(body=body.replace(b'{base}', base.encode()), content_type='application/xml')
+
+        app = web.Application()
+        app.router.add_get('/{path:.*}', handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        base = f'http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}'
+        try:
+            async with aiohttp.ClientSession() as session:
+                urls = await collect_sitemap_urls(session, [f'{base}/index.xml'])
+        finally:
+            await runner.cleanup()
+        return base, urls, fetched
+
+    base, urls, fetched = asyncio.run(run())
+
+    assert urls == [f'{base}/a', f'{base}/b']
+    # The repeated child sitemap is fetched once
+    assert fetched == ['/index.xml', '/pages.xml']
@@ -0,0 +1,25 @@
+# backend/tests/test_pipeline.py
+"""Aggregate and threat score stages keep the original safety assessment shape."""
+from pipeline import AggregateStage, AnalysisContext, ThreatScoreStage
+
+
+def test_one_recommendation_per_issue_in_issue_order():
+    context = AnalysisContext('a1', 'https://site.test/', [])
+    context.security_issues = [
+        {'type': 'missing_security_headers', 'severity': 'medium'},
+        {'type': 'vulnerable_library', 'severity': 'high'},
+        {'type': 'missing_security_headers', 'severity': 'medium'},
+        {'type': 'insecure_cookie', 'severity': 'medium'}
+    ]
+
+    AggregateStage().run(context)
+    ThreatScoreStage().run(context)
+
+    assert context.safety_recommendations == [
+        "Address all high severity security issues immediately",
+        "Implement missing security headers",
+        "Update vulnerable JavaScript libraries",
+        "Implement missing security headers"
+    ]
+    assert context.severity_counts == {'high': 1, 'medium': 3, 'low': 0}
+    assert context.threat_level == 50
@@ -0,0 +1,83 @@
+# backend/tests/test_request_log.py
+"""Columnar request tables: round trips and paging."""
+import pytest
+
+import app as app_module
+from request_log import open_requests, write_requests
+
+
+def logs():
+    return [
+        {'url': 'https://www.example.test/', 'status_code': 200, 'duration': 120, 'resource_type': 'document',
+         'timestamp': 1700000000000, 'headers': {'accept': 'text/html'}},
+        {'url': 'https://cdn.example.test/app.js', 'status_code': 200, 'duration': 45.5, 'resource_type': 'script',
+         'timestamp': 1700000000100},
+        {'url': 'https://api.other.test/Data', 'status_code': 404, 'duration': None, 'response_time': 80,
+         'resource_type': 'xhr', 'timestamp': 1700000000200},
+        {'url': 'https://www.example.test/slow', 'status_code': 500, 'duration': 3000, 'resource_type': 'xhr',
+         'timestamp': 1700000000300, 'size': 10},
+    ]
+
+
+@pytest.fixture
+def table(tmp_path):
+    write_requests('a1', logs(), str(tmp_path))
+    return open_requests('a1', str(tmp_path))
+
+
+def test_rows_round_trip_unchanged(table):
+    rows = table.slice(0, len(table))
+
+    assert rows == logs()
+    # Ints in a column that also holds floats keep their type
+    assert [type(row['duration']) for row in rows] == [int, float, type(None), int]
+
+
+def test_pages_are_read_by_position(table):
+    assert [row['url'] for row in table.slice(1, 3)] == ['https://cdn.example.test/app.js', 'https://api.other.test/Data']
+    assert table.slice(10, 20) == []
+
+
+def urls(result):
+    total, rows = result
+    return total, [row['url'].split('//')[1] for row in rows]
+
+
+def test_filters_narrow_through_the_indexes(table):
+    assert urls(table.query(status_min=400)) == (2, ['api.other.test/Data', 'www.example.test/slow'])
+    # A domain matches its subdomains
+    assert urls(table.query(domain='example.test'))[0] == 3
+    assert urls(table.query(resource_type='xhr', status_max=499)) == (1, ['api.other.test/Data'])
+    # Duration falls back to response_time when it is missing
+    assert urls(table.query(min_duration=60, max_duration=200)) == (2, ['www.example.test/', 'api.other.test/Data'])
+
+
+def test_url_contains_is_case_insensitive_and_combines_with_filters(table):
+    assert urls(table.query(url_contains='DATA')) == (1, ['api.other.test/Data'])
+    assert urls(table.query(url_contains='example', status_min=500)) == (1, ['www.example.test/slow'])
+    assert urls(table.query(url_contains='nowhere')) == (0, [])
+
+
+def test_sort_pages_through_the_sorted_permutation(table):
+    assert urls(table.query(sort='-duration'))[1] == [
+        'www.example.test/slow', 'www.example.test/', 'api.other.test/Data', 'cdn.example.test/app.js'
+    ]
+    assert urls(table.query(sort='duration', domain='example.test', start=1, stop=3)) == (
+        3, ['www.example.test/', 'www.example.test/slow']
+    )
+    with pytest.raises(ValueError):
+        table.query(sort='url')
+
+
+def test_requests_endpoint_applies_filters(table, monkeypatch):
+    monkeypatch.setattr(app_module, 'request_table', lambda analysis_id: table)
+    client = app_module.app.test_client()
+
+    response = client.get('/api/requests?id=a1&status_min=400&sort=-duration&per_page=1')
+    body = response.get_json()
+    assert response.status_code == 200
+    assert (body['total'], body['total_pages']) == (2, 2)
+    assert body['requests'][0]['url'] == 'https://www.example.test/slow'
+
+    assert client.get('/api/requests?id=a1&status_min=abc').status_code == 400
+    assert client.get('/api/requests?id=a1&sort=url').status_code == 400
@@ -0,0 +1,58 @@
+# backend/tests/test_result_cache.py
+"""Single-flight behaviour of ResultCache when the computing caller fails or gives up."""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from result_cache import COALESCED, MISS, ComputationAbandoned, ResultCache
+
+
+def run_with_waiter(cache, leader_compute, waiter_compute):
+    """Start a leader, join a second caller onto it, then let the leader finish"""
+    started = threading.Event()
+    release = threading.Event()
+
+    def leader():
+        started.set()
+        release.wait(5)
+        return leader_compute()
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leading = pool.submit(cache.get_or_compute, 'key', leader)
+        started.wait(5)
+        waiting = pool.submit(cache.get_or_compute, 'key', waiter_compute)
+        while cache.stats()[COALESCED] == 0:
+            threading.Event().wait(0.01)
+        release.set()
+        return leading, waiting
+
+
+def test_abandoned_leader_hands_over_to_waiter():
+    cache = ResultCache()
+
+    def cancelled():
+        raise ComputationAbandoned('Cancelled by user')
+
+    leading, waiting = run_with_waiter(cache, cancelled, lambda: 'fresh')
+
+    with pytest.raises(ComputationAbandoned):
+        leading.result(5)
+    assert waiting.result(5) == ('fresh', MISS)
+    assert cache.stats()['abandoned'] == 1
+    assert cache.stats()['in_flight'] == 0
+
+
+def test_real_failure_is_shared_with_waiters():
+    cache = ResultCache()
+
+    def broken():
+        raise ValueError('capture failed')
+
+    leading, waiting = run_with_waiter(cache, broken, lambda: 'never used')
+
+    with pytest.raises(ValueError):
+        leading.result(5)
+    with pytest.raises(ValueError):
+        waiting.result(5)
+    assert cache.stats()['errors'] == 1
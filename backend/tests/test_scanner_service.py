@@ -0,0 +1,69 @@
+# backend/tests/test_scanner_service.py
+"""ScannerService: one loop and one pooled session shared across callers."""
+import threading
+
+import pytest
+from aiohttp import web
+
+from scanner_service import ScannerService
+
+
+@pytest.fixture
+def service():
+    service = ScannerService(limit_per_host=2)
+    service.start()
+    yield service
+    service.shutdown()
+
+
+@pytest.fixture
+def server(service):
+    """A local HTTP server on the service loop; yields (base url, set of client ports seen)"""
+    peers = set()
+
+    async def handler(request):
+        peers.add(request.transport.get_extra_info('peername')[1])
+        return web.Response(text='ok')
+
+    async def start():
+        app = web.Application()
+        app.router.add_get('/{path:.*}', handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        return runner, site._server.sockets[0].getsockname()[1]
+
+    runner, port = service.submit(start()).result(timeout=5)
+    yield f'http://127.0.0.1:{port}/', peers
+    service.submit(runner.cleanup()).result(timeout=5)
+
+
+def test_concurrent_callers_share_the_session_and_its_connections(service, server):
+    url, peers = server
+    session = service.session
+    results = []
+
+    def scan():
+        results.append(service.scan_url(url, concurrency=5, timeout=5))
+
+    threads = [threading.Thread(target=scan) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert [len(result) for result in results] == [5] * 4
+    assert all(probe['status_code'] == 200 for result in results for probe in result)
+    # 20 probes over keep-alive connections capped at limit_per_host
+    assert len(peers) <= 2
+    assert service.session is session
+
+
+def test_shutdown_is_idempotent_and_restartable(service):
+    service.shutdown()
+    service.shutdown()
+    assert service.session is None
+
+    service.start()
+    assert service.session is not None and not service.session.closed
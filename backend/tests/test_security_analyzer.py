@@ -0,0 +1,59 @@
+# backend/tests/test_security_analyzer.py
+"""SecurityAnalyzer: issue shapes reported per script and per response."""
+from security_analyzer import SecurityAnalyzer
+from signatures import SignatureDB
+
+SIGNATURES = [
+    {'library': 'jquery', 'name': 'jQuery', 'patterns': ['jquery'], 'vulnerable': '<3.4.0',
+     'severity': 'medium', 'advisory': 'CVE-2019-11358', 'summary': 'Prototype pollution'},
+    {'library': 'jquery', 'name': 'jQuery', 'patterns': ['jquery'], 'vulnerable': '<3.5.0',
+     'severity': 'high', 'advisory': 'CVE-2020-11022', 'summary': 'XSS in DOM manipulation'},
+    {'library': 'lodash', 'name': 'Lodash', 'patterns': ['lodash'], 'vulnerable': '<4.17.21',
+     'severity': 'high', 'advisory': 'CVE-2021-23337', 'summary': 'Command injection'},
+]
+
+
+def script(url):
+    return {'url': url, 'resource_type': 'script', 'status_code': 200}
+
+
+def test_one_issue_per_library_version_with_its_advisories():
+    analyzer = SecurityAnalyzer(signature_db=SignatureDB(SIGNATURES))
+    logs = [
+        script('https://cdn.test/jquery-1.12.4.min.js'),
+        script('https://cdn.test/jquery/3.4.1/jquery.min.js'),
+        script('https://cdn.test/jquery-3.7.0.min.js')
+    ]
+
+    issues = analyzer.check_vulnerable_libraries(logs)
+
+    assert [issue['library'] for issue in issues] == ['jQuery 1.12.4', 'jQuery 3.4.1']
+    old = issues[0]
+    assert [a['advisory'] for a in old['advisories']] == ['CVE-2019-11358', 'CVE-2020-11022']
+    assert old['advisory'] == 'CVE-2019-11358, CVE-2020-11022'
+    assert old['severity'] == 'high'
+    assert [a['advisory'] for a in issues[1]['advisories']] == ['CVE-2020-11022']
+
+
+def test_cookie_findings_are_one_issue_per_response():
+    analyzer = SecurityAnalyzer(signature_db=SignatureDB([]))
+    page = {
+        'url': 'https://site.test/',
+        'resource_type': 'document',
+        'status_code': 200,
+        'response_headers': {
+            'set-cookie': 'sid=1; HttpOnly\npref=dark; Secure; HttpOnly; SameSite=Lax\ntrack=x',
+            'strict-transport-security': 'max-age=0'
+        }
+    }
+
+    issues = analyzer.check_security_headers([page])
+    cookie_issues = [issue for issue in issues if issue['type'] == 'insecure_cookie']
+
+    assert len(cookie_issues) == 1
+    assert cookie_issues[0]['cookies'] == [
+        {'cookie': 'sid', 'missing_flags': ['secure', 'samesite']},
+        {'cookie': 'track', 'missing_flags': ['secure', 'httponly', 'samesite']}
+    ]
+    assert cookie_issues[0]['severity'] == 'medium'
+    assert [issue['severity'] for issue in issues if issue.get('rule') == 'hsts-disabled'] == ['low']
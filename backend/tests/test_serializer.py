@@ -0,0 +1,27 @@
+# backend/tests/test_serializer.py
+"""frame_records: missing values become None, other values keep their type."""
+import numpy as np
+import pandas as pd
+
+from serializer import dumps, frame_records
+
+
+def test_frame_records_nulls_only_missing_values():
+    frame = pd.DataFrame({
+        'when': pd.to_datetime(['2026-01-01 10:00:00', None]),
+        'label': ['NaT', None],
+        'score': [1.5, np.nan],
+        'count': np.array([3, 4], dtype=np.int64)
+    })
+
+    records = frame_records(frame)
+
+    assert records == [
+        {'when': '2026-01-01T10:00:00.000000', 'label': 'NaT', 'score': 1.5, 'count': 3},
+        {'when': None, 'label': None, 'score': None, 'count': 4}
+    ]
+    assert type(records[0]['count']) is int
+    assert dumps(records) == (
+        '[{"when":"2026-01-01T10:00:00.000000","label":"NaT","score":1.5,"count":3},'
+        '{"when":null,"label":null,"score":null,"count":4}]'
+    )
@@ -0,0 +1,128 @@
+# backend/tests/test_storage.py
+"""AnalysisStore: index-backed listings, compaction and crash recovery."""
+import uuid
+
+import pytest
+
+from storage import AnalysisStore
+
+
+def analysis(url='https://example.test/', date='2026-01-01T00:00:00', anomalies=0):
+    return {
+        'id': str(uuid.uuid4()),
+        'url': url,
+        'date': date,
+        'total_requests': 10,
+        'anomalies_found': anomalies,
+        'anomaly_types': {'client_error': anomalies} if anomalies else {},
+        'anomalies': [{'url': f'{url}missing', 'anomaly_type': 'not_found', 'status_code': 404}] * anomalies,
+        'safety_assessment': {'threat_level': 20}
+    }
+
+
+@pytest.fixture
+def store(tmp_path):
+    return AnalysisStore(str(tmp_path / 'analyses.db'), str(tmp_path / 'log'), fsync=False)
+
+
+def test_history_is_served_from_the_index(store, monkeypatch):
+    older = analysis(date='2026-01-01T00:00:00', anomalies=2)
+    newer = analysis(url='https://other.test/', date='2026-01-02T00:00:00')
+    store.add_many([newer, older])
+
+    def no_body_reads(*args):
+        raise AssertionError('history must not read analysis bodies')
+
+    monkeypatch.setattr(store.log, 'read', no_body_reads)
+    history = store.history()
+
+    assert [row['id'] for row in history] == [older['id'], newer['id']]
+    assert history[0]['anomalies_found'] == 2
+    assert history[0]['total_requests'] == 10
+    assert history[0]['threat_level'] == 20
+    assert [row['id'] for row in store.history(url='https://other.test/')] == [newer['id']]
+
+
+def test_read_follows_a_record_that_compaction_moved(store):
+    kept = analysis()
+    store.add(kept)
+    stale = store._connect().execute(
+        'SELECT segment, offset, length FROM analyses WHERE id = ?', (kept['id'],)
+    ).fetchone()
+    # Seal the segment, overwrite nothing and force it to be rewritten
+    store.log.max_segment_bytes = 1
+    store.add(analysis())
+    assert store.compact(max_live_ratio=1.0) == 1
+
+    # A reader that looked the address up before compaction still gets the record
+    assert store._read(kept['id'], stale)['id'] == kept['id']
+    assert store.get(kept['id'])['id'] == kept['id']
+
+
+def test_reindex_recovers_records_in_sealed_segments(tmp_path):
+    db, log = str(tmp_path / 'analyses.db'), str(tmp_path / 'log')
+    store = AnalysisStore(db, log, fsync=False)
+    store.log.max_segment_bytes = 1
+    # Appended but never indexed (a crash), then the log rolls over to a new segment
+    lost = analysis()
+    store.log.append(lost)
+    store.add(analysis())
+    assert len(store.log.segments()) == 2
+
+    reopened = AnalysisStore(db, log, fsync=False)
+    assert reopened.get(lost['id'])['id'] == lost['id']
+
+
+def test_deleted_and_pruned_analyses_stay_deleted(tmp_path):
+    db, log = str(tmp_path / 'analyses.db'), str(tmp_path / 'log')
+    store = AnalysisStore(db, log, fsync=False)
+    old, recent, removed = analysis(date='2020-01-01T00:00:00'), analysis(date='2026-01-01T00:00:00'), analysis()
+    store.add_many([old, recent, removed])
+
+    assert store.delete(removed['id'])
+    assert not store.delete(removed['id'])
+    assert store.prune('2025-01-01') == [old['id']]
+
+    reopened = AnalysisStore(db, log, fsync=False)
+    assert [row['id'] for row in reopened.history()] == [recent['id']]
+
+
+def scored(threat_level, **kwargs):
+    record = analysis(**kwargs)
+    record['safety_assessment'] = {'threat_level': threat_level}
+    return record
+
+
+def test_rollups_aggregate_by_bucket_and_domain(store):
+    store.add_many([
+        scored(10, date='2026-01-01T10:05:00', anomalies=1),
+        scored(30, date='2026-01-01T10:55:00', anomalies=2),
+        scored(50, date='2026-01-01T11:00:00'),
+        scored(90, url='https://other.test/', date='2026-01-01T10:30:00', anomalies=3),
+    ])
+
+    hours = store.rollups('hour', domain='example.test')
+    assert [(r['bucket_start'], r['analyses'], r['avg_threat_level'], r['max_threat_level'], r['anomalies_found'])
+            for r in hours] == [('2026-01-01T11:00', 1, 50, 50, 0), ('2026-01-01T10:00', 2, 20, 30, 3)]
+
+    # Without a domain every site's rows are merged into the bucket
+    assert [(r['bucket_start'], r['analyses'], r['max_threat_level']) for r in store.rollups('day')] == [
+        ('2026-01-01', 4, 90)
+    ]
+    # The bucket that `since` falls in is included whole
+    assert [r['bucket_start'] for r in store.rollups('hour', since='2026-01-01T10:59:00')] == [
+        '2026-01-01T11:00', '2026-01-01T10:00'
+    ]
+    assert [r['bucket_start'] for r in store.rollups('hour', since='2026-01-01T11:00:00')] == ['2026-01-01T11:00']
+    with pytest.raises(ValueError):
+        store.rollups('week')
+
+
+def test_rollups_follow_replacements_and_deletes(store):
+    record = scored(40, date='2026-01-01T10:00:00')
+    store.add(record)
+    store.add(dict(record, date='2026-01-02T09:00:00'))
+    assert [r['bucket_start'] for r in store.rollups('day')] == ['2026-01-02']
+
+    store.delete(record['id'])
+    assert store.rollups('day') == []
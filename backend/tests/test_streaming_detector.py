@@ -0,0 +1,52 @@
+# backend/tests/test_streaming_detector.py
+"""StreamingDetector: steady traffic stays quiet, bursts and bad input do not."""
+import pandas as pd
+
+import app as app_module
+from app import app
+from streaming_detector import StreamingDetector
+
+
+def steady_records(count, start='2026-01-01T10:00:00', spacing=0.2, domains=('a.test', 'b.test')):
+    started = pd.Timestamp(start)
+    return [
+        {
+            'url': f'https://{domains[i % len(domains)]}/item/{i}',
+            'timestamp': (started + pd.Timedelta(seconds=i * spacing)).isoformat(),
+            'status_code': 200,
+            'resource_type': 'xhr',
+            'duration': 100 + (i % 7) * 5
+        }
+        for i in range(count)
+    ]
+
+
+def test_minute_rollover_and_new_domain_are_not_outliers():
+    detector = StreamingDetector()
+    # Spans several minute boundaries and ends with a first request to a new domain
+    records = steady_records(1200)
+    records.append({**records[-1], 'url': 'https://new.test/', 'timestamp': records[-1]['timestamp']})
+
+    assert detector.update_many(records) == []
+
+
+def test_burst_to_one_domain_is_an_outlier():
+    detector = StreamingDetector()
+    records = steady_records(600)
+    last = pd.Timestamp(records[-1]['timestamp'])
+    burst = [{**records[0], 'url': 'https://a.test/burst', 'timestamp': last.isoformat()} for _ in range(200)]
+
+    anomalies = detector.update_many(records + burst)
+
+    assert anomalies
+    assert {anomaly['anomaly_type'] for anomaly in anomalies} == {'statistical_outlier'}
+
+
+def test_stream_rejects_non_object_records(monkeypatch):
+    monkeypatch.setattr(app_module, 'stream_detectors', type(app_module.stream_detectors)())
+    client = app.test_client()
+
+    response = client.post('/api/stream/s1', json=[{'url': 'https://a.test/', 'status_code': 200}, 'oops'])
+
+    assert response.status_code == 400
+    assert 's1' not in app_module.stream_detectors
@@ -0,0 +1,59 @@
+# backend/tests/test_tasks.py
+"""JobQueue: detection runs in a killable process and ingestion honours cancellation."""
+import multiprocessing
+import os
+import time
+
+import pytest
+
+import tasks
+from capture_ingest import ingest_capture
+from tasks import Job, JobCancelled, JobQueue, TaskStore
+
+
+def sleepy_child(conn, pid_path, site, rule_anomalies):
+    """Stands in for detect_anomalies: records its pid, then never finishes"""
+    with open(pid_path, 'w') as f:
+        f.write(str(os.getpid()))
+    time.sleep(60)
+
+
+@pytest.fixture
+def job_queue(tmp_path):
+    job_queue = JobQueue(TaskStore(str(tmp_path / 'tasks.db')), max_concurrency=1)
+    yield job_queue
+    job_queue.shutdown()
+
+
+def test_detection_result_comes_back_from_the_child(job_queue):
+    job = Job('t1', 'https://example.test/', timeout=60)
+    job.deadline = time.time() + 60
+
+    assert job_queue._detect(job, [], None, []) == []
+
+
+def test_timeout_terminates_a_running_detection(job_queue, tmp_path, monkeypatch):
+    # spawn re-imports this module in the child, so the stand-in target resolves there
+    monkeypatch.setattr(job_queue, '_mp_context', multiprocessing.get_context('spawn'))
+    monkeypatch.setattr(tasks, '_detect_in_child', sleepy_child)
+    pid_path = tmp_path / 'child.pid'
+    job = Job('t2', 'https://example.test/', timeout=1)
+    job.deadline = time.time() + 3
+
+    started = time.time()
+    with pytest.raises(JobCancelled, match='Timed out'):
+        job_queue._detect(job, str(pid_path), None, [])
+
+    assert time.time() - started < 20
+    with pytest.raises(ProcessLookupError):
+        os.kill(int(pid_path.read_text()), 0)
+
+
+def test_cancel_stops_ingesting_a_capture_that_is_still_running(tmp_path):
+    path = tmp_path / 'capture.ndjson'
+    path.write_text('{"url": "https://example.test/", "status_code": 200}\n')
+    job = Job('t3', 'https://example.test/', timeout=60)
+    job.cancelled.set()
+
+    with pytest.raises(JobCancelled, match='Cancelled'):
+        ingest_capture(str(path), lambda: False, checkpoint=job.checkpoint)
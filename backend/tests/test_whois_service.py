@@ -0,0 +1,94 @@
+# backend/tests/test_whois_service.py
+"""WhoisService: single-flight lookups and cached failures."""
+import threading
+import time
+
+import pytest
+
+from result_cache import COALESCED, HIT, MISS
+from whois_service import WhoisLookupError, WhoisService
+
+
+class Resolver:
+    def __init__(self, fail=False):
+        self.calls = []
+        self.fail = fail
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self, domain):
+        self.calls.append(domain)
+        self.release.wait(5)
+        if self.fail:
+            raise OSError('connection refused')
+        return {'registrar': 'Example Registrar'}
+
+
+@pytest.fixture
+def service_for(tmp_path):
+    services = []
+
+    def make(resolver, **kwargs):
+        service = WhoisService(resolver=resolver, cache_path=str(tmp_path / 'whois.db'), timeout=5, **kwargs)
+        services.append(service)
+        return service
+
+    yield make
+    for service in services:
+        service.shutdown()
+
+
+def test_concurrent_lookups_share_one_query(service_for):
+    resolver = Resolver()
+    resolver.release.clear()
+    service = service_for(resolver)
+    results = []
+
+    def lookup():
+        results.append(service.lookup('Example.test.'))
+
+    threads = [threading.Thread(target=lookup) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    while service.stats()[MISS] + service.stats()[COALESCED] < 5:
+        time.sleep(0.01)
+    resolver.release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert resolver.calls == ['example.test']
+    assert sorted(outcome for _, outcome in results) == sorted([MISS] + [COALESCED] * 4)
+    assert all(info == {'registrar': 'Example Registrar', 'domain': 'example.test'} for info, _ in results)
+    # Later callers are answered from the cache
+    assert service.lookup('example.test')[1] == HIT
+    assert resolver.calls == ['example.test']
+
+
+def test_failures_are_cached_for_the_negative_ttl(service_for):
+    resolver = Resolver(fail=True)
+    service = service_for(resolver, negative_ttl=0.5)
+
+    with pytest.raises(WhoisLookupError, match='connection refused'):
+        service.lookup('down.test')
+    with pytest.raises(WhoisLookupError, match='connection refused'):
+        service.lookup('down.test')
+    assert resolver.calls == ['down.test']
+    assert (service.stats()['errors'], service.stats()['negative_hits']) == (1, 1)
+
+    time.sleep(0.6)
+    resolver.fail = False
+    assert service.lookup('down.test')[0]['registrar'] == 'Example Registrar'
+    assert resolver.calls == ['down.test', 'down.test']
+
+
+def test_lookup_many_reports_errors_per_domain(service_for):
+    resolver = Resolver()
+    service = service_for(resolver, negative_ttl=0)
+    service.resolver = lambda domain: resolver(domain) if domain != 'bad.test' else 1 / 0
+
+    results = service.lookup_many(['good.test', 'bad.test', 'good.test'])
+
+    assert results['good.test']['domain'] == 'good.test'
+    assert 'division by zero' in results['bad.test']['error']
+    # A zero negative TTL stores nothing, so the failure is retried
+    assert service.stats()['entries'] == 1
@@ -0,0 +1,229 @@
+# backend/whois_service.py
+import datetime
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait
+
+from result_cache import COALESCED, HIT, MISS
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../data')
+WHOIS_CACHE_PATH = os.path.join(DATA_DIR, 'whois.db')
+
+WHOIS_TTL = float(os.environ.get('NAD_WHOIS_TTL', 86400))  # seconds a successful lookup is reused
+WHOIS_NEGATIVE_TTL = float(os.environ.get('NAD_WHOIS_NEGATIVE_TTL', 900))  # seconds a failed lookup is reused
+WHOIS_WORKERS = int(os.environ.get('NAD_WHOIS_WORKERS', 4))
+WHOIS_TIMEOUT = float(os.environ.get('NAD_WHOIS_TIMEOUT', 15))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS whois_cache (
+    domain TEXT PRIMARY KEY,
+    ok INTEGER NOT NULL,
+    body TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+WHOIS_FIELDS = ('registrar', 'creation_date', 'expiration_date', 'updated_date', 'name_servers', 'status',
+                'emails', 'dnssec', 'name', 'org', 'address', 'city', 'state', 'zipcode', 'country')
+
+
+class WhoisLookupError(Exception):
+    """A WHOIS lookup failed or timed out"""
+
+    def __init__(self, domain, message, timed_out=False):
+        super().__init__(message)
+        self.domain = domain
+        self.timed_out = timed_out
+
+
+def _jsonable(value):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    if isinstance(value, (list, tuple, set)):
+        return [_jsonable(v) for v in value]
+    return value
+
+
+def python_whois_resolver(domain):
+    """Default resolver: query the python-whois package and keep the fields the UI shows"""
+    import whois
+
+    whois_info = whois.whois(domain)
+    info = {field: _jsonable(getattr(whois_info, field, None)) for field in WHOIS_FIELDS}
+    # Clean up None values
+    return {k: v for k, v in info.items() if v is not None}
+
+
+class WhoisService:
+    """Cached, non-blocking WHOIS lookups.
+
+    Answers are kept in a small SQLite cache that survives restarts: successful
+    lookups for `ttl` seconds, failures for `negative_ttl`. Misses run on a
+    bounded thread pool; concurrent lookups of the same domain share one query.
+    `resolver(domain)` returns a dict of WHOIS fields or raises, and can be
+    replaced with a local stub.
+    """
+
+    def __init__(self, resolver=None, cache_path=WHOIS_CACHE_PATH, ttl=WHOIS_TTL,
+                 negative_ttl=WHOIS_NEGATIVE_TTL, workers=WHOIS_WORKERS, timeout=WHOIS_TIMEOUT):
+        self.resolver = resolver or python_whois_resolver
+        self.cache_path = cache_path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.timeout = timeout
+        self.logger = logging.getLogger(__name__)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='whois')
+        self._in_flight = {}  # domain -> Future
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._stats = {HIT: 0, MISS: 0, COALESCED: 0, 'negative_hits': 0, 'errors': 0, 'timeouts': 0}
+        os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+            conn.execute('DELETE FROM whois_cache WHERE expires_at < ?', (time.time(),))
+
+    def _connect(self):
+        """Return the calling thread's connection, opening it on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.cache_path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def lookup(self, domain, timeout=None):
+        """Return (info, outcome) for one domain; outcome is 'hit', 'miss' or 'coalesced'.
+
+        Raises WhoisLookupError if the lookup fails, was recently seen to
+        fail, or takes longer than `timeout` seconds. A timed out lookup keeps
+        running and its answer is cached for the next caller.
+        """
+        future, outcome = self._submit(domain)
+        try:
+            return future.result(timeout=self.timeout if timeout is None else timeout), outcome
+        except FutureTimeoutError:
+            with self._lock:
+                self._stats['timeouts'] += 1
+            raise WhoisLookupError(domain, 'WHOIS lookup timed out', timed_out=True)
+
+    def lookup_many(self, domains, timeout=None):
+        """Look up several domains concurrently; returns {domain: info or {'error': ...}}.
+
+        `timeout` bounds the whole batch, not each domain.
+        """
+        futures = {domain: self._submit(domain)[0] for domain in dict.fromkeys(domains)}
+        wait(futures.values(), timeout=self.timeout if timeout is None else timeout)
+        results = {}
+        for domain, future in futures.items():
+            if not future.done():
+                with self._lock:
+                    self._stats['timeouts'] += 1
+                results[domain] = {'error': 'WHOIS lookup timed out'}
+            elif future.exception() is not None:
+                results[domain] = {'error': str(future.exception())}
+            else:
+                results[domain] = future.result()
+        return results
+
+    def invalidate(self, domain=None):
+        """Drop one cached answer, or all of them when domain is None"""
+        with self._connect() as conn:
+            if domain is None:
+                conn.execute('DELETE FROM whois_cache')
+            else:
+                conn.execute('DELETE FROM whois_cache WHERE domain = ?', (domain,))
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats, in_flight=len(self._in_flight))
+        stats['entries'] = self._connect().execute('SELECT COUNT(*) FROM whois_cache').fetchone()[0]
+        return stats
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _submit(self, domain):
+        """A future for domain's answer: already resolved on a cache hit, shared while in flight"""
+        domain = domain.lower().rstrip('.')
+        with self._lock:
+            future = self._in_flight.get(domain)
+            if future is not None:
+                self._stats[COALESCED] += 1
+                return future, COALESCED
+
+        cached = self._cached(domain)
+        with self._lock:
+            if cached is not None:
+                ok, body = cached
+                self._stats[HIT if ok else 'negative_hits'] += 1
+                return _resolved(domain, ok, body), HIT
+            future = self._in_flight.get(domain)
+            if future is not None:
+                self._stats[COALESCED] += 1
+                return future, COALESCED
+            self._stats[MISS] += 1
+            future = self._in_flight[domain] = self._executor.submit(self._resolve, domain)
+            return future, MISS
+
+    def _resolve(self, domain):
+        try:
+            info = self.resolver(domain)
+        except Exception as e:
+            with self._lock:
+                self._stats['errors'] += 1
+            self._store(domain, False, {'error': f'WHOIS lookup failed: {e}'}, self.negative_ttl)
+            raise WhoisLookupError(domain, f'WHOIS lookup failed: {e}')
+        else:
+            info = {key: _jsonable(value) for key, value in info.items()}
+            info['domain'] = domain
+            self._store(domain, True, info, self.ttl)
+            return info
+        finally:
+            with self._lock:
+                self._in_flight.pop(domain, None)
+
+    def _cached(self, domain):
+        row = self._connect().execute(
+            'SELECT ok, body FROM whois_cache WHERE domain = ? AND expires_at > ?', (domain, time.time())
+        ).fetchone()
+        return (bool(row[0]), json.loads(row[1])) if row else None
+
+    def _store(self, domain, ok, body, ttl):
+        if ttl <= 0:
+            return
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    'INSERT OR REPLACE INTO whois_cache (domain, ok, body, expires_at) VALUES (?, ?, ?, ?)',
+                    (domain, int(ok), json.dumps(body, default=str), time.time() + ttl)
+                )
+        except sqlite3.Error as e:
+            self.logger.warning(f"Could not cache WHOIS answer for {domain}: {e}")
+
+
+def _resolved(domain, ok, body):
+    """An already-completed future holding a cached answer"""
+    future = Future()
+    if ok:
+        future.set_result(body)
+    else:
+        future.set_exception(WhoisLookupError(domain, body.get('error', 'WHOIS lookup failed')))
+    return future
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_whois_service():
+    """Return the process-wide WHOIS service"""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = WhoisService()
+    return _service
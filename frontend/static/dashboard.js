@@ -539,14 +539,12 @@ class Dashboard {
             // Show loading spinner
             this.showSpinner();
             
-            // Get analysis from history
-            const response = await fetch(`/api/history`);
+            // Get the full analysis record from history
+            const response = await fetch(`/api/history/${encodeURIComponent(id)}`);
+            if (response.status === 404) throw new Error('Analysis not found');
             if (!response.ok) throw new Error('Failed to fetch history');
             
-            const history = await response.json();
-            const analysis = history.find(item => item.id === id);
-            
-            if (!analysis) throw new Error('Analysis not found');
+            const analysis = await response.json();
             
             // Display the results
             this.displayResults(analysis);